@@ -0,0 +1,60 @@
+"""Async versions of the query helpers, for the FastAPI endpoints.
+
+Each helper runs the matching function of ``query_helpers`` through
+``AsyncSession.run_sync``: the query code is shared, and every database
+round-trip it makes is awaited on the async driver instead of blocking a
+worker thread.
+"""
+
+import functools
+
+import query_helpers as helpers
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _async_helper(helper):
+    """Wrap a sync helper taking a Session into an awaitable one."""
+
+    @functools.wraps(helper)
+    async def run(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(helper, *args, **kwargs)
+
+    return run
+
+
+# --- Films ---
+get_movie = _async_helper(helpers.get_movie)
+get_movie_detail = _async_helper(helpers.get_movie_detail)
+get_movies = _async_helper(helpers.get_movies)
+get_movies_by_ids = _async_helper(helpers.get_movies_by_ids)
+get_movie_stats = _async_helper(helpers.get_movie_stats)
+get_similar_movies = _async_helper(helpers.get_similar_movies)
+get_movie_titles = _async_helper(helpers.get_movie_titles)
+
+# --- Ratings ---
+get_rating = _async_helper(helpers.get_rating)
+get_ratings = _async_helper(helpers.get_ratings)
+get_ratings_by_keys = _async_helper(helpers.get_ratings_by_keys)
+
+# --- Tags ---
+get_tag = _async_helper(helpers.get_tag)
+get_tags = _async_helper(helpers.get_tags)
+
+# --- Links ---
+get_link = _async_helper(helpers.get_link)
+get_links = _async_helper(helpers.get_links)
+get_links_by_ids = _async_helper(helpers.get_links_by_ids)
+
+# --- Statistiques ---
+get_movie_count = _async_helper(helpers.get_movie_count)
+get_rating_count = _async_helper(helpers.get_rating_count)
+get_tag_count = _async_helper(helpers.get_tag_count)
+get_link_count = _async_helper(helpers.get_link_count)
+get_average_rating = _async_helper(helpers.get_average_rating)
+get_dataset_totals = _async_helper(helpers.get_dataset_totals)
+get_ratings_per_user = _async_helper(helpers.get_ratings_per_user)
+get_top_genres = _async_helper(helpers.get_top_genres)
+get_analytics = _async_helper(helpers.get_analytics)
+get_user_stats = _async_helper(helpers.get_user_stats)
+get_rating_histogram = _async_helper(helpers.get_rating_histogram)
+get_rating_timeline = _async_helper(helpers.get_rating_timeline)
@@ -0,0 +1 @@
+"""Benchmarks for the API, run from the api directory with ``python -m``."""
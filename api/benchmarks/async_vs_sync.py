@@ -0,0 +1,96 @@
+"""Compare the async database path of the API with the former sync path.
+
+Usage (from the ``api`` directory, against a database built by ingest.py)::
+
+    python -m benchmarks.async_vs_sync [--clients 10 100 1000] [--requests 3000]
+
+Every simulated client sends its requests back to back, dispatched the way
+FastAPI runs each kind of endpoint:
+
+- sync: a ``def`` endpoint; the helper runs on a ``SessionLocal`` session in
+  the anyio worker threadpool (40 threads by default);
+- async: an ``async def`` endpoint; the async helper awaits an
+  ``AsyncSessionLocal`` session on the event loop.
+
+HTTP parsing and serialization are left out so that only the database
+dispatch differs between the two paths. The workload cycles through the
+movie detail, ratings-by-movie, title search and movie stats helpers.
+"""
+
+import argparse
+import asyncio
+import time
+
+import anyio.to_thread
+import async_query_helpers as async_helpers
+import query_helpers as helpers
+from benchmarks.common import print_table, summarize
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+MOVIE_IDS = [1, 2, 50, 260, 296, 318, 356, 593, 1196, 2571, 2959, 4993, 58559]
+
+# Each call takes (helpers module, session, request number) and runs the
+# sync helper or returns the awaitable of the async one.
+WORKLOAD = [
+    lambda h, db, n: h.get_movie_detail(db, MOVIE_IDS[n % len(MOVIE_IDS)]),
+    lambda h, db, n: h.get_ratings(
+        db, limit=50, movie_id=MOVIE_IDS[n % len(MOVIE_IDS)]
+    ),
+    lambda h, db, n: h.get_movies(db, limit=10, title="star"),
+    lambda h, db, n: h.get_movie_stats(db, MOVIE_IDS[n % len(MOVIE_IDS)]),
+]
+
+
+def _sync_request(n: int):
+    with SessionLocal() as db:
+        WORKLOAD[n % len(WORKLOAD)](helpers, db, n)
+
+
+async def sync_path(n: int):
+    await anyio.to_thread.run_sync(_sync_request, n)
+
+
+async def async_path(n: int):
+    async with AsyncSessionLocal() as db:
+        await WORKLOAD[n % len(WORKLOAD)](async_helpers, db, n)
+
+
+async def run(path, clients: int, requests: int) -> dict:
+    """Run `requests` requests spread over `clients` concurrent clients."""
+    per_client = max(1, requests // clients)
+    latencies = []
+
+    async def client(index: int):
+        for n in range(index * per_client, (index + 1) * per_client):
+            start = time.perf_counter()
+            await path(n)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(clients)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main(clients_levels: list[int], requests: int):
+    # Warm both pools and the SQLite page cache before measuring.
+    await run(sync_path, 10, 200)
+    await run(async_path, 10, 200)
+
+    rows = []
+    for clients in clients_levels:
+        for name, path in (("sync", sync_path), ("async", async_path)):
+            rows.append(
+                {"path": name, "clients": clients, **await run(path, clients, requests)}
+            )
+    print_table(rows, ["path", "clients", "requests", "rps", "p50_ms", "p99_ms"])
+
+    engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.requests))
@@ -0,0 +1,108 @@
+"""Compare the columnar NumPy engine with the SQL helpers on the same queries.
+
+Usage (from the ``api`` directory, against a database built by ingest.py)::
+
+    python -m benchmarks.columnar_vs_sql [--requests 2000]
+
+Both engines answer the queries behind the per-user stats, histogram and
+timeline endpoints, plus per-movie stats aggregated from the ratings (the
+work movie_stats precomputes), called directly so that only the engine
+differs. The columnar files are built (or refreshed) first.
+"""
+
+import argparse
+import tempfile
+import time
+
+import query_helpers as helpers
+from benchmarks.common import print_table, summarize
+from columnar import load_columnar
+from database import SessionLocal
+from stats import aggregate_ratings
+
+MOVIE_IDS = [1, 2, 50, 260, 296, 318, 356, 593, 1196, 2571, 2959, 4993, 58559]
+USER_IDS = [1, 7, 68, 182, 274, 414, 448, 474, 599, 610]
+
+
+def sql_movie_stats(db, movie_id):
+    return db.execute(aggregate_ratings([movie_id])).first()
+
+
+# (name, sql call, columnar call); each takes (session or engine, n).
+QUERIES = [
+    (
+        "movie stats",
+        lambda db, n: sql_movie_stats(db, MOVIE_IDS[n % len(MOVIE_IDS)]),
+        lambda cr, n: cr.movie_stats(MOVIE_IDS[n % len(MOVIE_IDS)]),
+    ),
+    (
+        "user stats",
+        lambda db, n: helpers.get_user_stats(db, USER_IDS[n % len(USER_IDS)]),
+        lambda cr, n: cr.user_stats(USER_IDS[n % len(USER_IDS)]),
+    ),
+    (
+        "movie histogram",
+        lambda db, n: helpers.get_rating_histogram(
+            db, movie_id=MOVIE_IDS[n % len(MOVIE_IDS)]
+        ),
+        lambda cr, n: cr.histogram(movie_id=MOVIE_IDS[n % len(MOVIE_IDS)]),
+    ),
+    (
+        "global histogram",
+        lambda db, n: helpers.get_rating_histogram(db),
+        lambda cr, n: cr.histogram(),
+    ),
+    (
+        "user timeline (month)",
+        lambda db, n: helpers.get_rating_timeline(
+            db, "month", user_id=USER_IDS[n % len(USER_IDS)]
+        ),
+        lambda cr, n: cr.timeline("month", user_id=USER_IDS[n % len(USER_IDS)]),
+    ),
+    (
+        "global timeline (year)",
+        lambda db, n: helpers.get_rating_timeline(db, "year"),
+        lambda cr, n: cr.timeline("year"),
+    ),
+]
+
+
+def measure(call, target, requests: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for n in range(requests):
+        begin = time.perf_counter()
+        call(target, n)
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main(requests: int):
+    with SessionLocal() as db, tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        columnar = load_columnar(db, directory)
+        print(
+            f"columnar build: {len(columnar)} ratings in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+        rows = []
+        for name, sql_call, columnar_call in QUERIES:
+            # Global aggregates scan the whole table: fewer runs for SQL.
+            runs = requests if "global" not in name else max(1, requests // 20)
+            for engine, call, target in (
+                ("sql", sql_call, db),
+                ("columnar", columnar_call, columnar),
+            ):
+                call(target, 0)
+                rows.append(
+                    {"query": name, "engine": engine, **measure(call, target, runs)}
+                )
+        print_table(rows, ["query", "engine", "requests", "rps", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.requests)
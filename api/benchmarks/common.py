@@ -0,0 +1,35 @@
+"""Shared helpers for the benchmarks: timing summaries and table output."""
+
+import statistics
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Summarize per-request latencies (seconds) measured over `elapsed`."""
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def print_table(rows: list[dict], columns: list[str]):
+    """Print dicts as an aligned text table, numbers with 2 decimals."""
+
+    def fmt(value):
+        return f"{value:,.2f}" if isinstance(value, float) else str(value)
+
+    cells = [[fmt(row[column]) for column in columns] for row in rows]
+    widths = [
+        max(len(column), *(len(line[i]) for line in cells))
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
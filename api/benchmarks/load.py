@@ -0,0 +1,516 @@
+"""Load test of every API endpoint against a fixture database.
+
+Usage (from the ``api`` directory)::
+
+    python -m benchmarks.load [--concurrency 1 16] [--requests 200]
+        [--mode inprocess|server] [--base-url URL]
+        [--output benchmarks/results.json]
+        [--baseline benchmarks/baseline.json] [--threshold 0.2] [--save-baseline]
+
+The fixture database is built once from ``data/*.csv`` by ingest.py, into
+FIXTURE_DIR (``benchmarks/fixture``), along with the recommendation model
+when NumPy is available; ``--rebuild`` builds it again.
+The API then runs on it either in this process (``inprocess``: requests go
+through an ASGI transport, no sockets) or as a uvicorn server on localhost
+(``server``); ``--base-url`` targets an API that is already running instead.
+
+For each concurrency level, every scenario sends its requests from that many
+concurrent clients, cycling over a fixed set of IDs and filters. Streaming
+exports send at most ``--heavy-requests`` requests. The response cache is
+off unless ``--response-cache`` is given, so that the database work is
+measured. Endpoints of the OpenAPI schema that no scenario covers are
+reported.
+
+The results (throughput, p50/p95/p99 latency and error count per endpoint
+and concurrency) are written as JSON to ``--output``, then compared with the
+stored run of ``--baseline`` (BASELINE by default), if there is one: a drop
+of throughput or a rise of p95 beyond ``--threshold`` is flagged as a
+regression, and the exit status is 1. ``--save-baseline`` stores the run as
+the new baseline instead. The committed baseline comes from the default
+settings on one machine: compare runs of the same machine, and store a new
+baseline along with changes that move the numbers on purpose.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from benchmarks.common import print_table, summarize
+
+API_DIR = Path(__file__).resolve().parent.parent
+FIXTURE_DIR = API_DIR / "benchmarks" / "fixture"
+DEFAULT_OUTPUT = API_DIR / "benchmarks" / "results.json"
+BASELINE = API_DIR / "benchmarks" / "baseline.json"
+
+MOVIE_IDS = [1, 2, 50, 260, 296, 318, 356, 593, 1196, 2571, 2959, 4993, 58559]
+USER_IDS = [1, 7, 68, 182, 274, 414, 448, 474, 599, 610]
+TAGS = [(2, 60756, "funny"), (62, 2, "fantasy"), (474, 1, "pixar")]
+TITLES = ["star", "love", "the matrix", "godfather", "toy"]
+
+
+def _movie(n: int) -> int:
+    return MOVIE_IDS[n % len(MOVIE_IDS)]
+
+
+def _user(n: int) -> int:
+    return USER_IDS[n % len(USER_IDS)]
+
+
+# (name, OpenAPI path, method, request n -> (url, JSON body), heavy)
+SCENARIOS = [
+    ("health", "/", "get", lambda n: ("/", None), False),
+    (
+        "movie",
+        "/movies/{movie_id}",
+        "get",
+        lambda n: (f"/movies/{_movie(n)}", None),
+        False,
+    ),
+    (
+        "movie stats",
+        "/movies/{movie_id}/stats",
+        "get",
+        lambda n: (f"/movies/{_movie(n)}/stats", None),
+        False,
+    ),
+    (
+        "similar movies",
+        "/movies/{movie_id}/similar",
+        "get",
+        lambda n: (f"/movies/{_movie(n)}/similar?k=10", None),
+        False,
+    ),
+    ("movies", "/movies/", "get", lambda n: ("/movies/?limit=50", None), False),
+    (
+        "movies by genre",
+        "/movies/",
+        "get",
+        lambda n: ("/movies/?limit=50&genre=Comedy&genre_mode=any", None),
+        False,
+    ),
+    (
+        "movies by title",
+        "/movies/",
+        "get",
+        lambda n: (f"/movies/?limit=20&title={TITLES[n % len(TITLES)]}", None),
+        False,
+    ),
+    (
+        "movies by rating",
+        "/movies/",
+        "get",
+        lambda n: ("/movies/?limit=50&sort=avg&min_count=20", None),
+        False,
+    ),
+    (
+        "movies batch",
+        "/movies/batch",
+        "post",
+        lambda n: ("/movies/batch", {"ids": list(range(n % 50 + 1, n % 50 + 201))}),
+        False,
+    ),
+    (
+        "rating",
+        "/ratings/{user_id}/{movie_id}",
+        "get",
+        lambda n: ("/ratings/1/1", None),
+        False,
+    ),
+    (
+        "ratings by movie",
+        "/ratings/",
+        "get",
+        lambda n: (f"/ratings/?limit=100&movie_id={_movie(n)}", None),
+        False,
+    ),
+    (
+        "ratings by user",
+        "/ratings/",
+        "get",
+        lambda n: (f"/ratings/?limit=100&user_id={_user(n)}", None),
+        False,
+    ),
+    (
+        "ratings batch",
+        "/ratings/batch",
+        "post",
+        lambda n: (
+            "/ratings/batch",
+            {"keys": [{"userId": _user(n), "movieId": movie} for movie in MOVIE_IDS]},
+        ),
+        False,
+    ),
+    (
+        "tag",
+        "/tags/{user_id}/{movie_id}/{tag_text}",
+        "get",
+        lambda n: ("/tags/{}/{}/{}".format(*TAGS[n % len(TAGS)]), None),
+        False,
+    ),
+    (
+        "tags",
+        "/tags/",
+        "get",
+        lambda n: (f"/tags/?limit=100&movie_id={_movie(n)}", None),
+        False,
+    ),
+    (
+        "link",
+        "/links/{movie_id}",
+        "get",
+        lambda n: (f"/links/{_movie(n)}", None),
+        False,
+    ),
+    ("links", "/links/", "get", lambda n: ("/links/?limit=100", None), False),
+    (
+        "links batch",
+        "/links/batch",
+        "post",
+        lambda n: ("/links/batch", {"ids": MOVIE_IDS}),
+        False,
+    ),
+    (
+        "export ratings",
+        "/export/ratings",
+        "get",
+        lambda n: ("/export/ratings?format=ndjson", None),
+        True,
+    ),
+    (
+        "export tags",
+        "/export/tags",
+        "get",
+        lambda n: ("/export/tags?format=csv", None),
+        True,
+    ),
+    ("analytics", "/analytics/", "get", lambda n: ("/analytics/", None), False),
+    (
+        "user stats",
+        "/users/{user_id}/stats",
+        "get",
+        lambda n: (f"/users/{_user(n)}/stats", None),
+        False,
+    ),
+    (
+        "rating histogram",
+        "/analytics/ratings/histogram",
+        "get",
+        lambda n: (f"/analytics/ratings/histogram?movie_id={_movie(n)}", None),
+        False,
+    ),
+    (
+        "rating timeline",
+        "/analytics/ratings/timeline",
+        "get",
+        lambda n: (
+            f"/analytics/ratings/timeline?bucket=month&user_id={_user(n)}",
+            None,
+        ),
+        False,
+    ),
+    (
+        "recommendations",
+        "/users/{user_id}/recommendations",
+        "get",
+        lambda n: (f"/users/{_user(n)}/recommendations?n=10", None),
+        False,
+    ),
+    (
+        "recommendations batch",
+        "/recommendations/batch",
+        "post",
+        lambda n: ("/recommendations/batch", {"user_ids": USER_IDS, "n": 10}),
+        False,
+    ),
+    (
+        "database metrics",
+        "/metrics/database",
+        "get",
+        lambda n: ("/metrics/database", None),
+        False,
+    ),
+    (
+        "cache metrics",
+        "/metrics/cache",
+        "get",
+        lambda n: ("/metrics/cache", None),
+        False,
+    ),
+    ("metrics", "/metrics", "get", lambda n: ("/metrics", None), False),
+]
+
+
+def fixture_env(fixture_dir: Path, response_cache: bool) -> dict:
+    """Environment pointing the API at the fixture database and files."""
+    env = {
+        "DATABASE_URL": f"sqlite:///{fixture_dir / 'movies.db'}",
+        "COLUMNAR_DIR": str(fixture_dir / "columnar"),
+        "RECOMMENDER_DIR": str(fixture_dir / "recommender"),
+    }
+    if not response_cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    return env
+
+
+def build_fixture(fixture_dir: Path, data_dir: Path):
+    """Build the fixture database from the CSV files, then the recommendation
+    model when NumPy is installed."""
+    import ingest
+    import recommend
+    from sqlalchemy.orm import Session
+    from versioning import read_dataset_version
+
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    database = fixture_dir / "movies.db"
+    database.unlink(missing_ok=True)
+    engine = ingest.create_ingest_engine(f"sqlite:///{database}")
+    ingest.build_database(engine, data_dir)
+    if recommend.np is not None:
+        with Session(engine) as db:
+            version, _ = read_dataset_version(db)
+            model = recommend.train(*recommend.load_training_data(db.connection()))
+        recommend.save_model(model, str(fixture_dir / "recommender"), version)
+    engine.dispose()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario, concurrency: int, total: int
+):
+    """Send `total` requests of a scenario from `concurrency` clients."""
+    _, _, method, make_request, _ = scenario
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            url, body = make_request(n)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method.upper(), url, json=body)
+                # Streaming exports are only complete once read.
+                await response.aread()
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_all(client: httpx.AsyncClient, args) -> list[dict]:
+    openapi = (await client.get("/openapi.json")).json()
+    covered = {(path, method) for _, path, method, _, _ in SCENARIOS}
+    missing = [
+        f"{method.upper()} {path}"
+        for path, methods in openapi["paths"].items()
+        for method in methods
+        if (path, method) not in covered
+    ]
+    if missing:
+        print(f"not benchmarked: {', '.join(missing)}")
+
+    results = []
+    for concurrency in args.concurrency:
+        for scenario in SCENARIOS:
+            name, _, _, make_request, heavy = scenario
+            total = min(args.requests, args.heavy_requests) if heavy else args.requests
+            # Warm-up: connections, caches and the lazily loaded engines.
+            url, body = make_request(0)
+            await client.request(scenario[2].upper(), url, json=body)
+            latencies, errors, elapsed = await run_scenario(
+                client, scenario, concurrency, max(total, concurrency)
+            )
+            row = {"endpoint": name, "concurrency": concurrency}
+            row.update(summarize(latencies, elapsed))
+            row["errors"] = errors
+            results.append(row)
+            print(
+                f"c={concurrency:<4} {name:<22} {row['rps']:>9.1f} req/s "
+                f"p95 {row['p95_ms']:>8.2f} ms"
+                + (f"  {errors} errors" if errors else "")
+            )
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/")).is_success:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"API at {base_url} did not start")
+            await asyncio.sleep(0.2)
+
+
+async def benchmark(args, env: dict) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    timeout = httpx.Timeout(120.0)
+    if args.base_url:
+        async with httpx.AsyncClient(
+            base_url=args.base_url, limits=limits, timeout=timeout
+        ) as client:
+            return await run_all(client, args)
+
+    if args.mode == "inprocess":
+        os.environ.update(env)
+        import main
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://api", timeout=timeout
+        ) as client:
+            return await run_all(client, args)
+
+    base_url = f"http://127.0.0.1:{free_port()}"
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            base_url.rsplit(":", 1)[1],
+            "--log-level",
+            "warning",
+        ],
+        cwd=API_DIR,
+        env={**os.environ, **env},
+    )
+    try:
+        await wait_until_up(base_url)
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=timeout
+        ) as client:
+            return await run_all(client, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=API_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    """Rows of the changes against the baseline, with a regression flag."""
+    before = {(row["endpoint"], row["concurrency"]): row for row in baseline["results"]}
+    rows = []
+    for row in results:
+        old = before.get((row["endpoint"], row["concurrency"]))
+        if old is None:
+            continue
+        rps_change = row["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        p95_change = row["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        regression = rps_change < -threshold or p95_change > threshold
+        rows.append(
+            {
+                "endpoint": row["endpoint"],
+                "concurrency": row["concurrency"],
+                "rps": row["rps"],
+                "rps_change_%": rps_change * 100,
+                "p95_ms": row["p95_ms"],
+                "p95_change_%": p95_change * 100,
+                "status": "REGRESSION" if regression else "ok",
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["inprocess", "server"], default="server")
+    parser.add_argument("--base-url", help="benchmark an API already running there")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--heavy-requests", type=int, default=5)
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--fixture-dir", type=Path, default=FIXTURE_DIR)
+    parser.add_argument(
+        "--data-dir", type=Path, default=API_DIR.parent / "data", help="CSV files"
+    )
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the fixture")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if not args.base_url and (
+        args.rebuild or not (args.fixture_dir / "movies.db").exists()
+    ):
+        build_fixture(args.fixture_dir, args.data_dir)
+
+    env = fixture_env(args.fixture_dir, args.response_cache)
+    results = asyncio.run(benchmark(args, env))
+    run = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "external" if args.base_url else args.mode,
+            "requests": args.requests,
+            "response_cache": args.response_cache,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(run, indent=2) + "\n")
+    print(f"results written to {args.output}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        rows = compare(results, baseline, args.threshold)
+        print(f"\ncompared with {args.baseline} ({baseline['meta'].get('revision')})")
+        print_table(
+            rows,
+            [
+                "endpoint",
+                "concurrency",
+                "rps",
+                "rps_change_%",
+                "p95_ms",
+                "p95_change_%",
+                "status",
+            ],
+        )
+        regressions = [row for row in rows if row["status"] != "ok"]
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Throughput of the recommendation scoring, one user at a time vs batched.
+
+Usage (from the ``api`` directory, after ``python recommend.py``)::
+
+    python -m benchmarks.recommendations [--users 20000] [--batch-sizes 1 64 512 4096]
+
+Users are drawn from the trained model (with repetition) and scored with
+``Recommender.recommend`` (batch size 1: one matrix-vector product per user)
+or ``Recommender.recommend_many`` (one matrix product per batch), keeping
+the top 10 unseen movies of each. Titles and HTTP are left out.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from benchmarks.common import print_table
+from recommend import Recommender
+
+
+def main(users: int, batch_sizes: list[int], n: int):
+    model = Recommender.open()
+    if model is None:
+        raise SystemExit("No model: run python recommend.py first")
+    # Copied in memory so that the page faults of the mapping are not timed.
+    model.users = np.array(model.users)
+    model.movies = np.array(model.movies)
+    user_ids = np.random.default_rng(0).choice(model.user_ids, size=users)
+
+    rows = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        if batch_size == 1:
+            for user_id in user_ids:
+                model.recommend(int(user_id), n)
+        else:
+            for offset in range(0, users, batch_size):
+                model.recommend_many(user_ids[offset : offset + batch_size], n)
+        elapsed = time.perf_counter() - start
+        rows.append(
+            {
+                "batch_size": batch_size,
+                "users": users,
+                "seconds": elapsed,
+                "users_per_s": users / elapsed,
+                "ms_per_user": elapsed / users * 1000,
+            }
+        )
+    print(
+        f"{len(model.user_ids)} users x {len(model.movie_ids)} movies, "
+        f"{model.users.shape[1]} dimensions, top {n}"
+    )
+    print_table(rows, ["batch_size", "users", "seconds", "users_per_s", "ms_per_user"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 64, 512, 4096]
+    )
+    parser.add_argument("--n", type=int, default=10)
+    args = parser.parse_args()
+    main(args.users, args.batch_sizes, args.n)
@@ -0,0 +1,102 @@
+"""Cost per 1,000 rows of the list responses, model path vs row-tuple path.
+
+Usage (from the ``api`` directory, against a database built by ingest.py)::
+
+    python -m benchmarks.serialization [--rows 1000] [--repeat 50]
+
+For each list endpoint, one page of `rows` rows is read and encoded the two
+ways a response can be produced:
+
+- models: the ORM entities, validated into the response_model and dumped
+  to JSON the way FastAPI handles a returned value (``from_attributes``
+  validation, ``mode="json"`` serialization, then ``json.dumps``);
+- rows: the column tuples of the list helpers, encoded by
+  ``fast_json.rows_response``.
+
+The fetch (database read and row or entity construction) and the encoding
+are timed separately, and reported per 1,000 rows.
+"""
+
+import argparse
+import json
+import time
+
+import schemas
+from benchmarks.common import print_table
+from database import SessionLocal
+from fast_json import orjson, rows_response
+from models import Link, Movie, Rating, Tag
+from pydantic import TypeAdapter
+from query_helpers import LINK_COLUMNS, MOVIE_COLUMNS, RATING_COLUMNS, TAG_COLUMNS
+
+# (endpoint, ORM entity, list helper columns, response model)
+ENDPOINTS = [
+    ("/movies/", Movie, MOVIE_COLUMNS, schemas.MovieSimple),
+    ("/ratings/", Rating, RATING_COLUMNS, schemas.RatingSimple),
+    ("/tags/", Tag, TAG_COLUMNS, schemas.TagSimple),
+    ("/links/", Link, LINK_COLUMNS, schemas.LinkSimple),
+]
+
+
+def encode_models(entities: list, adapter: TypeAdapter) -> bytes:
+    content = adapter.dump_python(
+        adapter.validate_python(entities, from_attributes=True), mode="json"
+    )
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def best_ms(call, repeat: int) -> float:
+    """Fastest of `repeat` runs of call(), in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main(rows: int, repeat: int):
+    results = []
+    with SessionLocal() as db:
+        for endpoint, entity, columns, model in ENDPOINTS:
+            adapter = TypeAdapter(list[model])
+
+            def fetch_entities():
+                entities = db.query(entity).limit(rows).all()
+                db.expunge_all()
+                return entities
+
+            def fetch_rows():
+                return db.query(*columns).limit(rows).all()
+
+            entities, tuples = fetch_entities(), fetch_rows()
+            assert json.loads(encode_models(entities, adapter)) == json.loads(
+                rows_response(tuples, model).body
+            )
+            per_k = 1000 / len(tuples)
+            for path, fetch, encode in [
+                ("models", fetch_entities, lambda: encode_models(entities, adapter)),
+                ("rows", fetch_rows, lambda: rows_response(tuples, model)),
+            ]:
+                fetch_ms = best_ms(fetch, repeat) * per_k
+                encode_ms = best_ms(encode, repeat) * per_k
+                results.append(
+                    {
+                        "endpoint": endpoint,
+                        "path": path,
+                        "fetch_ms": fetch_ms,
+                        "encode_ms": encode_ms,
+                        "total_ms": fetch_ms + encode_ms,
+                    }
+                )
+    print(f"per 1,000 rows, pages of {rows}, best of {repeat}")
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print_table(results, ["endpoint", "path", "fetch_ms", "encode_ms", "total_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,94 @@
+"""Build time and memory of the similar-movies index as the ratings grow.
+
+Usage (from the ``api`` directory, against a database built by ingest.py)::
+
+    python -m benchmarks.similarity_build [--scales 0.25 0.5 1 2 4] [--k 20]
+
+Each scale below 1 samples that fraction of the ratings; scales above 1 add
+copies of every user under new ids, with ratings shifted by up to half a
+star, so that the matrix gets wider and denser like a larger dataset. The
+timing covers the matrix construction and the top-k computation of every
+movie for one metric (not the database writes); the memory is the peak of
+the allocations traced during the build.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from benchmarks.common import print_table
+from database import engine
+from similarity import MIN_RATINGS, load_ratings, rating_matrix, top_k_neighbors
+
+
+def scaled_ratings(movie_ids, user_ids, ratings, scale: float, rng):
+    """The ratings sampled down, or grown with shifted copies of the users."""
+    if scale <= 1:
+        keep = rng.random(len(ratings)) < scale
+        return movie_ids[keep], user_ids[keep], ratings[keep]
+    copies = int(np.ceil(scale))
+    offset = user_ids.max() + 1
+    shifts = rng.choice([-0.5, 0.0, 0.5], size=(copies, len(ratings)))
+    return (
+        np.tile(movie_ids, copies),
+        np.concatenate([user_ids + copy * offset for copy in range(copies)]),
+        np.concatenate(
+            [ratings]
+            + [np.clip(ratings + shifts[copy], 0.5, 5.0) for copy in range(1, copies)]
+        ).astype("float32"),
+    )
+
+
+def build(movie_ids, user_ids, ratings, metric: str, k: int) -> tuple[int, int]:
+    """Compute every movie's neighbors; returns (movies, neighbor pairs)."""
+    movies, matrix = rating_matrix(movie_ids, user_ids, ratings, metric)
+    candidates = np.bincount(np.searchsorted(movies, movie_ids)) >= MIN_RATINGS
+    pairs = sum(
+        len(neighbors)
+        for _, neighbors, _ in top_k_neighbors(
+            matrix, np.arange(len(movies)), k, candidates
+        )
+    )
+    return len(movies), pairs
+
+
+def main(scales: list[float], k: int, metric: str):
+    with engine.connect() as conn:
+        base = load_ratings(conn)
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for scale in scales:
+        movie_ids, user_ids, ratings = scaled_ratings(*base, scale, rng)
+        tracemalloc.start()
+        start = time.perf_counter()
+        movies, pairs = build(movie_ids, user_ids, ratings, metric, k)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append(
+            {
+                "scale": scale,
+                "ratings": len(ratings),
+                "users": len(np.unique(user_ids)),
+                "movies": movies,
+                "pairs": pairs,
+                "build_s": elapsed,
+                "peak_mb": peak / 2**20,
+            }
+        )
+    print_table(
+        rows, ["scale", "ratings", "users", "movies", "pairs", "build_s", "peak_mb"]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.25, 0.5, 1, 2, 4])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument(
+        "--metric", choices=["cosine", "adjusted_cosine"], default="cosine"
+    )
+    args = parser.parse_args()
+    main(args.scales, args.k, args.metric)
@@ -0,0 +1,31 @@
+"""Caches for results that only change when the dataset is reloaded."""
+
+import asyncio
+
+from versioning import DatasetVersionWatcher, dataset_version
+
+
+class VersionedValue:
+    """A value computed at most once per dataset version.
+
+    `await compute(db)` runs on the first access and again only after the
+    dataset version changed. Concurrent first accesses wait for a single
+    computation.
+    """
+
+    def __init__(self, compute, watcher: DatasetVersionWatcher = dataset_version):
+        self.compute = compute
+        self.watcher = watcher
+        self._version = None
+        self._value = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, db):
+        """Return the value for the current dataset version."""
+        version = await self.watcher.current(db)
+        if self._version != version:
+            async with self._lock:
+                if self._version != version:
+                    self._value = await self.compute(db)
+                    self._version = version
+        return self._value
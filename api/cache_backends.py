@@ -0,0 +1,217 @@
+"""Storage backends of the response cache, and request coalescing.
+
+With several uvicorn workers, an in-process cache is cold in each worker and
+a hot response is computed once per worker. Setting CACHE_BACKEND=redis
+stores the cached responses in Redis (REDIS_URL) so that the workers share
+them; the default, CACHE_BACKEND=memory, keeps them in a per-process LRU.
+
+Identical requests arriving while their response is being computed wait for
+that single computation (`SingleFlight`) instead of each querying the
+database. With a shared backend, a short-lived lock key extends this across
+workers: only its holder computes, the others wait for the value to appear.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "cinema:")
+
+# How long a computation may hold the lock of its key, and how often the
+# workers waiting for it look for the value.
+LOCK_TIMEOUT = 10.0
+LOCK_POLL_INTERVAL = 0.01
+
+
+class CacheBackend:
+    """Interface of the cache storages: bytes values with a time to live."""
+
+    name = "abstract"
+    # Whether other workers see the entries (and need the cross-worker lock).
+    shared = False
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set `key` only if it is absent; returns whether it was set."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU of at most `max_size` entries."""
+
+    name = "memory"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def _get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get(self, key: str) -> bytes | None:
+        return self._get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if self._get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    async def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "evictions": self.evictions,
+        }
+
+
+class RedisBackend(CacheBackend):
+    """Entries shared by every worker, in Redis or any server speaking its
+    protocol. `client` is a ``redis.asyncio`` client (or a
+    ``fakeredis.aioredis.FakeRedis`` in tests); keys are prefixed so that
+    clear() only removes the cache's own keys."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, client, prefix: str = REDIS_KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL, prefix: str = REDIS_KEY_PREFIX):
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the redis package (pip install redis)"
+            ) from e
+        return cls(redis.asyncio.Redis.from_url(url), prefix)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(
+            await self.client.set(self.prefix + key, value, px=int(ttl * 1000), nx=True)
+        )
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def stats(self) -> dict:
+        return {"backend": self.name, "prefix": self.prefix}
+
+
+def create_backend(name: str = CACHE_BACKEND, max_size: int = 10000) -> CacheBackend:
+    """The backend selected by CACHE_BACKEND."""
+    if name == "memory":
+        return MemoryBackend(max_size)
+    if name == "redis":
+        return RedisBackend.from_url()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers of the same
+    key share its result (or its exception)."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, compute):
+        """Return `await compute()`, or the result of the running call."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved when nobody else was waiting on it.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+
+async def wait_for_lock(backend: CacheBackend, key: str):
+    """Take the cross-worker lock of `key`, or wait until its holder stored
+    the value. Returns (locked, value): the value is set when another worker
+    computed it; neither is when the wait timed out."""
+    lock_key = f"lock:{key}"
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        # Look for the value first: the holder stores it before unlocking.
+        value = await backend.get(key)
+        if value is not None:
+            return False, value
+        if await backend.add(lock_key, b"1", LOCK_TIMEOUT):
+            # The previous holder may have stored it just before unlocking.
+            value = await backend.get(key)
+            if value is not None:
+                await backend.delete(lock_key)
+                return False, value
+            return True, None
+        if time.monotonic() >= deadline:
+            return False, None
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+
+async def release_lock(backend: CacheBackend, key: str):
+    await backend.delete(f"lock:{key}")
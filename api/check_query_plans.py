@@ -0,0 +1,140 @@
+"""Check that the filtered query helpers are served by an index.
+
+Usage (from the ``api`` directory)::
+
+    python check_query_plans.py [--database-url sqlite:///./movies.db]
+
+Each helper is called once while its SQL is captured, then the captured
+statement is run through SQLite's ``EXPLAIN QUERY PLAN``. The command exits
+with status 1 if any plan falls back to a full ``SCAN`` of a table.
+"""
+
+import argparse
+import sys
+
+import query_helpers as helpers
+from database import DATABASE_URL
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# (label, helper call) for every filter path the API exposes.
+CHECKS = [
+    ("get_movie", lambda db: helpers.get_movie(db, movie_id=1)),
+    ("get_rating", lambda db: helpers.get_rating(db, user_id=1, movie_id=1)),
+    ("get_ratings(movie_id)", lambda db: helpers.get_ratings(db, movie_id=1)),
+    ("get_ratings(user_id)", lambda db: helpers.get_ratings(db, user_id=1)),
+    (
+        "get_ratings(movie_id, min_rating)",
+        lambda db: helpers.get_ratings(db, movie_id=1, min_rating=4.0),
+    ),
+    (
+        "get_ratings(movie_id, user_id)",
+        lambda db: helpers.get_ratings(db, movie_id=1, user_id=1),
+    ),
+    (
+        "get_ratings(after)",
+        lambda db: helpers.get_ratings(db, after=(300, 1)),
+    ),
+    (
+        "get_ratings(movie_id, after)",
+        lambda db: helpers.get_ratings(db, movie_id=1, after=(300, 1)),
+    ),
+    ("get_tag", lambda db: helpers.get_tag(db, 2, 60756, "funny")),
+    ("get_tags(movie_id)", lambda db: helpers.get_tags(db, movie_id=1)),
+    ("get_tags(user_id)", lambda db: helpers.get_tags(db, user_id=2)),
+    (
+        "get_tags(movie_id, after)",
+        lambda db: helpers.get_tags(db, movie_id=1, after=(300, 1, "pixar")),
+    ),
+    ("get_link", lambda db: helpers.get_link(db, movie_id=1)),
+    ("get_movies(after)", lambda db: helpers.get_movies(db, after=(5000,))),
+    (
+        "get_movies(genres)",
+        lambda db: helpers.get_movies(db, genres=["Film-Noir", "crime"]),
+    ),
+    (
+        "get_movies(genres, all)",
+        lambda db: helpers.get_movies(db, genres=["Crime", "Drama"], genre_mode="all"),
+    ),
+    (
+        "get_movies(sort=avg, min_count)",
+        lambda db: helpers.get_movies(db, sort="avg", min_count=50, after=(4.5, 318)),
+    ),
+    (
+        "get_movies(sort=count)",
+        lambda db: helpers.get_movies(db, sort="count", after=(100, 1)),
+    ),
+    ("get_movie_stats", lambda db: helpers.get_movie_stats(db, movie_id=1)),
+    (
+        "get_similar_movies",
+        lambda db: helpers.get_similar_movies(db, movie_id=1, metric="cosine"),
+    ),
+    ("get_links(after)", lambda db: helpers.get_links(db, after=(5000,))),
+    (
+        "get_movies_by_ids",
+        lambda db: helpers.get_movies_by_ids(db, movie_ids=[1, 2, 3]),
+    ),
+    (
+        "get_ratings_by_keys",
+        lambda db: helpers.get_ratings_by_keys(db, keys=[(1, 1), (1, 3)]),
+    ),
+]
+
+
+def capture_statements(engine, call):
+    """Run call(session) and return the (sql, parameters) it executed."""
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        with Session(engine) as db:
+            call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    return statements
+
+
+def explain(engine, statement: str, parameters) -> list[str]:
+    """Return the detail lines of SQLite's query plan for a statement."""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+
+def check_plans(engine) -> list[str]:
+    """Print the plan of every check and return the labels that scan."""
+    failures = []
+    for label, call in CHECKS:
+        for statement, parameters in capture_statements(engine, call):
+            plan = explain(engine, statement, parameters)
+            # "SCAN n CONSTANT ROWS" reads a VALUES list, not a table.
+            scans = [
+                line
+                for line in plan
+                if line.startswith("SCAN") and not line.endswith("CONSTANT ROWS")
+            ]
+            status = "FAIL" if scans else "ok"
+            print(f"[{status}] {label}: {' | '.join(plan)}")
+            if scans:
+                failures.append(label)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "sqlite":
+        sys.exit("EXPLAIN QUERY PLAN checks only run against SQLite.")
+    failures = check_plans(engine)
+    if failures:
+        sys.exit(f"{len(failures)} helper(s) fall back to a scan: {failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Columnar copy of the ratings table, for vectorized aggregates.
+
+The ratings fit in a few typed NumPy arrays (25 bytes per rating), on
+which per-movie and per-user aggregates, histograms and timelines are a few
+vectorized operations instead of a SQL aggregation materialized row by row.
+
+The arrays are sorted by (movieId, userId) and saved as ``.npy`` files in
+COLUMNAR_DIR, along with CSR-style offsets: the ratings of the i-th movie of
+``movie_index`` are rows ``movie_offsets[i]:movie_offsets[i + 1]``, and
+those of the i-th user of ``user_index`` are rows
+``user_order[user_offsets[i]:user_offsets[i + 1]]``. The API memory-maps the
+files, so the workers share their pages. When they were written for an older
+dataset version (see versioning.py), ColumnarCache rebuilds them in a thread,
+and the endpoints answer through SQL until the new files are mapped.
+
+The engine is optional: it is used when COLUMNAR_ENGINE is set and NumPy is
+installed; otherwise the same endpoints run their SQL helpers.
+
+Build the files ahead of time with ``python columnar.py``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from database import DATABASE_URL, SessionLocal, logger
+from models import Rating
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from versioning import dataset_version, read_dataset_version
+
+try:
+    import numpy as np
+except ImportError:  # the columnar engine is optional
+    np = None
+
+COLUMNAR_ENGINE = os.getenv("COLUMNAR_ENGINE", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)
+COLUMNAR_DIR = os.getenv("COLUMNAR_DIR", "./columnar")
+
+# Saved arrays and their dtypes. Ratings go by 0.5 steps and are stored
+# doubled, as small integers.
+ARRAYS = {
+    "movie_id": "int32",
+    "user_id": "int32",
+    "rating_x2": "uint8",
+    "timestamp": "int64",
+    "movie_index": "int32",
+    "movie_offsets": "int64",
+    "user_index": "int32",
+    "user_offsets": "int64",
+    "user_order": "int64",
+}
+
+META_FILE = "meta.json"
+
+# Ratings read from the database per chunk while building the files.
+BUILD_CHUNK_SIZE = 100_000
+
+# NumPy datetime units of the timeline buckets.
+TIMELINE_UNITS = {"year": "Y", "month": "M", "day": "D"}
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("The columnar engine requires numpy (pip install numpy)")
+
+
+def _csr(keys):
+    """Distinct sorted keys and the offsets of their runs in `keys`."""
+    index, starts = np.unique(keys, return_index=True)
+    return index, np.append(starts, len(keys)).astype("int64")
+
+
+def _save(directory: str, name: str, array):
+    # Written aside then renamed: processes mapping the old file keep it.
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".npy")
+    with os.fdopen(fd, "wb") as file:
+        np.save(file, array)
+    os.replace(path, os.path.join(directory, f"{name}.npy"))
+
+
+def build_columnar(conn, directory: str = COLUMNAR_DIR, version: int = 0) -> int:
+    """Write the ratings of `conn` as columnar files; returns the row count."""
+    _require_numpy()
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    result = conn.execute(
+        select(Rating.movieId, Rating.userId, Rating.rating, Rating.timestamp)
+        .order_by(Rating.movieId, Rating.userId)
+        .execution_options(yield_per=BUILD_CHUNK_SIZE)
+    )
+    # Each chunk goes straight into typed arrays: only BUILD_CHUNK_SIZE rows
+    # are ever held as Python tuples.
+    chunks = {name: [] for name in ("movie_id", "user_id", "rating_x2", "timestamp")}
+    for rows in result.partitions():
+        movie_id, user_id, rating, timestamp = zip(*rows)
+        chunks["movie_id"].append(np.array(movie_id, dtype="int32"))
+        chunks["user_id"].append(np.array(user_id, dtype="int32"))
+        chunks["rating_x2"].append(
+            np.rint(np.array(rating, dtype="float64") * 2).astype("uint8")
+        )
+        chunks["timestamp"].append(np.array(timestamp, dtype="int64"))
+    arrays = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=ARRAYS[name])
+        for name, parts in chunks.items()
+    }
+    count = len(arrays["movie_id"])
+    arrays["movie_index"], arrays["movie_offsets"] = _csr(arrays["movie_id"])
+    # Each user's ratings in time order.
+    user_order = np.lexsort((arrays["timestamp"], arrays["user_id"]))
+    arrays["user_order"] = user_order
+    arrays["user_index"], arrays["user_offsets"] = _csr(arrays["user_id"][user_order])
+
+    for name, dtype in ARRAYS.items():
+        _save(directory, name, arrays[name].astype(dtype, copy=False))
+    with open(meta_path, "w") as file:
+        json.dump({"version": version, "rows": count}, file)
+    return count
+
+
+class ColumnarRatings:
+    """The memory-mapped arrays, and the aggregates computed on them."""
+
+    def __init__(self, arrays: dict, version: int):
+        self.version = version
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    @classmethod
+    def open(cls, directory: str = COLUMNAR_DIR) -> "ColumnarRatings | None":
+        """Map the files of `directory`, or None if they are incomplete."""
+        _require_numpy()
+        try:
+            with open(os.path.join(directory, META_FILE)) as file:
+                meta = json.load(file)
+            arrays = {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in ARRAYS
+            }
+        except FileNotFoundError:
+            return None
+        return cls(arrays, meta["version"])
+
+    def __len__(self) -> int:
+        return len(self.movie_id)
+
+    @staticmethod
+    def _run(index, offsets, key) -> slice | None:
+        position = np.searchsorted(index, key)
+        if position == len(index) or index[position] != key:
+            return None
+        return slice(int(offsets[position]), int(offsets[position + 1]))
+
+    def rows(self, movie_id: int | None = None, user_id: int | None = None):
+        """Row positions (a slice or an index array) of the matching ratings;
+        None when there are none."""
+        if movie_id is not None:
+            rows = self._run(self.movie_index, self.movie_offsets, movie_id)
+            if rows is None or user_id is None:
+                return rows
+            # A movie's ratings are sorted by user: at most one matches.
+            users = self.user_id[rows]
+            position = np.searchsorted(users, user_id)
+            if position == len(users) or users[position] != user_id:
+                return None
+            return slice(rows.start + int(position), rows.start + int(position) + 1)
+        if user_id is not None:
+            rows = self._run(self.user_index, self.user_offsets, user_id)
+            return None if rows is None else self.user_order[rows]
+        return slice(0, len(self))
+
+    @staticmethod
+    def _histogram(ratings_x2) -> dict[str, int]:
+        counts = np.bincount(ratings_x2, minlength=11)
+        return {f"{step / 2:.1f}": int(counts[step]) for step in range(1, 11)}
+
+    def _stats(self, rows) -> dict:
+        ratings_x2 = self.rating_x2[rows]
+        timestamps = self.timestamp[rows]
+        return {
+            "rating_count": len(ratings_x2),
+            "rating_mean": float(ratings_x2.mean()) / 2,
+            "histogram": self._histogram(ratings_x2),
+            "first_rated": int(timestamps.min()),
+            "last_rated": int(timestamps.max()),
+        }
+
+    def user_stats(self, user_id: int) -> dict | None:
+        """Count, mean, histogram and first/last timestamps of a user."""
+        rows = self.rows(user_id=user_id)
+        return None if rows is None else {"userId": user_id, **self._stats(rows)}
+
+    def histogram(self, movie_id: int | None = None, user_id: int | None = None):
+        """Number of ratings per rating value, for a movie and/or a user."""
+        rows = self.rows(movie_id, user_id)
+        ratings_x2 = self.rating_x2[rows] if rows is not None else self.rating_x2[:0]
+        return {
+            "movieId": movie_id,
+            "userId": user_id,
+            "rating_count": len(ratings_x2),
+            "histogram": self._histogram(ratings_x2),
+        }
+
+    def timeline(
+        self,
+        bucket: str = "year",
+        movie_id: int | None = None,
+        user_id: int | None = None,
+    ):
+        """Number and mean of ratings per year, month or day (UTC)."""
+        rows = self.rows(movie_id, user_id)
+        timestamps = self.timestamp[rows] if rows is not None else self.timestamp[:0]
+        periods = []
+        # An empty dataset has no first period to count from.
+        if len(timestamps):
+            unit = TIMELINE_UNITS[bucket]
+            dates = timestamps.astype("datetime64[s]").astype(f"datetime64[{unit}]")
+            # Periods as consecutive integers: counted in one pass, no sort.
+            keys = dates.astype("int64")
+            first = keys.min()
+            keys -= first
+            counts = np.bincount(keys)
+            sums = np.bincount(keys, weights=self.rating_x2[rows])
+            (present,) = np.nonzero(counts)
+            periods = [
+                {
+                    "period": str(np.datetime64(int(first + offset), unit)),
+                    "rating_count": int(counts[offset]),
+                    "rating_mean": float(sums[offset]) / int(counts[offset]) / 2,
+                }
+                for offset in present
+            ]
+        return {
+            "bucket": bucket,
+            "movieId": movie_id,
+            "userId": user_id,
+            "periods": periods,
+        }
+
+
+def load_columnar(db: Session, directory: str = COLUMNAR_DIR) -> ColumnarRatings:
+    """Map the columnar files, rebuilding them first if they are missing or
+    were built for another dataset version."""
+    version, _ = read_dataset_version(db)
+    columnar = ColumnarRatings.open(directory)
+    if columnar is None or columnar.version != version:
+        build_columnar(db.connection(), directory, version)
+        columnar = ColumnarRatings.open(directory)
+    return columnar
+
+
+class ColumnarCache:
+    """The columnar ratings of the current dataset version, for the API.
+
+    Building the files reads and sorts every rating: instead of blocking the
+    request that noticed a new dataset version, load_columnar runs in a
+    thread, on a session of its own. Until the new files are mapped, get()
+    returns None and the endpoints answer through SQL; the old arrays are not
+    served, as their aggregates would be cached under the new version.
+    """
+
+    def __init__(
+        self,
+        directory: str = COLUMNAR_DIR,
+        session_factory=SessionLocal,
+        watcher=dataset_version,
+    ):
+        self.directory = directory
+        self.session_factory = session_factory
+        self.watcher = watcher
+        self._value = None
+        self._build = None
+        self._failed_version = None
+
+    async def get(self, db) -> ColumnarRatings | None:
+        """The arrays of the current dataset version, or None while they are
+        being built (in the background, started by this call if need be)."""
+        version = await self.watcher.current(db)
+        if self._value is not None and self._value.version == version:
+            return self._value
+        if self._build is None and self._failed_version != version:
+            self._build = asyncio.create_task(asyncio.to_thread(self._load))
+            self._build.add_done_callback(lambda task: self._built(task, version))
+        return None
+
+    def _load(self) -> ColumnarRatings:
+        with self.session_factory() as db:
+            return load_columnar(db, self.directory)
+
+    def _built(self, task: asyncio.Task, version: int):
+        self._build = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # Not retried on every request: the next dataset version will.
+            self._failed_version = version
+            logger.error(
+                "Building the columnar ratings failed", exc_info=task.exception()
+            )
+            return
+        self._value = task.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar ratings files.")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--directory", default=COLUMNAR_DIR)
+    args = parser.parse_args()
+    with Session(create_engine(args.database_url)) as db:
+        version, _ = read_dataset_version(db)
+        rows = build_columnar(db.connection(), args.directory, version)
+    print(f"{rows} ratings written to {args.directory} (dataset version {version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,185 @@
 """database configuration and connection handling"""
 
-from sqlalchemy import create_engine
+import logging
+import os
+from importlib.util import find_spec
+
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./movies.db"
+logger = logging.getLogger("uvicorn.error")
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./movies.db")
+
+# Async drivers used by the API for each backend of DATABASE_URL; asyncpg
+# comes with the "postgres" extra.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+class DatabaseSettings:
+    """Engine, pool and SQLite settings, read from the environment.
+
+    Pool settings (all backends):
+        DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+        (seconds, -1 to never recycle) and DB_POOL_PRE_PING.
+    SQLite settings, applied as PRAGMAs on every new connection:
+        SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE (bytes),
+        SQLITE_CACHE_SIZE (pages, or KiB when negative), SQLITE_TEMP_STORE.
+        SQLITE_READ_ONLY opens the file read-only and SQLITE_IMMUTABLE also
+        tells SQLite that it never changes (no locking at all); both skip
+        the journal and synchronous PRAGMAs, which need write access.
+    """
+
+    def __init__(self, database_url: str = DATABASE_URL):
+        self.database_url = database_url
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+        self.pool_pre_ping = _env_bool("DB_POOL_PRE_PING", False)
+        self.sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 2**20)))
+        self.sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+        self.sqlite_temp_store = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+        self.sqlite_read_only = _env_bool("SQLITE_READ_ONLY", False)
+        self.sqlite_immutable = _env_bool("SQLITE_IMMUTABLE", False)
+
+    @property
+    def is_sqlite(self) -> bool:
+        return make_url(self.database_url).get_backend_name() == "sqlite"
+
+    @property
+    def is_memory(self) -> bool:
+        return self.is_sqlite and make_url(self.database_url).database in (
+            None,
+            "",
+            ":memory:",
+        )
+
+    def url(self) -> str:
+        """The sync URL, switched to SQLite's URI mode when read-only."""
+        url = make_url(self.database_url)
+        if self.is_sqlite and not self.is_memory:
+            if self.sqlite_read_only or self.sqlite_immutable:
+                query = {"mode": "ro", "uri": "true"}
+                if self.sqlite_immutable:
+                    query["immutable"] = "1"
+                url = url.set(database=f"file:{url.database}").update_query_dict(query)
+        return url.render_as_string(hide_password=False)
+
+    def engine_options(self) -> dict:
+        """Keyword arguments for create_engine / create_async_engine."""
+        options = {"pool_pre_ping": self.pool_pre_ping}
+        if not self.is_memory:
+            options.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+            )
+        return options
+
+    def pragmas(self) -> list[tuple[str, object]]:
+        """The PRAGMAs to run on each new SQLite connection."""
+        pragmas = []
+        if not (self.sqlite_read_only or self.sqlite_immutable):
+            pragmas += [
+                ("journal_mode", self.sqlite_journal_mode),
+                ("synchronous", self.sqlite_synchronous),
+            ]
+        pragmas += [
+            ("mmap_size", self.sqlite_mmap_size),
+            ("cache_size", self.sqlite_cache_size),
+            ("temp_store", self.sqlite_temp_store),
+        ]
+        return pragmas
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    def as_dict(self) -> dict:
+        """The settings, without credentials, for logs and metrics."""
+        settings = {
+            "database_url": make_url(self.url()).render_as_string(hide_password=True),
+            **self.engine_options(),
+        }
+        if self.is_sqlite:
+            settings.update(
+                read_only=self.sqlite_read_only,
+                immutable=self.sqlite_immutable,
+                pragmas=dict(self.pragmas()),
+            )
+        return settings
+
+
+def to_async_url(url: str) -> str:
+    """Turn a sync database URL into the same URL on the async driver."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    driver = ASYNC_DRIVERS[backend]
+    if find_spec(driver) is None:
+        raise ImportError(
+            f"{backend} databases are served through {driver}, which is not "
+            "installed (see the project's optional dependencies)"
+        )
+    url = url.set(drivername=f"{backend}+{driver}")
+    return url.render_as_string(hide_password=False)
+
+
+def apply_sqlite_pragmas(engine, settings: DatabaseSettings):
+    """Run the configured PRAGMAs on every new connection of a sync engine."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.pragmas():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def read_sqlite_pragmas(conn) -> dict:
+    """The PRAGMA values actually in effect on a SQLite connection."""
+    return {
+        name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in (
+            "journal_mode",
+            "synchronous",
+            "mmap_size",
+            "cache_size",
+            "temp_store",
+        )
+    }
+
+
+settings = DatabaseSettings()
+
+engine = create_engine(
+    settings.url(),
+    connect_args={"check_same_thread": False} if settings.is_sqlite else {},
+    **settings.engine_options(),
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the FastAPI endpoints; the sync engine remains for the scripts
+# (ingest, migrations, checks).
+async_engine = create_async_engine(
+    to_async_url(settings.url()), **settings.engine_options()
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+if settings.is_sqlite:
+    apply_sqlite_pragmas(engine, settings)
+    apply_sqlite_pragmas(async_engine.sync_engine, settings)
+
 
 Base = declarative_base()
 
@@ -18,4 +189,4 @@ Base = declarative_base()
         with SessionLocal() as session:
             print("Database connection successful!")
     except Exception as e:
-        print(f"Database connection failed: {e}") """
\ No newline at end of file
+        print(f"Database connection failed: {e}") """
@@ -0,0 +1,79 @@
+"""Genre normalization: Movie.genres strings into the genre tables.
+
+MovieLens stores a movie's genres as one pipe-joined string
+("Adventure|Animation|Children"). Filtering on that string needs a
+substring match that no index can serve and that confuses genres sharing a
+substring ("Film-Noir" / "Noir"). The ``genres`` and ``movie_genres`` tables
+hold the same information in a form the filters can look up exactly.
+"""
+
+from models import Genre, Movie, MovieGenre
+from sqlalchemy import delete, exists, false, func, insert, select, union
+
+NO_GENRES = "(no genres listed)"
+BATCH_SIZE = 50_000
+
+
+def split_genres(genres: str | None) -> list[str]:
+    """Split a pipe-joined genres string, dropping MovieLens' placeholder."""
+    if not genres:
+        return []
+    return [name for name in genres.split("|") if name and name != NO_GENRES]
+
+
+def rebuild_genre_index(conn, batch_size: int = BATCH_SIZE) -> int:
+    """Refill genres and movie_genres from the movies table.
+
+    Returns the number of (genre, movie) pairs written.
+    """
+    conn.execute(delete(MovieGenre))
+    conn.execute(delete(Genre))
+
+    genre_ids: dict[str, int] = {}
+    pairs = []
+    for movie_id, genres in conn.execute(select(Movie.movieId, Movie.genres)):
+        for name in split_genres(genres):
+            genre_id = genre_ids.setdefault(name, len(genre_ids) + 1)
+            pairs.append({"genreId": genre_id, "movieId": movie_id})
+
+    if genre_ids:
+        conn.execute(
+            insert(Genre),
+            [{"genreId": id_, "name": name} for name, id_ in genre_ids.items()],
+        )
+    for start in range(0, len(pairs), batch_size):
+        conn.execute(insert(MovieGenre), pairs[start : start + batch_size])
+    return len(pairs)
+
+
+def movies_with_genres(names: list[str], match_all: bool = False):
+    """Subquery of the movieIds having any (or all) of the given genres.
+
+    Genre names are matched exactly, ignoring case. MovieLens' placeholder
+    "(no genres listed)" has no genres row: it stands for the movies without
+    any genre, which no other genre can be combined with in "all" mode.
+    """
+    names = sorted({name.lower() for name in names})
+    without_genres = NO_GENRES.lower() in names
+    if without_genres:
+        names.remove(NO_GENRES.lower())
+        if names and match_all:
+            return select(Movie.movieId).where(false())
+        untagged = select(Movie.movieId).where(
+            ~exists().where(MovieGenre.movieId == Movie.movieId)
+        )
+        if not names:
+            return untagged
+
+    movie_ids = (
+        select(MovieGenre.movieId)
+        .join(Genre, Genre.genreId == MovieGenre.genreId)
+        .where(func.lower(Genre.name).in_(names))
+    )
+    if match_all:
+        movie_ids = movie_ids.group_by(MovieGenre.movieId).having(
+            func.count() == len(names)
+        )
+    if without_genres:
+        movie_ids = union(movie_ids, untagged)
+    return movie_ids
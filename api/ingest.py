@@ -0,0 +1,454 @@
+"""Bulk CSV ingestion: (re)builds the movies database from data/*.csv.
+
+Usage (from the ``api`` directory)::
+
+    python ingest.py [--data-dir ../data] [--database-url sqlite:///./movies.db]
+    python ingest.py --ratings-delta new_ratings.csv [--tags-delta new_tags.ndjson]
+
+Each CSV is streamed in fixed-size chunks and written with batched
+``executemany`` inserts, one transaction per table. Secondary indexes are
+created once every table is loaded, so the inserts never pay for index
+maintenance. Memory use is bounded by the batch size, not the file size.
+
+With ``--ratings-delta`` / ``--tags-delta``, the existing database is updated
+instead: the rows of the delta files (CSV with the columns of ratings.csv /
+tags.csv, or NDJSON objects with the same keys) are upserted on the primary
+key of their table, see ``ingest_deltas``.
+"""
+
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+import search
+import similarity
+from database import DATABASE_URL, Base, DatabaseSettings, apply_sqlite_pragmas
+from genres import rebuild_genre_index
+from migrations import analyze
+from models import (
+    DatasetVersion,
+    Genre,
+    Link,
+    Movie,
+    MovieGenre,
+    MovieNeighbor,
+    MovieNeighborSource,
+    MovieStats,
+    Rating,
+    Tag,
+)
+from stats import rebuild_movie_stats, refresh_movie_stats
+from sqlalchemy import (
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    create_engine,
+    delete,
+    event,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.schema import CreateTable
+from versioning import bump_dataset_version
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+BATCH_SIZE = 50_000
+
+
+def _optional_int(value: str) -> int | None:
+    """Convert a CSV field to int, keeping empty fields as NULL."""
+    return int(value) if value else None
+
+
+# Load order matters: movies first so that the foreign keys resolve.
+# Each source is (table, csv file name, converter per column).
+SOURCES = [
+    (Movie.__table__, "movies.csv", {"movieId": int, "title": str, "genres": str}),
+    (
+        Rating.__table__,
+        "ratings.csv",
+        {"userId": int, "movieId": int, "rating": float, "timestamp": int},
+    ),
+    (
+        Tag.__table__,
+        "tags.csv",
+        {"userId": int, "movieId": int, "tag": str, "timestamp": int},
+    ),
+    (
+        Link.__table__,
+        "links.csv",
+        {"movieId": int, "imdbId": str, "tmdbId": _optional_int},
+    ),
+]
+
+# Tables derived from the loaded ones rather than read from a CSV.
+DERIVED_TABLES = [
+    Genre.__table__,
+    MovieGenre.__table__,
+    MovieStats.__table__,
+    MovieNeighbor.__table__,
+    MovieNeighborSource.__table__,
+]
+
+
+def create_ingest_engine(database_url: str = DATABASE_URL):
+    """Create an engine tuned for a one-shot bulk load."""
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def _bulk_load_pragmas(dbapi_connection, connection_record):
+            # The database is rebuilt from scratch on failure, so durability
+            # during the load is not needed.
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=MEMORY")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA cache_size=-200000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+    return engine
+
+
+def create_delta_engine(database_url: str = DATABASE_URL):
+    """Create an engine for updating a live database, with the durable
+    PRAGMAs the API uses (see database.DatabaseSettings)."""
+    settings = DatabaseSettings(database_url)
+    engine = create_engine(database_url)
+    if settings.is_sqlite:
+        apply_sqlite_pragmas(engine, settings)
+    return engine
+
+
+def read_batches(
+    path: Path, columns: list[str], converters: dict, batch_size: int = BATCH_SIZE
+):
+    """Stream a CSV file as lists of typed row tuples ordered like columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        convert = [(header.index(name), converters[name]) for name in columns]
+        rows = (tuple(fn(row[i]) for i, fn in convert) for row in reader)
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+
+def read_ndjson_batches(
+    path: Path, columns: list[str], converters: dict, batch_size: int = BATCH_SIZE
+):
+    """Stream an NDJSON file as lists of typed row tuples ordered like columns."""
+    convert = [(name, converters[name]) for name in columns]
+    with open(path, encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        rows = (tuple(fn(record[name]) for name, fn in convert) for record in records)
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+
+def load_table(conn, table, path: Path, converters: dict, batch_size: int):
+    """Insert every row of a CSV file into a table, batch by batch.
+
+    Rows go straight to the driver's ``executemany`` so that no per-row
+    SQLAlchemy parameter processing happens on the hot path.
+    """
+    columns = list(converters)
+    sql = str(table.insert().compile(dialect=conn.dialect))
+    positional = conn.dialect.positional
+    count = 0
+    for batch in read_batches(path, columns, converters, batch_size):
+        if not positional:
+            batch = [dict(zip(columns, row)) for row in batch]
+        conn.exec_driver_sql(sql, batch)
+        count += len(batch)
+    return count
+
+
+def _report(label: str, count: int | None, elapsed: float, unit: str = "rows"):
+    if count is None:
+        print(f"{label:<10} {elapsed:8.2f}s")
+    else:
+        rate = count / elapsed if elapsed else float("inf")
+        print(
+            f"{label:<10} {count:>10,} {unit:<6} {elapsed:8.2f}s "
+            f"{rate:>12,.0f} {unit}/s"
+        )
+
+
+def build_database(engine, data_dir: Path = DATA_DIR, batch_size: int = BATCH_SIZE):
+    """Drop and rebuild every table from the CSV files in data_dir."""
+    tables = [table for table, _, _ in SOURCES] + DERIVED_TABLES
+    sqlite = engine.dialect.name == "sqlite"
+    if sqlite:
+        with engine.begin() as conn:
+            search.drop_search_index(conn)
+    Base.metadata.drop_all(engine, tables=tables)
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(CreateTable(table))
+
+    stats = {}
+    for table, filename, converters in SOURCES:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            count = load_table(conn, table, data_dir / filename, converters, batch_size)
+        elapsed = time.perf_counter() - start
+        stats[table.name] = count
+        _report(table.name, count, elapsed)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        stats[MovieGenre.__tablename__] = rebuild_genre_index(conn, batch_size)
+    _report("genres", stats[MovieGenre.__tablename__], time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for table in tables:
+            for index in table.indexes:
+                index.create(conn)
+    _report("indexes", None, time.perf_counter() - start)
+
+    # After the indexes: the per-movie GROUP BY reads the covering one.
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        stats[MovieStats.__tablename__] = rebuild_movie_stats(conn)
+    _report("stats", stats[MovieStats.__tablename__], time.perf_counter() - start)
+
+    # Similar movies need NumPy and SciPy; without them, run similarity.py
+    # where they are installed.
+    if similarity.np is not None:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            stats[MovieNeighbor.__tablename__] = similarity.rebuild_neighbors(conn)
+        _report(
+            "neighbors",
+            stats[MovieNeighbor.__tablename__],
+            time.perf_counter() - start,
+            unit="movies",
+        )
+
+    if sqlite:
+        # Built after the load, like the other indexes: its sync triggers
+        # would otherwise fire once per inserted movie.
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            search.create_search_index(conn)
+            search.rebuild_search_index(conn)
+        _report("search", stats[Movie.__tablename__], time.perf_counter() - start)
+
+    with engine.begin() as conn:
+        analyze(conn)
+        DatasetVersion.__table__.create(conn, checkfirst=True)
+        version = bump_dataset_version(conn)
+    print(f"dataset version {version}")
+    return stats
+
+
+# Tables a delta can be applied to, with the converters of their CSV columns.
+DELTA_SOURCES = {
+    table.name: (table, converters)
+    for table, _, converters in SOURCES
+    if table.name in (Rating.__tablename__, Tag.__tablename__)
+}
+
+
+def _staging_table(table) -> Table:
+    """A temporary copy of table's columns, plus the position of each row
+    in the delta file and the action decided for it."""
+    return Table(
+        f"delta_{table.name}",
+        MetaData(),
+        *(Column(column.name, column.type) for column in table.columns),
+        Column("seq", Integer, nullable=False),
+        Column("action", String),
+        prefixes=["TEMPORARY"],
+    )
+
+
+def apply_delta(conn, table, path: Path, converters: dict, batch_size: int) -> dict:
+    """Upsert the rows of a delta file into table, keyed on its primary key.
+
+    The file is first loaded into a temporary staging table; the rows are
+    then classified and applied with a few set-based statements:
+
+    - skipped: rows repeated later in the file (the last one wins), rows of
+      unknown movies, rows identical to the stored one, and rows older
+      (by timestamp) than the stored one;
+    - updated: rows whose key exists with other values;
+    - inserted: rows whose key does not exist yet.
+
+    Returns the counts of each, and the movieIds of the written rows.
+    """
+    columns = list(converters)
+    keys = [column.name for column in table.primary_key.columns]
+    values = [name for name in columns if name not in keys]
+    staging = _staging_table(table)
+    staging.drop(conn, checkfirst=True)
+    staging.create(conn)
+
+    read = read_ndjson_batches if path.suffix in (".ndjson", ".jsonl") else read_batches
+    sql = str(staging.insert().compile(dialect=conn.dialect))
+    read_count = 0
+    for batch in read(path, columns, converters, batch_size):
+        rows = [(*row, read_count + i, None) for i, row in enumerate(batch)]
+        if not conn.dialect.positional:
+            names = columns + ["seq", "action"]
+            rows = [dict(zip(names, row)) for row in rows]
+        conn.exec_driver_sql(sql, rows)
+        read_count += len(batch)
+
+    s, t = staging.c, table.c
+    latest = select(func.max(s.seq)).group_by(*(s[key] for key in keys))
+    conn.execute(delete(staging).where(s.seq.not_in(latest)))
+    conn.execute(delete(staging).where(s.movieId.not_in(select(Movie.movieId))))
+    Index(f"ix_delta_{table.name}_key", *(s[key] for key in keys)).create(conn)
+
+    same_key = and_(*(t[key] == s[key] for key in keys))
+    conn.execute(
+        update(staging)
+        .where(
+            exists().where(
+                same_key,
+                or_(*(t[name].is_distinct_from(s[name]) for name in values)),
+                or_(t.timestamp.is_(None), s.timestamp >= t.timestamp),
+            )
+        )
+        .values(action="update")
+    )
+    conn.execute(
+        update(staging).where(~exists().where(same_key)).values(action="insert")
+    )
+    counts = dict(
+        conn.execute(
+            select(s.action, func.count())
+            .where(s.action.is_not(None))
+            .group_by(s.action)
+        ).all()
+    )
+    movie_ids = (
+        conn.execute(select(s.movieId).where(s.action.is_not(None)).distinct())
+        .scalars()
+        .all()
+    )
+
+    conn.execute(
+        update(table)
+        .where(exists().where(same_key, s.action == "update"))
+        .values(
+            {name: select(s[name]).where(same_key).scalar_subquery() for name in values}
+        )
+    )
+    conn.execute(
+        insert(table).from_select(
+            columns, select(*(s[name] for name in columns)).where(s.action == "insert")
+        )
+    )
+    staging.drop(conn)
+
+    inserted, updated = counts.get("insert", 0), counts.get("update", 0)
+    return {
+        "read": read_count,
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": read_count - inserted - updated,
+        "movie_ids": movie_ids,
+    }
+
+
+def ingest_deltas(engine, deltas: dict[str, Path], batch_size: int = BATCH_SIZE):
+    """Apply delta files ({table name: path}) to an existing database.
+
+    Everything runs in one transaction: the upserts, the refresh of the
+    movie_stats rows of the movies whose ratings changed, and the bump of
+    the dataset version (unless nothing was written), which makes the API
+    drop its cached responses and rebuild its columnar ratings. Similar
+    movies are left to ``python similarity.py``, which recomputes the ones
+    whose aggregates moved. Returns the counts per table.
+    """
+    results = {}
+    with engine.begin() as conn:
+        for name, path in deltas.items():
+            table, converters = DELTA_SOURCES[name]
+            start = time.perf_counter()
+            result = apply_delta(conn, table, path, converters, batch_size)
+            elapsed = time.perf_counter() - start
+            rate = result["read"] / elapsed if elapsed else float("inf")
+            print(
+                f"{name:<10} {result['read']:>10,} rows {elapsed:8.2f}s "
+                f"{rate:>12,.0f} rows/s: {result['inserted']:,} inserted, "
+                f"{result['updated']:,} updated, {result['skipped']:,} skipped"
+            )
+            results[name] = result
+
+        ratings = results.get(Rating.__tablename__)
+        if ratings and ratings["movie_ids"]:
+            start = time.perf_counter()
+            refresh_movie_stats(conn, ratings["movie_ids"])
+            _report(
+                "stats",
+                len(ratings["movie_ids"]),
+                time.perf_counter() - start,
+                unit="movies",
+            )
+        if not any(
+            result["inserted"] or result["updated"] for result in results.values()
+        ):
+            print("dataset unchanged")
+            return results
+        version = bump_dataset_version(conn)
+    print(f"dataset version {version}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--ratings-delta",
+        type=Path,
+        help="upsert this CSV/NDJSON file into ratings instead of rebuilding",
+    )
+    parser.add_argument(
+        "--tags-delta",
+        type=Path,
+        help="upsert this CSV/NDJSON file into tags instead of rebuilding",
+    )
+    args = parser.parse_args()
+
+    deltas = {
+        Rating.__tablename__: args.ratings_delta,
+        Tag.__tablename__: args.tags_delta,
+    }
+    deltas = {name: path for name, path in deltas.items() if path is not None}
+    if deltas:
+        engine = create_delta_engine(args.database_url)
+        start = time.perf_counter()
+        results = ingest_deltas(engine, deltas, args.batch_size)
+        rows = sum(result["read"] for result in results.values())
+        _report("total", rows, time.perf_counter() - start)
+        return
+
+    engine = create_ingest_engine(args.database_url)
+    start = time.perf_counter()
+    stats = build_database(engine, args.data_dir, args.batch_size)
+    # Neighbors are counted in movies, not rows.
+    rows = sum(
+        count for name, count in stats.items() if name != MovieNeighbor.__tablename__
+    )
+    _report("total", rows, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
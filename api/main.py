@@ -1,8 +1,35 @@
+from contextlib import asynccontextmanager
+from typing import Literal
+
+import async_query_helpers as async_helpers
+import columnar
+import recommend
+import export
 import query_helpers as helpers
 import schemas
-from database import SessionLocal
-from fastapi import Depends, FastAPI, HTTPException, Path, Query
-from sqlalchemy.orm import Session
+from cache import VersionedValue
+from database import (
+    AsyncSessionLocal,
+    async_engine,
+    logger,
+    read_sqlite_pragmas,
+    settings,
+)
+from fast_json import rows_response
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import request_metrics
+from pagination import (
+    decode_cursor,
+    decode_offset_cursor,
+    next_cursor,
+    next_offset_cursor,
+)
+from profiling import profiler
+from response_cache import response_cache
+from sqlalchemy.ext.asyncio import AsyncSession
+from versioning import dataset_version
 
 api_description = """
 
@@ -19,19 +46,99 @@ Cette API permet d'accéder aux données de films, notes et tags provenant du da
 - Voir des statistiques globales sur le dataset
 
 Tous les endpoints supportent la pagination et certains permettent des filtres avancés.
+Les listes renvoient l'en-tête `X-Next-Cursor` : le passer dans le paramètre `cursor`
+donne la page suivante, à coût constant quelle que soit la profondeur.
 
 """
+
+
+async def _effective_pragmas() -> dict:
+    """PRAGMA values in effect on a pooled connection (SQLite only)."""
+    if not settings.is_sqlite:
+        return {}
+    async with async_engine.connect() as conn:
+        return await conn.run_sync(read_sqlite_pragmas)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Database settings: %s", settings.as_dict())
+    if settings.is_sqlite:
+        logger.info("SQLite PRAGMAs in effect: %s", await _effective_pragmas())
+    yield
+    await async_engine.dispose()
+
+
 # --- Initialisation de l'application FastAPI ---
-app = FastAPI(title="MovieLens API", description=api_description, version="0.1")
+app = FastAPI(
+    title="MovieLens API", description=api_description, version="0.1", lifespan=lifespan
+)
+
+# Les réponses des lectures sont mises en cache par version du dataset.
+app.middleware("http")(response_cache.middleware)
+
+# Ajoutées en dernier, les mesures englobent aussi les réponses du cache.
+app.middleware("http")(request_metrics.middleware)
+request_metrics.instrument(async_engine.sync_engine)
+
+# Profilage à la demande, installé seulement si PROFILE_TOKEN est défini.
+if profiler.enabled:
+    app.middleware("http")(profiler.middleware)
+    profiler.instrument(async_engine.sync_engine)
 
 
 # --- Dépendance pour obtenir une session de base de données ---
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# --- Pagination par curseur ---
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _decode_cursor(cursor: str | None, size: int) -> tuple | None:
+    """Decode the `cursor` query parameter, answering 400 if it is invalid."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, size)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode_offset_cursor(cursor: str) -> int:
+    """Decode the offset cursor of a search, answering 400 if it is invalid."""
+    try:
+        return decode_offset_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page_response(rows: list, cursor: str | None, model) -> Response:
+    """A page of list rows, encoded without a model pass (see fast_json), with
+    the next page's cursor, if any."""
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor is not None else None
+    return rows_response(rows, model, headers)
+
+
+def _keyset_page(rows: list, limit: int, keyset, model) -> Response:
+    """Trim the look-ahead row and answer the page with the next cursor."""
+    return _page_response(rows, next_cursor(rows, limit, keyset), model)
+
+
+def _split_values(values: list[str] | None) -> list[str]:
+    """Flatten a repeatable query parameter whose values may hold commas."""
+    return [item for value in values or [] for item in value.split(",") if item]
+
+
+# --- Lectures groupées ---
+def _in_request_order(keys: list, rows: list, key) -> tuple[list, list]:
+    """Align `rows` (fetched in any order) on the requested `keys`: the item
+    of each key, None where there is no row, and the keys not found."""
+    by_key = {key(row): row for row in rows}
+    items = [by_key.get(k) for k in keys]
+    return items, [k for k, item in zip(keys, items) if item is None]
 
 
 # --- Endpoints pour tester la sanité de l'API ---
@@ -50,16 +157,43 @@ async def root():
 @app.get(
     "/movies/{movie_id}",  # /movies/1
     summary="Get Movie by ID",
-    description="Retrieve a movie by its ID.",
+    description="Retrieve a movie by its ID, with at most `ratings_limit` ratings "
+    "and `tags_limit` tags; the complete rating count and distribution are in `stats`. "
+    "Parts left out of `include` are absent from the response.",
     response_description="Movie details",
     response_model=schemas.MovieDetailed,
+    # Une partie non demandée est absente, pas vide : « ratings: [] » veut dire
+    # que le film n'a aucune note.
+    response_model_exclude_unset=True,
     tags=["Movies"],
 )
-def read_movie(
+async def read_movie(
     movie_id: int = Path(..., description="The ID of the movie to retrieve"),
-    db: Session = Depends(get_db),
+    include: list[str] | None = Query(
+        None,
+        description="Related data to return, among "
+        f"{', '.join(helpers.MOVIE_DETAIL_PARTS)} (all by default). "
+        "Repeat the parameter or separate values with commas",
+    ),
+    ratings_limit: int = Query(
+        100, ge=0, description="Maximum number of ratings to return"
+    ),
+    tags_limit: int = Query(100, ge=0, description="Maximum number of tags to return"),
+    db: AsyncSession = Depends(get_db),
 ):
-    db_movie = helpers.get_movie(db, movie_id=movie_id)
+    parts = _split_values(include) or helpers.MOVIE_DETAIL_PARTS
+    unknown = set(parts) - set(helpers.MOVIE_DETAIL_PARTS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown include value(s): {sorted(unknown)}"
+        )
+    db_movie = await async_helpers.get_movie_detail(
+        db,
+        movie_id=movie_id,
+        include=parts,
+        ratings_limit=ratings_limit,
+        tags_limit=tags_limit,
+    )
     if db_movie is None:
         raise HTTPException(
             status_code=404, detail=f"Movie with ID {movie_id} not found"
@@ -67,6 +201,55 @@ def read_movie(
     return db_movie
 
 
+@app.get(
+    "/movies/{movie_id}/stats",
+    summary="Get Movie rating statistics",
+    description="Retrieve the precomputed rating count, mean, histogram "
+    "and first/last rating timestamps of a movie.",
+    response_description="Movie rating statistics",
+    response_model=schemas.MovieStats,
+    tags=["Movies"],
+)
+async def read_movie_stats(
+    movie_id: int = Path(..., description="The ID of the movie"),
+    db: AsyncSession = Depends(get_db),
+):
+    movie_stats = await async_helpers.get_movie_stats(db, movie_id=movie_id)
+    if movie_stats is None:
+        raise HTTPException(
+            status_code=404, detail=f"Movie with ID {movie_id} not found"
+        )
+    return movie_stats
+
+
+@app.get(
+    "/movies/{movie_id}/similar",
+    summary="Get similar Movies",
+    description="Retrieve the movies most similar to a movie, by cosine or adjusted "
+    "cosine similarity of their ratings, best first. Precomputed offline by "
+    "similarity.py.",
+    response_description="Similar movies",
+    response_model=list[schemas.SimilarMovie],
+    tags=["Movies"],
+)
+async def read_similar_movies(
+    movie_id: int = Path(..., description="The ID of the movie"),
+    k: int = Query(10, gt=0, le=100, description="Number of movies to return"),
+    metric: Literal["cosine", "adjusted_cosine"] = Query(
+        "cosine", description="Similarity measure"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    similar = await async_helpers.get_similar_movies(
+        db, movie_id=movie_id, limit=k, metric=metric
+    )
+    if not similar and await async_helpers.get_movie(db, movie_id=movie_id) is None:
+        raise HTTPException(
+            status_code=404, detail=f"Movie with ID {movie_id} not found"
+        )
+    return similar
+
+
 # -- Endpoint pour récupérer une liste de films avec pagination et filtres ---
 @app.get(
     "/movies/",
@@ -76,15 +259,94 @@ def read_movie(
     response_model=list[schemas.MovieSimple],
     tags=["Movies"],
 )
-def list_movies(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+async def list_movies(
+    skip: int = Query(
+        0,
+        ge=0,
+        description="Number of records to skip, on the first page only: "
+        "ignored along with a cursor, which already carries the position",
+    ),
     limit: int = Query(10, gt=0, description="Number of records to return"),
-    title: str | None = Query(None, description="Filter by movie title"),
-    genre: str | None = Query(None, description="Filter by movie genre"),
-    db: Session = Depends(get_db),
+    title: str | None = Query(
+        None,
+        description="Search movie titles: every word matches as a prefix, "
+        "case and accents are ignored, best matches first",
+    ),
+    genre: list[str] | None = Query(
+        None,
+        description="Filter by genre, matched exactly and case-insensitively. "
+        "Repeat the parameter or separate genres with commas for several genres",
+    ),
+    genre_mode: Literal["any", "all"] = Query(
+        "any", description="Keep movies having any or all of the requested genres"
+    ),
+    min_avg: float | None = Query(
+        None, ge=0, le=5, description="Filter by minimum average rating"
+    ),
+    min_count: int | None = Query(
+        None, ge=0, description="Filter by minimum number of ratings"
+    ),
+    sort: Literal["movieId", "avg", "count"] = Query(
+        "movieId",
+        description="Order by movie ID, best average rating or most ratings "
+        "(ignored by title searches, which are ranked by relevance)",
+    ),
+    cursor: str | None = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page",
+    ),
+    db: AsyncSession = Depends(get_db),
 ):
-    movies = helpers.get_movies(db, skip=skip, limit=limit, title=title, genre=genre)
-    return movies
+    genres = _split_values(genre)
+    if title:
+        # La recherche est classée par pertinence : le curseur porte un offset.
+        offset = _decode_offset_cursor(cursor) if cursor is not None else skip
+        movies = await async_helpers.get_movies(
+            db,
+            skip=offset,
+            limit=limit + 1,
+            title=title,
+            genres=genres,
+            genre_mode=genre_mode,
+            min_avg=min_avg,
+            min_count=min_count,
+        )
+        cursor = next_offset_cursor(movies, limit, offset)
+        return _page_response(movies, cursor, schemas.MovieSimple)
+
+    keyset = helpers.MOVIE_SORTS[sort]
+    movies = await async_helpers.get_movies(
+        db,
+        skip=skip if cursor is None else 0,
+        limit=limit + 1,
+        genres=genres,
+        genre_mode=genre_mode,
+        min_avg=min_avg,
+        min_count=min_count,
+        sort=sort,
+        after=_decode_cursor(cursor, len(keyset)),
+    )
+    return _keyset_page(movies, limit, keyset, schemas.MovieSimple)
+
+
+@app.post(
+    "/movies/batch",
+    summary="Get many Movies by ID",
+    description="Retrieve up to 1000 movies in one request and one query. Items "
+    "come back in request order, null where the movie does not exist; the missing "
+    "IDs are listed in `not_found`.",
+    response_description="Movies in request order",
+    response_model=schemas.MovieBatchResponse,
+    tags=["Movies"],
+)
+async def read_movies_batch(
+    request: schemas.IdBatchRequest, db: AsyncSession = Depends(get_db)
+):
+    movies = await async_helpers.get_movies_by_ids(db, movie_ids=request.ids)
+    items, not_found = _in_request_order(
+        request.ids, movies, lambda movie: movie.movieId
+    )
+    return {"items": items, "not_found": not_found}
 
 
 # --- Endpoints pour les notes (ratings) ---
@@ -96,12 +358,12 @@ def list_movies(
     response_model=schemas.RatingSimple,
     tags=["Ratings"],
 )
-def read_rating(
+async def read_rating(
     user_id: int = Path(..., description="The ID of the user"),
     movie_id: int = Path(..., description="The ID of the movie"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    rating = helpers.get_rating(db, user_id=user_id, movie_id=movie_id)
+    rating = await async_helpers.get_rating(db, user_id=user_id, movie_id=movie_id)
     if rating is None:
         raise HTTPException(
             status_code=404,
@@ -118,25 +380,61 @@ def read_rating(
     response_model=list[schemas.RatingSimple],
     tags=["Ratings"],
 )
-def list_ratings(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+async def list_ratings(
+    skip: int = Query(
+        0,
+        ge=0,
+        description="Number of records to skip, on the first page only: "
+        "ignored along with a cursor, which already carries the position",
+    ),
     limit: int = Query(10, gt=0, description="Number of records to return"),
     movie_id: int | None = Query(None, description="Filter by movie ID"),
     user_id: int | None = Query(None, description="Filter by user ID"),
     min_rating: float | None = Query(
         None, ge=0, le=5, description="Filter by minimum rating value"
     ),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page",
+    ),
+    db: AsyncSession = Depends(get_db),
 ):
-    ratings = helpers.get_ratings(
+    ratings = await async_helpers.get_ratings(
         db,
-        skip=skip,
-        limit=limit,
+        skip=skip if cursor is None else 0,
+        limit=limit + 1,
         movie_id=movie_id,
         user_id=user_id,
         min_rating=min_rating,
+        after=_decode_cursor(cursor, len(helpers.RATING_KEY)),
+    )
+    return _keyset_page(ratings, limit, helpers.RATING_KEY, schemas.RatingSimple)
+
+
+@app.post(
+    "/ratings/batch",
+    summary="Get many Ratings by User ID and Movie ID",
+    description="Retrieve up to 1000 ratings, given as (userId, movieId) pairs, in "
+    "one request and one query. Items come back in request order, null where the "
+    "user did not rate the movie; the missing pairs are listed in `not_found`.",
+    response_description="Ratings in request order",
+    response_model=schemas.RatingBatchResponse,
+    tags=["Ratings"],
+)
+async def read_ratings_batch(
+    request: schemas.RatingBatchRequest, db: AsyncSession = Depends(get_db)
+):
+    keys = [(key.userId, key.movieId) for key in request.keys]
+    ratings = await async_helpers.get_ratings_by_keys(db, keys=keys)
+    items, not_found = _in_request_order(
+        keys, ratings, lambda rating: (rating.userId, rating.movieId)
     )
-    return ratings
+    return {
+        "items": items,
+        "not_found": [
+            {"userId": user_id, "movieId": movie_id} for user_id, movie_id in not_found
+        ],
+    }
 
 
 @app.get(
@@ -147,13 +445,15 @@ def list_ratings(
     response_model=schemas.TagSimple,
     tags=["Tags"],
 )
-def read_tag(
+async def read_tag(
     user_id: int = Path(..., description="The ID of the user"),
     movie_id: int = Path(..., description="The ID of the movie"),
     tag_text: str = Path(..., description="The text of the tag"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tag = helpers.get_tag(db, user_id=user_id, movie_id=movie_id, tag_text=tag_text)
+    tag = await async_helpers.get_tag(
+        db, user_id=user_id, movie_id=movie_id, tag_text=tag_text
+    )
     if tag is None:
         raise HTTPException(
             status_code=404,
@@ -170,17 +470,31 @@ def read_tag(
     response_model=list[schemas.TagSimple],
     tags=["Tags"],
 )
-def list_tags(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+async def list_tags(
+    skip: int = Query(
+        0,
+        ge=0,
+        description="Number of records to skip, on the first page only: "
+        "ignored along with a cursor, which already carries the position",
+    ),
     limit: int = Query(10, gt=0, description="Number of records to return"),
     movie_id: int | None = Query(None, description="Filter by movie ID"),
     user_id: int | None = Query(None, description="Filter by user ID"),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page",
+    ),
+    db: AsyncSession = Depends(get_db),
 ):
-    tags = helpers.get_tags(
-        db, skip=skip, limit=limit, movie_id=movie_id, user_id=user_id
+    tags = await async_helpers.get_tags(
+        db,
+        skip=skip if cursor is None else 0,
+        limit=limit + 1,
+        movie_id=movie_id,
+        user_id=user_id,
+        after=_decode_cursor(cursor, len(helpers.TAG_KEY)),
     )
-    return tags
+    return _keyset_page(tags, limit, helpers.TAG_KEY, schemas.TagSimple)
 
 
 # --- Endpoints pour les liens (links) ---
@@ -192,11 +506,11 @@ def list_tags(
     response_model=schemas.LinkSimple,
     tags=["Links"],
 )
-def read_link(
+async def read_link(
     movie_id: int = Path(..., description="The ID of the movie"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    link = helpers.get_link(db, movie_id=movie_id)
+    link = await async_helpers.get_link(db, movie_id=movie_id)
     if link is None:
         raise HTTPException(
             status_code=404, detail=f"Link for Movie ID {movie_id} not found"
@@ -212,34 +526,330 @@ def read_link(
     response_model=list[schemas.LinkSimple],
     tags=["Links"],
 )
-def list_links(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+async def list_links(
+    skip: int = Query(
+        0,
+        ge=0,
+        description="Number of records to skip, on the first page only: "
+        "ignored along with a cursor, which already carries the position",
+    ),
     limit: int = Query(10, gt=0, description="Number of records to return"),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    links = await async_helpers.get_links(
+        db,
+        skip=skip if cursor is None else 0,
+        limit=limit + 1,
+        after=_decode_cursor(cursor, len(helpers.LINK_KEY)),
+    )
+    return _keyset_page(links, limit, helpers.LINK_KEY, schemas.LinkSimple)
+
+
+@app.post(
+    "/links/batch",
+    summary="Get many Links by Movie ID",
+    description="Retrieve the links of up to 1000 movies in one request and one "
+    "query. Items come back in request order, null where the movie has no link; "
+    "the missing IDs are listed in `not_found`.",
+    response_description="Links in request order",
+    response_model=schemas.LinkBatchResponse,
+    tags=["Links"],
+)
+async def read_links_batch(
+    request: schemas.IdBatchRequest, db: AsyncSession = Depends(get_db)
 ):
-    links = helpers.get_links(db, skip=skip, limit=limit)
-    return links
+    links = await async_helpers.get_links_by_ids(db, movie_ids=request.ids)
+    items, not_found = _in_request_order(request.ids, links, lambda link: link.movieId)
+    return {"items": items, "not_found": not_found}
+
+
+# --- Endpoints d'export en flux ---
+ExportFormat = Literal["ndjson", "csv", "arrow"]
+
+
+def _export_response(statement, format: str, name: str) -> StreamingResponse:
+    """Stream the rows of `statement`, answering 400 if Arrow is unavailable."""
+    if not export.supports_format(format):
+        raise HTTPException(
+            status_code=400, detail="Arrow export requires pyarrow on the server"
+        )
+    return StreamingResponse(
+        export.stream_export(statement, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
+
+
+@app.get(
+    "/export/ratings",
+    summary="Export ratings",
+    description="Stream every rating matching the filters, in primary key order, "
+    "as NDJSON, CSV or an Arrow IPC stream. Constant memory on the server, "
+    "whatever the number of rows.",
+    response_description="Stream of ratings",
+    tags=["Export"],
+)
+async def export_ratings(
+    format: ExportFormat = Query("ndjson", description="Output format"),
+    movie_id: int | None = Query(None, description="Filter by movie ID"),
+    user_id: int | None = Query(None, description="Filter by user ID"),
+    min_rating: float | None = Query(
+        None, ge=0, le=5, description="Filter by minimum rating"
+    ),
+):
+    statement = export.ratings_export(
+        movie_id=movie_id, user_id=user_id, min_rating=min_rating
+    )
+    return _export_response(statement, format, "ratings")
+
+
+@app.get(
+    "/export/tags",
+    summary="Export tags",
+    description="Stream every tag matching the filters, in primary key order, "
+    "as NDJSON, CSV or an Arrow IPC stream.",
+    response_description="Stream of tags",
+    tags=["Export"],
+)
+async def export_tags(
+    format: ExportFormat = Query("ndjson", description="Output format"),
+    movie_id: int | None = Query(None, description="Filter by movie ID"),
+    user_id: int | None = Query(None, description="Filter by user ID"),
+):
+    statement = export.tags_export(movie_id=movie_id, user_id=user_id)
+    return _export_response(statement, format, "tags")
 
 
 # --- Endpoints pour les statistiques ---
+# Calculées une seule fois par version du dataset (voir versioning.py).
+analytics_cache = VersionedValue(async_helpers.get_analytics)
+
+
 @app.get(
     "/analytics/",
     summary="Get Dataset Analytics including counts of movies, ratings, tags, and links",
-    description="Retrieve Analytics about the dataset, including counts of movies, ratings, tags, and links.",
+    description="Retrieve Analytics about the dataset, including counts of movies, ratings, tags, and links, "
+    "the distribution of ratings per user and the most common genres. "
+    "Computed once per data reload.",
     response_description="Dataset analytics",
     response_model=schemas.AnalyticsResponse,
     tags=["Analytics"],
 )
-def get_stats(db: Session = Depends(get_db)):
-    total_movies = helpers.get_movie_count(db)
-    total_ratings = helpers.get_rating_count(db)
-    average_rating = helpers.get_average_rating(db)
-    total_tags = helpers.get_tag_count(db)
-    total_links = helpers.get_link_count(db)
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    return await analytics_cache.get(db)
+
+
+# --- Agrégats des notes : moteur colonnaire NumPy si activé, sinon SQL ---
+columnar_ratings = columnar.ColumnarCache() if columnar.COLUMNAR_ENGINE else None
+
+
+async def _columnar(db: AsyncSession) -> columnar.ColumnarRatings | None:
+    return await columnar_ratings.get(db) if columnar_ratings else None
+
+
+@app.get(
+    "/users/{user_id}/stats",
+    summary="Get User rating statistics",
+    description="Retrieve the rating count, mean, histogram "
+    "and first/last rating timestamps of a user.",
+    response_description="User rating statistics",
+    response_model=schemas.UserStats,
+    tags=["Analytics"],
+)
+async def read_user_stats(
+    user_id: int = Path(..., description="The ID of the user"),
+    db: AsyncSession = Depends(get_db),
+):
+    ratings = await _columnar(db)
+    if ratings is not None:
+        user_stats = ratings.user_stats(user_id)
+    else:
+        user_stats = await async_helpers.get_user_stats(db, user_id=user_id)
+    if user_stats is None:
+        raise HTTPException(
+            status_code=404, detail=f"No ratings found for user {user_id}"
+        )
+    return user_stats
+
+
+@app.get(
+    "/analytics/ratings/histogram",
+    summary="Get the rating histogram",
+    description="Number of ratings per rating value, over the whole dataset "
+    "or for a movie and/or a user.",
+    response_description="Rating histogram",
+    response_model=schemas.RatingHistogram,
+    tags=["Analytics"],
+)
+async def read_rating_histogram(
+    movie_id: int | None = Query(None, description="Filter by movie ID"),
+    user_id: int | None = Query(None, description="Filter by user ID"),
+    db: AsyncSession = Depends(get_db),
+):
+    ratings = await _columnar(db)
+    if ratings is not None:
+        return ratings.histogram(movie_id=movie_id, user_id=user_id)
+    return await async_helpers.get_rating_histogram(
+        db, movie_id=movie_id, user_id=user_id
+    )
+
+
+@app.get(
+    "/analytics/ratings/timeline",
+    summary="Get the number of ratings over time",
+    description="Number and mean of ratings per year, month or day (UTC), "
+    "over the whole dataset or for a movie and/or a user.",
+    response_description="Ratings per period",
+    response_model=schemas.RatingTimeline,
+    tags=["Analytics"],
+)
+async def read_rating_timeline(
+    bucket: Literal["year", "month", "day"] = Query(
+        "year", description="Length of the periods"
+    ),
+    movie_id: int | None = Query(None, description="Filter by movie ID"),
+    user_id: int | None = Query(None, description="Filter by user ID"),
+    db: AsyncSession = Depends(get_db),
+):
+    ratings = await _columnar(db)
+    if ratings is not None:
+        return ratings.timeline(bucket, movie_id=movie_id, user_id=user_id)
+    return await async_helpers.get_rating_timeline(
+        db, bucket=bucket, movie_id=movie_id, user_id=user_id
+    )
+
+
+# --- Recommandations (modèle entraîné hors ligne par recommend.py) ---
+# Relu dès que recommend.py enregistre un nouveau modèle.
+recommender = recommend.ModelCache() if recommend.np is not None else None
+
+
+async def _get_recommender(db: AsyncSession) -> recommend.Recommender:
+    model = None
+    if recommender is not None:
+        model = recommender.get(await dataset_version.current(db))
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Recommendation model not available: run python recommend.py",
+        )
+    return model
+
+
+def _titled(scored: list[tuple[int, float]], titles: dict[int, str]) -> list:
+    return [
+        {"movieId": movie_id, "title": titles[movie_id], "score": score}
+        for movie_id, score in scored
+        if movie_id in titles
+    ]
+
+
+@app.get(
+    "/users/{user_id}/recommendations",
+    summary="Get movie recommendations for a user",
+    description="Retrieve the `n` movies the user has not rated with the best "
+    "predicted score, best first.",
+    response_description="Recommended movies",
+    response_model=list[schemas.Recommendation],
+    tags=["Recommendations"],
+)
+async def read_recommendations(
+    user_id: int = Path(..., description="The ID of the user"),
+    n: int = Query(10, gt=0, le=100, description="Number of movies to return"),
+    db: AsyncSession = Depends(get_db),
+):
+    model = await _get_recommender(db)
+    scored = model.recommend(user_id, n)
+    if scored is None:
+        raise HTTPException(
+            status_code=404, detail=f"No recommendations for user {user_id}"
+        )
+    titles = await async_helpers.get_movie_titles(
+        db, movie_ids=[movie_id for movie_id, _ in scored]
+    )
+    return _titled(scored, titles)
+
+
+@app.post(
+    "/recommendations/batch",
+    summary="Get movie recommendations for many users",
+    description="Score the requested users a few hundred per matrix product and "
+    "return their `n` best unseen movies, in request order. Users unknown to the model are "
+    "listed in `not_found`.",
+    response_description="Recommended movies per user",
+    response_model=schemas.RecommendationBatchResponse,
+    tags=["Recommendations"],
+)
+async def batch_recommendations(
+    request: schemas.RecommendationBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    model = await _get_recommender(db)
+    scored = model.recommend_many(request.user_ids, request.n)
+    titles = await async_helpers.get_movie_titles(
+        db, movie_ids=[movie_id for items in scored.values() for movie_id, _ in items]
+    )
+    return {
+        "results": [
+            {
+                "userId": user_id,
+                "recommendations": _titled(scored[user_id], titles),
+            }
+            for user_id in request.user_ids
+            if user_id in scored
+        ],
+        "not_found": [user_id for user_id in request.user_ids if user_id not in scored],
+    }
+
+
+# --- Endpoints de supervision ---
+@app.get(
+    "/metrics/database",
+    summary="Database pool and tuning settings",
+    description="Configured pool settings, the SQLite PRAGMAs actually in effect "
+    "and the current state of the connection pool.",
+    response_description="Database settings and pool status",
+    tags=["Monitoring"],
+)
+async def database_metrics():
+    pool = async_engine.pool
     return {
-        "total_movies": total_movies,
-        "total_ratings": total_ratings,
-        "average_rating": average_rating,
-        "total_tags": total_tags,
-        "total_links": total_links,
+        "settings": settings.as_dict(),
+        "pragmas": await _effective_pragmas(),
+        "pool": {
+            "class": type(pool).__name__,
+            "status": pool.status(),
+            "size": getattr(pool, "size", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+        },
     }
+
+
+@app.get(
+    "/metrics/cache",
+    summary="Response cache counters",
+    description="Size, hits, misses, 304 answers and evictions of the response cache.",
+    response_description="Response cache counters",
+    tags=["Monitoring"],
+)
+async def cache_metrics():
+    return await response_cache.stats()
+
+
+@app.get(
+    "/metrics",
+    summary="Request and database metrics",
+    description="Per-route request counts, latency, response size, in-flight "
+    "requests and SQL statements per request, in the Prometheus text format. "
+    "METRICS_MODE selects full, light (no per-statement timing) or off.",
+    response_description="Metrics in the Prometheus text format",
+    response_class=Response,
+    tags=["Monitoring"],
+)
+async def prometheus_metrics():
+    return Response(request_metrics.render(), media_type=METRICS_CONTENT_TYPE)
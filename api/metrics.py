@@ -0,0 +1,292 @@
+"""Request and database metrics, exposed in the Prometheus text format.
+
+The HTTP middleware records, per route template (``/movies/{movie_id}``,
+not the raw path, to keep the number of series bounded):
+
+- ``http_requests_total``: requests by method, route and status;
+- ``http_request_duration_seconds``: latency histogram;
+- ``http_requests_in_flight``: requests being processed;
+- ``http_response_size_bytes``: response body size histogram;
+- ``http_request_db_queries`` / ``http_request_db_seconds``: histograms of
+  the number of SQL statements a request ran and of the time spent in them.
+
+Statements are timed by ``before_cursor_execute`` / ``after_cursor_execute``
+listeners on the engine, and charged to the request being processed through
+a context variable. Statements slower than SLOW_QUERY_MS milliseconds are
+logged with their parameters.
+
+METRICS_MODE selects the cost:
+
+- ``full`` (default): everything above; streamed bodies are measured as they
+  are sent, so the latency of an export covers the whole stream;
+- ``light``: no per-statement listeners (nor DB histograms) and no wrapping
+  of the body: sizes come from Content-Length and the latency stops at the
+  response headers. Slow queries are still logged when SLOW_QUERY_MS is set;
+- ``off``: no middleware at all.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from database import logger
+from fastapi import Request
+from sqlalchemy import event
+from starlette.routing import Match
+
+METRICS_MODE = os.getenv("METRICS_MODE", "full").strip().lower()
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonic count per label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self.values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Counts of observations per bucket upper bound, with their sum."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets=()):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # Per-bucket counts (the last one for +Inf), then the sum.
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            name_labels = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{name_labels} {series[-1]}"
+            yield f"{self.name}_count{name_labels} {cumulative}"
+
+
+class QueryStats:
+    """SQL statements run on behalf of one request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_queries: ContextVar[QueryStats | None] = ContextVar(
+    "current_queries", default=None
+)
+
+
+class RequestMetrics:
+    """The metrics of the API, its middleware and its engine listeners."""
+
+    def __init__(self, mode: str = METRICS_MODE, slow_query_ms: float = SLOW_QUERY_MS):
+        if mode not in ("full", "light", "off"):
+            raise ValueError(f"Unknown METRICS_MODE: {mode}")
+        self.mode = mode
+        self.slow_query_seconds = slow_query_ms / 1000
+        route = ("method", "route")
+        self.requests = Counter(
+            "http_requests_total", "HTTP requests.", ("method", "route", "status")
+        )
+        self.duration = Histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency.",
+            route,
+            LATENCY_BUCKETS,
+        )
+        self.in_flight = Gauge("http_requests_in_flight", "HTTP requests in progress.")
+        self.size = Histogram(
+            "http_response_size_bytes", "HTTP response body size.", route, SIZE_BUCKETS
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries",
+            "SQL statements run per HTTP request.",
+            route,
+            QUERY_BUCKETS,
+        )
+        self.db_seconds = Histogram(
+            "http_request_db_seconds",
+            "Time spent in SQL statements per HTTP request.",
+            route,
+            LATENCY_BUCKETS,
+        )
+        self.slow_queries = Counter(
+            "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS."
+        )
+        self.metrics = [
+            self.requests,
+            self.duration,
+            self.in_flight,
+            self.size,
+            self.db_queries,
+            self.db_seconds,
+            self.slow_queries,
+        ]
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def times_queries(self) -> bool:
+        return self.mode == "full" or (self.enabled and self.slow_query_seconds > 0)
+
+    def instrument(self, engine):
+        """Time the statements of a (sync) engine, if the mode needs it."""
+        if not self.times_queries:
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed = time.perf_counter() - context._metrics_query_start
+        stats = _current_queries.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc()
+            logger.warning(
+                "Slow query (%.1f ms): %s; parameters: %r",
+                elapsed * 1000,
+                " ".join(statement.split()),
+                parameters,
+            )
+
+    def _record(self, method, route, status, start, size, stats):
+        labels = (method, route)
+        self.requests.inc((method, route, status))
+        self.duration.observe(labels, time.perf_counter() - start)
+        if size is not None:
+            self.size.observe(labels, size)
+        if stats is not None:
+            self.db_queries.observe(labels, stats.count)
+            self.db_seconds.observe(labels, stats.seconds)
+
+    async def middleware(self, request: Request, call_next):
+        """HTTP middleware recording the metrics of every request."""
+        if not self.enabled:
+            return await call_next(request)
+        start = time.perf_counter()
+        stats = QueryStats() if self.mode == "full" else None
+        token = _current_queries.set(stats)
+        self.in_flight.inc()
+        try:
+            response = await call_next(request)
+        except Exception:
+            self.in_flight.dec()
+            self._record(request.method, _route(request), "500", start, None, stats)
+            raise
+        finally:
+            _current_queries.reset(token)
+
+        method, route, status = (
+            request.method,
+            _route(request),
+            str(response.status_code),
+        )
+        if self.mode == "light":
+            self.in_flight.dec()
+            length = response.headers.get("content-length")
+            size = int(length) if length is not None else None
+            self._record(method, route, status, start, size, stats)
+            return response
+
+        body = response.body_iterator
+
+        async def measured_body():
+            size = 0
+            try:
+                async for chunk in body:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                self.in_flight.dec()
+                self._record(method, route, status, start, size, stats)
+
+        response.body_iterator = measured_body()
+        return response
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context rather than the connection: a statement that
+    # raises never reaches after_cursor_execute, and leaves nothing behind.
+    context._metrics_query_start = time.perf_counter()
+
+
+def _route(request: Request) -> str:
+    """The path template of the request's route, so that IDs do not make new
+    series; "unmatched" for unknown paths."""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    # Not routed, e.g. answered by the response cache: match it here.
+    for route in request.app.router.routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,87 @@
+"""Idempotent schema migrations for an existing movies database.
+
+Usage (from the ``api`` directory)::
+
+    python migrations.py [--database-url sqlite:///./movies.db]
+
+Every step checks what already exists, so the command can be re-run safely
+against a database built by an older version of ``ingest.py``.
+"""
+
+import argparse
+
+import search
+from database import DATABASE_URL, Base
+from genres import rebuild_genre_index
+from models import MovieGenre, MovieStats
+from sqlalchemy import create_engine, exists, inspect, select
+from sqlalchemy.schema import CreateIndex
+from stats import rebuild_movie_stats
+from versioning import bump_dataset_version, read_dataset_version
+
+
+def create_missing_indexes(conn):
+    """Create the indexes declared on the models that the database lacks."""
+    # IF NOT EXISTS rather than checkfirst: reflection cannot see
+    # expression indexes such as ix_genres_name_lower.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def create_search_index(conn):
+    """Create and fill the FTS5 title index if it is missing (SQLite only)."""
+    if conn.dialect.name != "sqlite":
+        return
+    missing = not inspect(conn).has_table(search.MOVIES_FTS.name)
+    search.create_search_index(conn)
+    if missing:
+        search.rebuild_search_index(conn)
+
+
+def fill_genre_index(conn):
+    """Normalize Movie.genres into movie_genres if it was never done."""
+    if not conn.execute(select(exists().select_from(MovieGenre))).scalar():
+        rebuild_genre_index(conn)
+
+
+def fill_movie_stats(conn):
+    """Compute the per-movie rating aggregates if it was never done."""
+    if not conn.execute(select(exists().select_from(MovieStats))).scalar():
+        rebuild_movie_stats(conn)
+
+
+def init_dataset_version(conn):
+    """Give a database loaded before versioning its first version."""
+    if read_dataset_version(conn) == (0, 0):
+        bump_dataset_version(conn)
+
+
+def analyze(conn):
+    """Refresh the planner statistics (SQLite only)."""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("ANALYZE")
+
+
+def upgrade(engine):
+    """Bring an existing database up to the current schema."""
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        create_missing_indexes(conn)
+        create_search_index(conn)
+        fill_genre_index(conn)
+        fill_movie_stats(conn)
+        init_dataset_version(conn)
+        analyze(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+    upgrade(create_engine(args.database_url))
+    print("Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
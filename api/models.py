@@ -1,7 +1,7 @@
 """SQLAlchemy models."""
 
 from database import Base
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 
@@ -9,7 +9,7 @@ class Movie(Base):
     __tablename__ = "movies"
     movieId = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    genres = Column(String)
+    genres = Column(String)  # original pipe-joined string, see MovieGenre
 
     # Relationships
     ratings = relationship("Rating", back_populates="movie", cascade="all, delete")
@@ -17,6 +17,7 @@ class Movie(Base):
     links = relationship(
         "Link", back_populates="movie", cascade="all, delete", uselist=False
     )
+    stats = relationship("MovieStats", uselist=False, viewonly=True)
 
 
 class Rating(Base):
@@ -26,6 +27,14 @@ class Rating(Base):
     rating = Column(Float)
     timestamp = Column(Integer)
 
+    # Secondary indexes for the filters exposed by /ratings/; the
+    # (movieId, rating) one covers the whole row so it never visits the table.
+    __table_args__ = (
+        Index("ix_ratings_movie_user", "movieId", "userId"),
+        Index("ix_ratings_movie_rating", "movieId", "rating", "userId", "timestamp"),
+        Index("ix_ratings_user_timestamp", "userId", "timestamp"),
+    )
+
     # Relationships
     movie = relationship("Movie", back_populates="ratings")
 
@@ -37,6 +46,8 @@ class Tag(Base):
     tag = Column(String, primary_key=True)
     timestamp = Column(Integer)
 
+    __table_args__ = (Index("ix_tags_movie_user_tag", "movieId", "userId", "tag"),)
+
     # Relationships
     movie = relationship("Movie", back_populates="tags")
 
@@ -49,3 +60,91 @@ class Link(Base):
 
     # Relationships
     movie = relationship("Movie", back_populates="links", uselist=False)
+
+
+class Genre(Base):
+    __tablename__ = "genres"
+    genreId = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+
+    __table_args__ = (Index("ix_genres_name_lower", func.lower(name)),)
+
+
+class MovieGenre(Base):
+    """Normalized form of Movie.genres, one row per (genre, movie) pair."""
+
+    __tablename__ = "movie_genres"
+    genreId = Column(Integer, ForeignKey("genres.genreId"), primary_key=True)
+    movieId = Column(Integer, ForeignKey("movies.movieId"), primary_key=True)
+
+    __table_args__ = (Index("ix_movie_genres_movie", "movieId", "genreId"),)
+
+
+class MovieStats(Base):
+    """Per-movie rating aggregates, derived from ratings (see stats.py)."""
+
+    __tablename__ = "movie_stats"
+    movieId = Column(Integer, ForeignKey("movies.movieId"), primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_mean = Column(Float, nullable=False, default=0.0)
+    # Number of ratings per 0.5-step value, hist_05 for 0.5 up to hist_50.
+    hist_05 = Column(Integer, nullable=False, default=0)
+    hist_10 = Column(Integer, nullable=False, default=0)
+    hist_15 = Column(Integer, nullable=False, default=0)
+    hist_20 = Column(Integer, nullable=False, default=0)
+    hist_25 = Column(Integer, nullable=False, default=0)
+    hist_30 = Column(Integer, nullable=False, default=0)
+    hist_35 = Column(Integer, nullable=False, default=0)
+    hist_40 = Column(Integer, nullable=False, default=0)
+    hist_45 = Column(Integer, nullable=False, default=0)
+    hist_50 = Column(Integer, nullable=False, default=0)
+    first_rated = Column(Integer)
+    last_rated = Column(Integer)
+
+    # The "top rated" / "most rated" sorts walk these, filtering on the
+    # other aggregate without visiting the table.
+    __table_args__ = (
+        Index("ix_movie_stats_mean", "rating_mean", "movieId", "rating_count"),
+        Index("ix_movie_stats_count", "rating_count", "movieId", "rating_mean"),
+    )
+
+    @property
+    def histogram(self) -> dict[str, int]:
+        """Number of ratings per rating value, keyed "0.5" to "5.0"."""
+        return {
+            f"{step / 2:.1f}": getattr(self, f"hist_{step * 5:02d}")
+            for step in range(1, 11)
+        }
+
+
+class MovieNeighbor(Base):
+    """The `rank`-th most similar movie of a movie, by `metric` (see
+    similarity.py). A movie's neighbors are one range of the primary key."""
+
+    __tablename__ = "movie_neighbors"
+    metric = Column(String, primary_key=True)
+    movieId = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    neighborId = Column(Integer, nullable=False)
+    similarity = Column(Float, nullable=False)
+
+
+class MovieNeighborSource(Base):
+    """Rating aggregates of each movie when its neighbors were last computed;
+    the incremental rebuild recomputes the movies whose aggregates moved."""
+
+    __tablename__ = "movie_neighbor_sources"
+    movieId = Column(Integer, primary_key=True)
+    rating_count = Column(Integer, nullable=False)
+    rating_sum = Column(Float, nullable=False)
+    last_rated = Column(Integer)
+
+
+class DatasetVersion(Base):
+    """Single-row table whose version is bumped on every data (re)load."""
+
+    __tablename__ = "dataset_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    loaded_at = Column(Integer, nullable=False)  # Unix timestamp
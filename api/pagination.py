@@ -0,0 +1,122 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is the sort-key tuple of the last row of a page, JSON-encoded
+then base64url-encoded so that clients treat it as an opaque token. The next
+page is fetched with a seek predicate on that key (``(a, b) > (?, ?)``)
+instead of an OFFSET, so every page costs the same as the first one.
+"""
+
+import base64
+import binascii
+import json
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values) -> str:
+    """Encode a key tuple as an opaque cursor."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """Decode a cursor produced by encode_cursor.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed or does not hold `size` scalar values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    # Keys are numbers or strings; anything else would reach the database.
+    if not all(
+        isinstance(value, (int, float, str)) and not isinstance(value, bool)
+        for value in values
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """Decode a cursor produced by next_offset_cursor.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed or does not hold a non-negative integer.
+    """
+    (offset,) = decode_cursor(cursor, 1)
+    # The offset goes straight into OFFSET: no strings, fractions or negatives.
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+class Keyset:
+    """The columns a list is ordered and paged on.
+
+    `values` reads the key of a returned row; by default each column is read
+    from the row attribute of the same name. With `descending`, the whole
+    key is walked backwards so that a single row-value comparison still
+    describes "after this row".
+    """
+
+    def __init__(self, *columns, descending: bool = False, values=None):
+        self.columns = columns
+        self.descending = descending
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def values(self, row) -> tuple:
+        """Return the key of a row, as stored in a cursor."""
+        if self._values is not None:
+            return tuple(self._values(row))
+        return tuple(getattr(row, column.key) for column in self.columns)
+
+    def seek(self, query, after: tuple | None = None):
+        """Order a query by the key and start it after the given key."""
+        if self.descending:
+            query = query.order_by(*(column.desc() for column in self.columns))
+        else:
+            query = query.order_by(*self.columns)
+        if after is not None:
+            if len(self.columns) == 1:
+                left, right = self.columns[0], after[0]
+            else:
+                left, right = tuple_(*self.columns), tuple_(*after)
+            query = query.filter(left < right if self.descending else left > right)
+        return query
+
+
+def next_cursor(rows: list, limit: int, keyset: Keyset) -> str | None:
+    """Return the cursor of the page following `rows`, if there is one.
+
+    `rows` is expected to have been fetched with ``limit + 1`` so that the
+    extra look-ahead row tells whether another page exists; it is removed
+    from `rows` in place.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(keyset.values(rows[-1]))
+
+
+def next_offset_cursor(rows: list, limit: int, offset: int) -> str | None:
+    """Like next_cursor, for result sets that have no stable key order.
+
+    The cursor then carries the offset of the next page. This is meant for
+    small, ranked result sets (search matches) that are scored in full on
+    every request anyway, so the offset adds no real cost.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor((offset + limit,))
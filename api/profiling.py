@@ -0,0 +1,199 @@
+"""On-demand profiling of live requests.
+
+Set PROFILE_TOKEN to enable it; a request sent with the header
+``X-Profile: <token>`` then runs under a sampling profiler and answers with
+an ``X-Profile-Id`` header. Once the response is sent (streamed bodies
+included), two files named after that ID are written to PROFILE_DIR:
+
+- ``<id>.collapsed``: the sampled stacks in the collapsed format read by
+  flamegraph.pl, speedscope or inferno (``frame;frame;frame count``);
+- ``<id>.json``: the request, its status and duration, and every SQL
+  statement it ran with its parameters and duration.
+
+The sampler is a thread reading the stack of the event loop thread every
+PROFILE_INTERVAL_MS milliseconds; while the loop holds the GIL, it only gets
+to run every ``sys.getswitchinterval()`` (5 ms by default). Other requests served concurrently by the
+same worker show up in the samples too, so profile on a quiet worker, or
+compare with the SQL timings, which only cover the profiled request.
+Profiled requests bypass the response cache.
+
+Without PROFILE_TOKEN, neither the middleware nor the engine listeners are
+installed: the feature costs nothing.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from database import logger
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# SQL statements of the request being profiled, if any.
+_profiled_queries: ContextVar[list | None] = ContextVar(
+    "profiled_queries", default=None
+)
+
+
+def _frame_label(code) -> str:
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Counts the stacks of one thread, sampled at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._labels = {}
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """The samples in the collapsed stack format, most frequent first."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class Profiler:
+    """The profiling middleware and its engine listeners."""
+
+    def __init__(
+        self,
+        token: str = PROFILE_TOKEN,
+        directory: str = PROFILE_DIR,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+    ):
+        self.token = token
+        self.directory = directory
+        self.interval = interval_ms / 1000
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def instrument(self, engine):
+        """Record the statements of profiled requests run on a (sync) engine."""
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def _save(self, profile_id: str, sampler: StackSampler, meta: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        with open(f"{base}.collapsed", "w") as file:
+            file.write(sampler.collapsed())
+        with open(f"{base}.json", "w") as file:
+            json.dump(meta, file, indent=2, default=repr)
+        logger.info(
+            "Profile %s: %s %s in %.1f ms, %d samples, %d SQL statements",
+            profile_id,
+            meta["method"],
+            meta["path"],
+            meta["duration_ms"],
+            meta["samples"],
+            len(meta["sql"]),
+        )
+
+    async def middleware(self, request: Request, call_next):
+        """HTTP middleware profiling the requests that carry the token."""
+        token = request.headers.get(PROFILE_HEADER)
+        if token is None:
+            return await call_next(request)
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            return JSONResponse({"detail": "Invalid profile token"}, status_code=403)
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+        request.state.profiled = True
+        queries = []
+        context_token = _profiled_queries.set(queries)
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+        except Exception:
+            sampler.stop()
+            raise
+        finally:
+            _profiled_queries.reset(context_token)
+        response.headers[PROFILE_ID_HEADER] = profile_id
+
+        body = response.body_iterator
+
+        async def profiled_body():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                sampler.stop()
+                meta = {
+                    "id": profile_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "query": request.url.query,
+                    "status": response.status_code,
+                    "duration_ms": (time.perf_counter() - start) * 1000,
+                    "interval_ms": self.interval * 1000,
+                    "samples": sum(sampler.stacks.values()),
+                    "sql": queries,
+                }
+                self._save(profile_id, sampler, meta)
+
+        response.body_iterator = profiled_body()
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profiled_queries.get() is not None:
+        context._profile_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _profiled_queries.get()
+    if queries is not None:
+        elapsed = time.perf_counter() - context._profile_query_start
+        queries.append(
+            {
+                "statement": " ".join(statement.split()),
+                "parameters": parameters,
+                "duration_ms": elapsed * 1000,
+            }
+        )
+
+
+profiler = Profiler()
@@ -1,8 +1,42 @@
 """SQLAlchemy query helper functions for my API."""
 
-from models import Link, Movie, Rating, Tag
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+import search
+import stats  # importing it also registers the after_flush movie_stats refresh
+from genres import movies_with_genres
+from models import (
+    Genre,
+    Link,
+    Movie,
+    MovieGenre,
+    MovieNeighbor,
+    MovieStats,
+    Rating,
+    Tag,
+)
+from pagination import Keyset
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+# Keyset pagination order of each list endpoint (the primary key).
+MOVIE_KEY = Keyset(Movie.movieId)
+RATING_KEY = Keyset(Rating.userId, Rating.movieId)
+TAG_KEY = Keyset(Tag.userId, Tag.movieId, Tag.tag)
+LINK_KEY = Keyset(Link.movieId)
+
+# Orders available on /movies/: best average or most ratings first. The
+# list rows carry the sort column, from which the cursor is read.
+MOVIE_SORTS = {
+    "movieId": MOVIE_KEY,
+    "avg": Keyset(MovieStats.rating_mean, MovieStats.movieId, descending=True),
+    "count": Keyset(MovieStats.rating_count, MovieStats.movieId, descending=True),
+}
+
+# Columns read by the list helpers: they return rows of plain values rather
+# than ORM entities, which the list endpoints encode without a model pass.
+MOVIE_COLUMNS = (Movie.movieId, Movie.title, Movie.genres)
+RATING_COLUMNS = (Rating.movieId, Rating.userId, Rating.rating, Rating.timestamp)
+TAG_COLUMNS = (Tag.movieId, Tag.userId, Tag.tag, Tag.timestamp)
+LINK_COLUMNS = (Link.movieId, Link.imdbId, Link.tmdbId)
 
 
 # --- Films ---
@@ -11,23 +45,137 @@ def get_movie(db: Session, movie_id: int):
     return db.query(Movie).filter(Movie.movieId == movie_id).first()
 
 
+MOVIE_DETAIL_PARTS = ("ratings", "tags", "links", "stats")
+
+
+def get_movie_detail(
+    db: Session,
+    movie_id: int,
+    include=MOVIE_DETAIL_PARTS,
+    ratings_limit: int = 100,
+    tags_limit: int = 100,
+):
+    """Get a movie with only the requested related data, as a dict.
+
+    Links and stats are one-to-one and are joined into the movie query. The
+    ratings and tags collections are read with their own bounded query (at
+    most `ratings_limit` / `tags_limit` rows, by user) instead of loading
+    the whole relationship. Parts not in `include` are never queried.
+    """
+    joined = [
+        joinedload(getattr(Movie, part))
+        for part in ("links", "stats")
+        if part in include
+    ]
+    movie = db.query(Movie).options(*joined).filter(Movie.movieId == movie_id).first()
+    if movie is None:
+        return None
+
+    detail = {"movieId": movie.movieId, "title": movie.title, "genres": movie.genres}
+    if "links" in include:
+        detail["links"] = movie.links
+    if "stats" in include:
+        detail["stats"] = movie.stats
+    if "ratings" in include:
+        detail["ratings"] = get_ratings(db, limit=ratings_limit, movie_id=movie_id)
+    if "tags" in include:
+        detail["tags"] = get_tags(db, limit=tags_limit, movie_id=movie_id)
+    return detail
+
+
 def get_movies(
     db: Session,
     skip: int = 0,
     limit: int = 100,
     title: str | None = None,
-    genre: str | None = None,
+    genres: list[str] | None = None,
+    genre_mode: str = "any",
+    min_avg: float | None = None,
+    min_count: int | None = None,
+    sort: str = "movieId",
+    after: tuple | None = None,
 ):
-    """Get a list of movies with optional filters."""
-    query = db.query(Movie)
+    """Get a list of movies with optional filters, after a cursor key.
 
+    `genres` keeps the movies having any of the genres, or all of them when
+    `genre_mode` is "all". `min_avg`, `min_count` and the "avg"/"count"
+    sorts read the precomputed movie_stats. With the FTS5 index, a title
+    search returns the matches best-ranked first (see search.ranked_matches;
+    ties go to the most rated movies) and is paged with `skip` only: `sort`
+    and `after` are ignored. Rows hold the MOVIE_COLUMNS, and the sort
+    column with the "avg"/"count" sorts.
+    """
+    query = db.query(*MOVIE_COLUMNS)
+
+    keyset = MOVIE_SORTS[sort]
+    if keyset is not MOVIE_KEY:
+        query = query.add_columns(keyset.columns[0])
+    if min_avg is not None or min_count is not None or keyset is not MOVIE_KEY:
+        query = query.join(Movie.stats)
+        if min_avg is not None:
+            query = query.filter(MovieStats.rating_mean >= min_avg)
+        if min_count is not None:
+            query = query.filter(MovieStats.rating_count >= min_count)
+
+    if genres:
+        matching = movies_with_genres(genres, match_all=genre_mode == "all")
+        query = query.filter(Movie.movieId.in_(matching))
+    if title and search.supports_search_index(db):
+        matches = search.ranked_matches(title)
+        if matches is None:
+            return []
+        # Whole-word matches first, then bm25, then the most rated movies.
+        popularity = (
+            select(MovieStats.rating_count)
+            .where(MovieStats.movieId == Movie.movieId)
+            .scalar_subquery()
+        )
+        query = query.join(matches, Movie.movieId == matches.c.movieId)
+        query = query.order_by(
+            matches.c.exact.desc(), matches.c.rank, popularity.desc(), Movie.movieId
+        )
+        return query.offset(skip).limit(limit).all()
     if title:
         query = query.filter(Movie.title.ilike(f"%{title}%"))
-    if genre:
-        query = query.filter(Movie.genres.ilike(f"%{genre}%"))
+    query = keyset.seek(query, after)
     return query.offset(skip).limit(limit).all()
 
 
+def get_movie_stats(db: Session, movie_id: int):
+    """Get the precomputed rating aggregates of a movie."""
+    return db.get(MovieStats, movie_id)
+
+
+def get_movies_by_ids(db: Session, movie_ids):
+    """Get the given movies in one IN query, in no particular order."""
+    return db.query(Movie).filter(Movie.movieId.in_(set(movie_ids))).all()
+
+
+def get_movie_titles(db: Session, movie_ids) -> dict[int, str]:
+    """Get the titles of the given movies in one query, keyed by movie ID."""
+    rows = db.execute(
+        select(Movie.movieId, Movie.title).where(Movie.movieId.in_(set(movie_ids)))
+    )
+    return dict(rows.all())
+
+
+def get_similar_movies(
+    db: Session, movie_id: int, limit: int = 10, metric: str = "cosine"
+):
+    """Get the precomputed most similar movies of a movie, best first."""
+    rows = db.execute(
+        select(MovieNeighbor.neighborId, Movie.title, MovieNeighbor.similarity)
+        .join(Movie, Movie.movieId == MovieNeighbor.neighborId)
+        .where(MovieNeighbor.metric == metric, MovieNeighbor.movieId == movie_id)
+        .order_by(MovieNeighbor.rank)
+        .limit(limit)
+    )
+    return [
+        {"movieId": neighbor_id, "title": title, "similarity": similarity}
+        for neighbor_id, title, similarity in rows
+    ]
+
+
 # --- Ratings ---
 def get_rating(db: Session, user_id: int, movie_id: int):
     """Get a rating by user ID and movie ID."""
@@ -38,6 +186,39 @@ def get_rating(db: Session, user_id: int, movie_id: int):
     )
 
 
+def get_ratings_by_keys(db: Session, keys):
+    """Get the ratings of the given (userId, movieId) pairs in one IN query,
+    in no particular order."""
+    keys = set(keys)
+    # The userId IN (...) lets SQLite search the primary key, which it does
+    # not do for a row-value IN on its own.
+    return (
+        db.query(Rating)
+        .filter(
+            Rating.userId.in_({user_id for user_id, _ in keys}),
+            Rating.movieId.in_({movie_id for _, movie_id in keys}),
+            tuple_(Rating.userId, Rating.movieId).in_(keys),
+        )
+        .all()
+    )
+
+
+def rating_filters(
+    movie_id: int | None = None,
+    user_id: int | None = None,
+    min_rating: float | None = None,
+) -> list:
+    """WHERE clauses of the ratings filters shared by the list and export."""
+    filters = []
+    if movie_id:
+        filters.append(Rating.movieId == movie_id)
+    if user_id:
+        filters.append(Rating.userId == user_id)
+    if min_rating:
+        filters.append(Rating.rating >= min_rating)
+    return filters
+
+
 def get_ratings(
     db: Session,
     skip: int = 0,
@@ -45,16 +226,14 @@ def get_ratings(
     movie_id: int | None = None,
     user_id: int | None = None,
     min_rating: float | None = None,
+    after: tuple | None = None,
 ):
-    """Get a list of ratings with optional filters."""
-    query = db.query(Rating)
-
-    if movie_id:
-        query = query.filter(Rating.movieId == movie_id)
-    if user_id:
-        query = query.filter(Rating.userId == user_id)
-    if min_rating:
-        query = query.filter(Rating.rating >= min_rating)
+    """Get a list of ratings with optional filters, after a cursor key, as
+    rows of RATING_COLUMNS."""
+    query = db.query(*RATING_COLUMNS).filter(
+        *rating_filters(movie_id, user_id, min_rating)
+    )
+    query = RATING_KEY.seek(query, after)
     return query.offset(skip).limit(limit).all()
 
 
@@ -68,20 +247,28 @@ def get_tag(db: Session, user_id: int, movie_id: int, tag_text: str):
     )
 
 
+def tag_filters(movie_id: int | None = None, user_id: int | None = None) -> list:
+    """WHERE clauses of the tags filters shared by the list and export."""
+    filters = []
+    if movie_id is not None:
+        filters.append(Tag.movieId == movie_id)
+    if user_id is not None:
+        filters.append(Tag.userId == user_id)
+    return filters
+
+
 def get_tags(
     db: Session,
     skip: int = 0,
     limit: int = 100,
     movie_id: int | None = None,
     user_id: int | None = None,
+    after: tuple | None = None,
 ):
-    """Get a list of tags with optional filters."""
-    query = db.query(Tag)
-
-    if movie_id is not None:
-        query = query.filter(Tag.movieId == movie_id)
-    if user_id is not None:
-        query = query.filter(Tag.userId == user_id)
+    """Get a list of tags with optional filters, after a cursor key, as rows
+    of TAG_COLUMNS."""
+    query = db.query(*TAG_COLUMNS).filter(*tag_filters(movie_id, user_id))
+    query = TAG_KEY.seek(query, after)
     return query.offset(skip).limit(limit).all()
 
 
@@ -91,9 +278,16 @@ def get_link(db: Session, movie_id: int):
     return db.query(Link).filter(Link.movieId == movie_id).first()
 
 
-def get_links(db: Session, skip: int = 0, limit: int = 100):
-    """Get a list of links with optional filters."""
-    return db.query(Link).offset(skip).limit(limit).all()
+def get_links_by_ids(db: Session, movie_ids):
+    """Get the links of the given movies in one IN query, in no particular
+    order."""
+    return db.query(Link).filter(Link.movieId.in_(set(movie_ids))).all()
+
+
+def get_links(db: Session, skip: int = 0, limit: int = 100, after: tuple | None = None):
+    """Get a list of links, after a cursor key, as rows of LINK_COLUMNS."""
+    query = LINK_KEY.seek(db.query(*LINK_COLUMNS), after)
+    return query.offset(skip).limit(limit).all()
 
 
 def get_movie_count(db: Session):
@@ -123,3 +317,162 @@ def get_average_rating(db: Session):
         return 0.0
     total_score = db.query(func.sum(Rating.rating)).scalar() or 0.0
     return total_score / total_ratings
+
+
+def get_dataset_totals(db: Session):
+    """Get the dataset-wide counts and average rating in a single query.
+
+    The rating count and sum come from movie_stats (one row per movie)
+    rather than from a scan of the ratings table.
+    """
+    movies, ratings, rating_sum, tags, links = db.execute(
+        select(
+            select(func.count()).select_from(Movie).scalar_subquery(),
+            select(func.sum(MovieStats.rating_count)).scalar_subquery(),
+            select(func.sum(MovieStats.rating_sum)).scalar_subquery(),
+            select(func.count()).select_from(Tag).scalar_subquery(),
+            select(func.count()).select_from(Link).scalar_subquery(),
+        )
+    ).one()
+    ratings = ratings or 0
+    return {
+        "total_movies": movies,
+        "total_ratings": ratings,
+        "average_rating": (rating_sum or 0.0) / ratings if ratings else 0.0,
+        "total_tags": tags,
+        "total_links": links,
+    }
+
+
+def get_ratings_per_user(db: Session):
+    """Get the distribution of the number of ratings per user."""
+    counts = sorted(
+        db.execute(select(func.count()).select_from(Rating).group_by(Rating.userId))
+        .scalars()
+        .all()
+    )
+    if not counts:
+        return None
+    return {
+        "users": len(counts),
+        "min": counts[0],
+        "median": counts[len(counts) // 2],
+        "p90": counts[int(len(counts) * 0.9)],
+        "max": counts[-1],
+        "mean": sum(counts) / len(counts),
+    }
+
+
+def get_top_genres(db: Session, limit: int = 10):
+    """Get the genres with the most movies."""
+    movies = func.count(MovieGenre.movieId)
+    rows = db.execute(
+        select(Genre.name, movies)
+        .join(MovieGenre, MovieGenre.genreId == Genre.genreId)
+        .group_by(Genre.genreId)
+        .order_by(movies.desc(), Genre.name)
+        .limit(limit)
+    )
+    return [{"genre": name, "movies": count} for name, count in rows]
+
+
+def _histogram(steps_counts) -> dict[str, int]:
+    """Histogram keyed "0.5" to "5.0" from (rating * 2, count) pairs."""
+    counts = dict(steps_counts)
+    return {f"{step / 2:.1f}": counts.get(step, 0) for step in stats.HISTOGRAM_STEPS}
+
+
+def get_user_stats(db: Session, user_id: int):
+    """Get the rating aggregates of a user, computed from their ratings."""
+    rating = Rating.rating
+    row = db.execute(
+        select(
+            func.count(rating),
+            func.avg(rating),
+            *(
+                func.count(case((rating == step / 2, 1)))
+                for step in stats.HISTOGRAM_STEPS
+            ),
+            func.min(Rating.timestamp),
+            func.max(Rating.timestamp),
+        ).where(Rating.userId == user_id)
+    ).one()
+    count, mean, *histogram, first_rated, last_rated = row
+    if not count:
+        return None
+    return {
+        "userId": user_id,
+        "rating_count": count,
+        "rating_mean": mean,
+        "histogram": _histogram(zip(stats.HISTOGRAM_STEPS, histogram)),
+        "first_rated": first_rated,
+        "last_rated": last_rated,
+    }
+
+
+def get_rating_histogram(
+    db: Session, movie_id: int | None = None, user_id: int | None = None
+):
+    """Get the number of ratings per rating value, optionally for a movie
+    and/or a user."""
+    rows = db.execute(
+        select(Rating.rating * 2, func.count())
+        .where(*rating_filters(movie_id, user_id))
+        .group_by(Rating.rating)
+    )
+    histogram = _histogram((round(step), count) for step, count in rows)
+    return {
+        "movieId": movie_id,
+        "userId": user_id,
+        "rating_count": sum(histogram.values()),
+        "histogram": histogram,
+    }
+
+
+# strftime formats of the timeline buckets, on SQLite and PostgreSQL.
+TIMELINE_BUCKETS = {
+    "year": ("%Y", "YYYY"),
+    "month": ("%Y-%m", "YYYY-MM"),
+    "day": ("%Y-%m-%d", "YYYY-MM-DD"),
+}
+
+
+def _period(db: Session, bucket: str):
+    sqlite_format, postgres_format = TIMELINE_BUCKETS[bucket]
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime(sqlite_format, Rating.timestamp, "unixepoch")
+    return func.to_char(func.to_timestamp(Rating.timestamp), postgres_format)
+
+
+def get_rating_timeline(
+    db: Session,
+    bucket: str = "year",
+    movie_id: int | None = None,
+    user_id: int | None = None,
+):
+    """Get the number and mean of ratings per year, month or day (UTC)."""
+    period = _period(db, bucket)
+    rows = db.execute(
+        select(period, func.count(), func.avg(Rating.rating))
+        .where(*rating_filters(movie_id, user_id))
+        .group_by(period)
+        .order_by(period)
+    )
+    return {
+        "bucket": bucket,
+        "movieId": movie_id,
+        "userId": user_id,
+        "periods": [
+            {"period": period, "rating_count": count, "rating_mean": mean}
+            for period, count, mean in rows
+        ],
+    }
+
+
+def get_analytics(db: Session):
+    """Get the dataset totals along with the richer dataset statistics."""
+    return {
+        **get_dataset_totals(db),
+        "ratings_per_user": get_ratings_per_user(db),
+        "top_genres": get_top_genres(db),
+    }
@@ -0,0 +1,327 @@
+"""Per-user movie recommendations from a matrix factorization of the ratings.
+
+The model is trained offline by alternating least squares (ALS): every
+rating is approximated by ``mean + user_bias + movie_bias + p_u . q_m`` with
+FACTORS-dimensional user and movie vectors. Ranking the movies of one user
+only needs ``movie_bias + p_u . q_m``, so the model is saved as two
+contiguous float32 matrices with the bias folded in::
+
+    users:  [p_u, 1]          (users x FACTORS + 1)
+    movies: [q_m, movie_bias] (movies x FACTORS + 1)
+
+Scoring a user is then one matrix-vector product over every movie, after
+which the movies the user already rated are masked and the top N picked
+with ``argpartition``; scoring a batch of users is one matrix-matrix
+product. The movies rated by each user are saved along with the model, as
+CSR offsets into one array.
+
+Usage (from the ``api`` directory)::
+
+    python recommend.py [--factors 32] [--iterations 10] [--regularization 0.1]
+
+The API memory-maps the files of RECOMMENDER_DIR and maps them again
+whenever a training replaces them (see ModelCache). The model records the
+dataset version it was trained on; while that is older than the served
+version, the API keeps answering from it and logs a warning: train again
+after a data reload to take the new ratings into account.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from database import DATABASE_URL, logger
+from models import Rating
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from versioning import read_dataset_version
+
+try:
+    import numpy as np
+except ImportError:  # recommendations are optional
+    np = None
+
+RECOMMENDER_DIR = os.getenv("RECOMMENDER_DIR", "./recommender")
+FACTORS = 32
+ITERATIONS = 10
+REGULARIZATION = 0.1
+
+ARRAYS = ("user_ids", "movie_ids", "users", "movies", "seen_offsets", "seen")
+META_FILE = "meta.json"
+# Users scored per matrix product by recommend_many: bounds its memory to
+# SCORE_CHUNK_SIZE x movies scores (~20 MB of float32 for 10k movies).
+SCORE_CHUNK_SIZE = 512
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Recommendations require numpy (pip install numpy)")
+
+
+def _solve_all(fixed, offsets, others, residuals, regularization: float):
+    """One ALS half-step: the vector of each row, by ridge regression on the
+    `fixed` vectors of the items it rated (CSR `offsets` / `others`)."""
+    factors = fixed.shape[1]
+    identity = regularization * np.eye(factors, dtype="float64")
+    solved = np.zeros((len(offsets) - 1, factors), dtype="float64")
+    for row in range(len(offsets) - 1):
+        start, end = offsets[row], offsets[row + 1]
+        if start == end:
+            continue
+        vectors = fixed[others[start:end]]
+        solved[row] = np.linalg.solve(
+            vectors.T @ vectors + identity * (end - start),
+            vectors.T @ residuals[start:end],
+        )
+    return solved
+
+
+def _csr(rows, columns, values, count):
+    """(offsets, columns, values) of the entries grouped by row."""
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(count + 1, dtype="int64")
+    np.cumsum(np.bincount(rows, minlength=count), out=offsets[1:])
+    return offsets, columns[order], values[order]
+
+
+def train(
+    user_ids,
+    movie_ids,
+    ratings,
+    factors: int = FACTORS,
+    iterations: int = ITERATIONS,
+    regularization: float = REGULARIZATION,
+    seed: int = 0,
+) -> dict:
+    """Fit the factorization; returns the arrays saved by save_model."""
+    _require_numpy()
+    users, user_rows = np.unique(user_ids, return_inverse=True)
+    movies, movie_rows = np.unique(movie_ids, return_inverse=True)
+    ratings = np.asarray(ratings, dtype="float64")
+
+    mean = ratings.mean()
+    user_counts = np.bincount(user_rows, minlength=len(users))
+    movie_counts = np.bincount(movie_rows, minlength=len(movies))
+    # Damped biases: movies with few ratings stay close to the mean.
+    user_bias = np.bincount(user_rows, ratings - mean, len(users)) / (user_counts + 10)
+    movie_bias = np.bincount(
+        movie_rows, ratings - mean - user_bias[user_rows], len(movies)
+    ) / (movie_counts + 10)
+    residuals = ratings - mean - user_bias[user_rows] - movie_bias[movie_rows]
+
+    by_user = _csr(user_rows, movie_rows, residuals, len(users))
+    by_movie = _csr(movie_rows, user_rows, residuals, len(movies))
+    rng = np.random.default_rng(seed)
+    user_vectors = rng.normal(0, 0.1, (len(users), factors))
+    movie_vectors = rng.normal(0, 0.1, (len(movies), factors))
+    for _ in range(iterations):
+        user_vectors = _solve_all(movie_vectors, *by_user, regularization)
+        movie_vectors = _solve_all(user_vectors, *by_movie, regularization)
+
+    # The movies each user rated, masked out of their recommendations.
+    seen_offsets, seen, _ = by_user
+    return {
+        "user_ids": users.astype("int64"),
+        "movie_ids": movies.astype("int64"),
+        "users": np.ascontiguousarray(
+            np.hstack([user_vectors, np.ones((len(users), 1))]), dtype="float32"
+        ),
+        "movies": np.ascontiguousarray(
+            np.hstack([movie_vectors, movie_bias[:, None]]), dtype="float32"
+        ),
+        "seen_offsets": seen_offsets,
+        "seen": seen.astype("int32"),
+    }
+
+
+def save_model(model: dict, directory: str = RECOMMENDER_DIR, version: int = 0):
+    """Write the model arrays as .npy files, then its metadata."""
+    os.makedirs(directory, exist_ok=True)
+    for name in ARRAYS:
+        # Written aside then renamed: processes mapping the old file keep it.
+        fd, path = tempfile.mkstemp(dir=directory, suffix=".npy")
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, model[name])
+        os.replace(path, os.path.join(directory, f"{name}.npy"))
+    # The metadata goes last, and atomically: its replacement tells the API
+    # that a new model is complete.
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w") as file:
+        json.dump({"version": version, "factors": model["users"].shape[1] - 1}, file)
+    os.replace(path, os.path.join(directory, META_FILE))
+
+
+class Recommender:
+    """A trained model, memory-mapped, and its top-N queries."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    @classmethod
+    def open(cls, directory: str = RECOMMENDER_DIR) -> "Recommender | None":
+        """Map the model files of `directory`, or None if there are none."""
+        _require_numpy()
+        try:
+            with open(os.path.join(directory, META_FILE)) as file:
+                meta = json.load(file)
+            arrays = {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in ARRAYS
+            }
+        except FileNotFoundError:
+            return None
+        return cls(arrays, meta)
+
+    @property
+    def version(self) -> int:
+        """The dataset version the model was trained on."""
+        return self.meta["version"]
+
+    def _rows(self, user_ids) -> tuple:
+        """Model rows of the known users, and the mask of known users."""
+        user_ids = np.asarray(user_ids, dtype="int64")
+        positions = np.searchsorted(self.user_ids, user_ids).clip(
+            max=len(self.user_ids) - 1
+        )
+        known = self.user_ids[positions] == user_ids
+        return positions[known], known
+
+    def _top(self, scores, rows, n: int) -> list[list[tuple[int, float]]]:
+        """(movieId, score) of the N best unseen movies of each row of
+        `scores`, the scores of the model users `rows`."""
+        # Mask every (row, seen movie) pair at once: the seen ranges of the
+        # rows, concatenated.
+        starts = self.seen_offsets[rows]
+        lengths = self.seen_offsets[rows + 1] - starts
+        shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        seen = self.seen[np.arange(lengths.sum()) + shifts]
+        scores[np.repeat(np.arange(len(rows)), lengths), seen] = -np.inf
+
+        n = min(n, scores.shape[1])
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        movie_ids = self.movie_ids[np.take_along_axis(top, order, axis=1)].tolist()
+        top_scores = np.take_along_axis(top_scores, order, axis=1).tolist()
+        return [
+            [
+                (movie_id, score)
+                for movie_id, score in zip(movies, values)
+                if score > -np.inf
+            ]
+            for movies, values in zip(movie_ids, top_scores)
+        ]
+
+    def recommend(self, user_id: int, n: int = 10) -> list[tuple[int, float]] | None:
+        """(movieId, score) of the user's N best unseen movies, best first;
+        None if the model does not know the user."""
+        rows, _ = self._rows([user_id])
+        if not len(rows):
+            return None
+        return self._top((self.movies @ self.users[rows[0]])[None, :], rows, n)[0]
+
+    def recommend_many(self, user_ids, n: int = 10) -> dict:
+        """recommend() for many users, scored SCORE_CHUNK_SIZE users per
+        matrix product. Returns {userId: [(movieId, score), ...]} for the
+        users the model knows."""
+        rows, known = self._rows(user_ids)
+        known_ids = np.asarray(user_ids, dtype="int64")[known].tolist()
+        top = []
+        for start in range(0, len(rows), SCORE_CHUNK_SIZE):
+            chunk = rows[start : start + SCORE_CHUNK_SIZE]
+            top.extend(self._top(self.users[chunk] @ self.movies.T, chunk, n))
+        return dict(zip(known_ids, top))
+
+
+class ModelCache:
+    """The model of `directory`, mapped again whenever it is retrained.
+
+    The model is keyed on its metadata file, which save_model replaces last:
+    a new training is picked up by the next call, and a missing model is
+    looked for again on every call rather than remembered as missing.
+    """
+
+    def __init__(self, directory: str = RECOMMENDER_DIR):
+        self.directory = directory
+        self._key = None
+        self._model = None
+        self._warned = None
+
+    def get(self, dataset_version: int | None = None) -> Recommender | None:
+        """The current model, or None if none was trained. A warning is
+        logged (once) when it was trained on another dataset version."""
+        try:
+            stat = os.stat(os.path.join(self.directory, META_FILE))
+        except FileNotFoundError:
+            self._key = self._model = None
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._key:
+            self._model = Recommender.open(self.directory)
+            self._key = key if self._model is not None else None
+        model = self._model
+        if (
+            model is not None
+            and dataset_version is not None
+            and model.version != dataset_version
+            and self._warned != (key, dataset_version)
+        ):
+            self._warned = (key, dataset_version)
+            logger.warning(
+                "Recommendation model trained on dataset version %s, serving "
+                "version %s: run python recommend.py",
+                model.version,
+                dataset_version,
+            )
+        return model
+
+
+def load_training_data(conn):
+    """(userId, movieId, rating) arrays of every rating."""
+    rows = conn.execute(select(Rating.userId, Rating.movieId, Rating.rating)).all()
+    user_ids, movie_ids, ratings = zip(*rows) if rows else ((), (), ())
+    return (
+        np.array(user_ids, dtype="int64"),
+        np.array(movie_ids, dtype="int64"),
+        np.array(ratings, dtype="float64"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--directory", default=RECOMMENDER_DIR)
+    parser.add_argument("--factors", type=int, default=FACTORS)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--regularization", type=float, default=REGULARIZATION)
+    args = parser.parse_args()
+    if np is None:
+        parser.error("training requires numpy")
+
+    with Session(create_engine(args.database_url)) as db:
+        version, _ = read_dataset_version(db)
+        user_ids, movie_ids, ratings = load_training_data(db.connection())
+    start = time.perf_counter()
+    model = train(
+        user_ids,
+        movie_ids,
+        ratings,
+        args.factors,
+        args.iterations,
+        args.regularization,
+    )
+    elapsed = time.perf_counter() - start
+    save_model(model, args.directory, version)
+    print(
+        f"{len(model['user_ids'])} users x {len(model['movie_ids'])} movies, "
+        f"{args.factors} factors, trained in {elapsed:.1f}s "
+        f"(dataset version {version})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Cache of the serialized responses of the read endpoints.
+
+Between two loads the dataset does not change, so a GET answered once can be
+answered again from the cache, without a database query nor a Pydantic
+serialization. Entries are keyed on the dataset version (see versioning.py),
+the path and the sorted query parameters, expire after RESPONSE_CACHE_TTL
+seconds and live in the backend selected by CACHE_BACKEND (see
+cache_backends.py): a per-process LRU of RESPONSE_CACHE_SIZE entries, or
+Redis shared by the workers. Concurrent misses on the same key are computed
+once.
+
+Every cached response carries an ``ETag`` (a hash of its body) and a
+``Last-Modified`` (the time of the last load), so clients revalidating with
+``If-None-Match`` get a 304 without a body.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from email.utils import formatdate
+from urllib.parse import urlencode
+
+from cache_backends import (
+    CacheBackend,
+    SingleFlight,
+    create_backend,
+    release_lock,
+    wait_for_lock,
+)
+from database import AsyncSessionLocal
+from fastapi import Request, Response
+from versioning import DatasetVersionWatcher, dataset_version
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# Paths of the read endpoints whose responses are cached.
+CACHED_PATHS = ("/movies", "/ratings", "/tags", "/links", "/analytics")
+
+# Response headers stored along with the body.
+KEPT_HEADERS = ("content-type", "x-next-cursor")
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: dict
+    etag: str
+
+    def dumps(self) -> bytes:
+        meta = json.dumps({"headers": self.headers, "etag": self.etag})
+        return meta.encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        meta, body = data.split(b"\n", 1)
+        meta = json.loads(meta)
+        return cls(body=body, headers=meta["headers"], etag=meta["etag"])
+
+
+def cache_key(request: Request) -> str:
+    """The path and the query parameters in a canonical order."""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """Responses valid for `ttl` seconds and one dataset version."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float = RESPONSE_CACHE_TTL,
+        watcher: DatasetVersionWatcher = dataset_version,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.watcher = watcher
+        self.enabled = enabled
+        self.single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **await self.backend.stats(),
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.single_flight.coalesced,
+            "not_modified": self.not_modified,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _headers(self, entry: CachedResponse, status: str) -> dict:
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={int(self.ttl)}",
+            "X-Cache": status,
+        }
+        if self.watcher.loaded_at:
+            headers["Last-Modified"] = formatdate(self.watcher.loaded_at, usegmt=True)
+        return headers
+
+    def _respond(self, request: Request, entry: CachedResponse, status: str):
+        headers = self._headers(entry, status)
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=entry.body, headers={**entry.headers, **headers}, status_code=200
+        )
+
+    async def _fill(self, key: str, request: Request, call_next):
+        """Compute and store the response of `key`. Returns (entry, None), or
+        (None, response) when the response is not cacheable."""
+        locked = False
+        if self.backend.shared:
+            locked, data = await wait_for_lock(self.backend, key)
+            if data is not None:
+                return CachedResponse.loads(data), None
+        try:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return None, response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = CachedResponse(
+                body=body,
+                headers={
+                    name: response.headers[name]
+                    for name in KEPT_HEADERS
+                    if name in response.headers
+                },
+                etag=make_etag(body),
+            )
+            await self.backend.set(key, entry.dumps(), self.ttl)
+            return entry, None
+        finally:
+            if locked:
+                await release_lock(self.backend, key)
+
+    async def middleware(self, request: Request, call_next):
+        """HTTP middleware serving cached GETs of the read endpoints."""
+        if (
+            not self.enabled
+            or request.method != "GET"
+            or not request.url.path.startswith(CACHED_PATHS)
+            # A profiled request must run the endpoint (see profiling.py).
+            or getattr(request.state, "profiled", False)
+        ):
+            return await call_next(request)
+
+        async with AsyncSessionLocal() as db:
+            version = await self.watcher.current(db)
+        key = f"{version}:{cache_key(request)}"
+        data = await self.backend.get(key)
+        if data is not None:
+            self.hits += 1
+            return self._respond(request, CachedResponse.loads(data), "HIT")
+
+        self.misses += 1
+        leader = False
+
+        async def fill():
+            nonlocal leader
+            leader = True
+            return await self._fill(key, request, call_next)
+
+        entry, response = await self.single_flight.do(key, fill)
+        if entry is None:
+            # Errors are not shared: the waiters compute their own.
+            return response if leader else await call_next(request)
+        return self._respond(request, entry, "MISS" if leader else "COALESCED")
+
+
+response_cache = ResponseCache(
+    create_backend(max_size=RESPONSE_CACHE_SIZE), enabled=RESPONSE_CACHE_SIZE > 0
+)
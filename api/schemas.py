@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 # --- Schémas secondaires ---
 
@@ -9,8 +9,7 @@ class RatingBase(BaseModel):
     rating: float
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TagBase(BaseModel):
@@ -19,16 +18,14 @@ class TagBase(BaseModel):
     tag: str
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class LinkBase(BaseModel):
     imdbId: str | None = None
     tmdbId: int | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # --- Schémas principaux pour Movie ---
@@ -39,14 +36,31 @@ class MovieBase(BaseModel):
     title: str
     genres: str | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MovieStats(BaseModel):
+    movieId: int
+    rating_count: int
+    rating_mean: float
+    histogram: dict[str, int]
+    first_rated: int | None = None
+    last_rated: int | None = None
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MovieDetailed(MovieBase):
     ratings: list[RatingBase] = []
     tags: list[TagBase] = []
     links: LinkBase | None = None
+    stats: MovieStats | None = None
+
+
+class SimilarMovie(BaseModel):
+    movieId: int
+    title: str
+    similarity: float
 
 
 # --- Schémas pour liste de films (sans détails imbriqués) ---
@@ -55,8 +69,7 @@ class MovieSimple(BaseModel):
     title: str
     genres: str | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # --- Pour les endpoints de /ratings et /tags si appelés seuls ---
@@ -66,8 +79,7 @@ class RatingSimple(BaseModel):
     rating: float
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TagSimple(BaseModel):
@@ -76,8 +88,7 @@ class TagSimple(BaseModel):
     tag: str
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class LinkSimple(BaseModel):
@@ -85,8 +96,21 @@ class LinkSimple(BaseModel):
     imdbId: str | None = None
     tmdbId: int | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RatingsPerUser(BaseModel):
+    users: int
+    min: int
+    median: int
+    p90: int
+    max: int
+    mean: float
+
+
+class GenreCount(BaseModel):
+    genre: str
+    movies: int
 
 
 class AnalyticsResponse(BaseModel):
@@ -95,6 +119,88 @@ class AnalyticsResponse(BaseModel):
     average_rating: float
     total_tags: int
     total_links: int
+    ratings_per_user: RatingsPerUser | None = None
+    top_genres: list[GenreCount] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# --- Statistiques des notes par utilisateur, histogrammes et chronologies ---
+class UserStats(BaseModel):
+    userId: int
+    rating_count: int
+    rating_mean: float
+    histogram: dict[str, int]
+    first_rated: int | None = None
+    last_rated: int | None = None
+
+
+class RatingHistogram(BaseModel):
+    movieId: int | None = None
+    userId: int | None = None
+    rating_count: int
+    histogram: dict[str, int]
+
+
+class TimelinePeriod(BaseModel):
+    period: str
+    rating_count: int
+    rating_mean: float
+
+
+class RatingTimeline(BaseModel):
+    bucket: str
+    movieId: int | None = None
+    userId: int | None = None
+    periods: list[TimelinePeriod]
+
+
+# --- Recommandations ---
+class Recommendation(BaseModel):
+    movieId: int
+    title: str
+    score: float
+
+
+class UserRecommendations(BaseModel):
+    userId: int
+    recommendations: list[Recommendation]
+
+
+class RecommendationBatchRequest(BaseModel):
+    user_ids: list[int] = Field(..., max_length=10000)
+    n: int = Field(10, gt=0, le=100)
+
+
+class RecommendationBatchResponse(BaseModel):
+    results: list[UserRecommendations]
+    not_found: list[int]
+
+
+# --- Requêtes groupées (POST /movies/batch, /links/batch, /ratings/batch) ---
+class IdBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=1000)
+
+
+class RatingKey(BaseModel):
+    userId: int
+    movieId: int
+
+
+class RatingBatchRequest(BaseModel):
+    keys: list[RatingKey] = Field(..., min_length=1, max_length=1000)
+
+
+class MovieBatchResponse(BaseModel):
+    items: list[MovieSimple | None]
+    not_found: list[int]
+
+
+class LinkBatchResponse(BaseModel):
+    items: list[LinkSimple | None]
+    not_found: list[int]
+
 
-    class Config:
-        orm_mode = True
+class RatingBatchResponse(BaseModel):
+    items: list[RatingSimple | None]
+    not_found: list[RatingKey]
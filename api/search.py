@@ -0,0 +1,117 @@
+"""Full-text title search backed by an SQLite FTS5 index.
+
+``movies_fts`` is an external-content FTS5 table over ``movies.title``: it
+only stores the inverted index, and triggers on ``movies`` keep it in sync
+with inserts, updates and deletes. The ``unicode61`` tokenizer with
+``remove_diacritics 2`` folds case and accents on both the indexed titles
+and the queries, so "amelie" finds "Amélie".
+"""
+
+import re
+import unicodedata
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, select
+
+# Kept off Base.metadata: the virtual table is managed by the DDL below,
+# never by create_all/drop_all.
+MOVIES_FTS = Table(
+    "movies_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("title", String),
+    Column("rank", Float),
+)
+
+_CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title,
+        content='movies',
+        content_rowid='movieId',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title) VALUES (new.movieId, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title)
+        VALUES ('delete', old.movieId, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title)
+        VALUES ('delete', old.movieId, old.title);
+        INSERT INTO movies_fts(rowid, title) VALUES (new.movieId, new.title);
+    END
+    """,
+]
+
+_TOKEN = re.compile(r"\w+")
+
+
+def supports_search_index(db) -> bool:
+    """Whether the database behind a session can use the FTS5 index."""
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def create_search_index(conn):
+    """Create the FTS table and its sync triggers if they do not exist."""
+    for statement in _CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+
+def drop_search_index(conn):
+    """Drop the FTS table (the triggers go away with the movies table)."""
+    conn.exec_driver_sql("DROP TABLE IF EXISTS movies_fts")
+
+
+def rebuild_search_index(conn):
+    """Re-index every title from the movies table in one pass."""
+    conn.exec_driver_sql("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')")
+
+
+def match_expression(text: str, prefix: bool = True) -> str | None:
+    """Turn free text into an FTS5 query: every token must match as a prefix
+    (or, without `prefix`, as a whole word).
+
+    Tokens are quoted so that user input can never be read as FTS5 query
+    syntax. Returns None when the text holds no searchable token.
+    """
+    folded = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    tokens = _TOKEN.findall(folded)
+    if not tokens:
+        return None
+    star = "*" if prefix else ""
+    return " ".join(f'"{token}"{star}' for token in tokens)
+
+
+def ranked_matches(text: str):
+    """Subquery of (movieId, exact, rank) for the titles matching free text,
+    or None when the text holds no searchable token.
+
+    Every token matches as a prefix. ``exact`` is 1 when they all match whole
+    words as well, and ``rank`` is FTS5's bm25 score, lower being a better
+    match. bm25 alone favours short titles: "toy" would rank "Toys (1992)"
+    above "Toy Story (1995)", so callers order by ``exact`` first.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return None
+    whole_words = select(MOVIES_FTS.c.rowid).where(
+        MOVIES_FTS.c.title.match(match_expression(text, prefix=False))
+    )
+    return (
+        select(
+            MOVIES_FTS.c.rowid.label("movieId"),
+            MOVIES_FTS.c.rowid.in_(whole_words).label("exact"),
+            MOVIES_FTS.c.rank,
+        )
+        .where(MOVIES_FTS.c.title.match(expression))
+        .subquery("matches")
+    )
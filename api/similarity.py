@@ -0,0 +1,262 @@
+"""Item-item similarity: the top-k most similar movies of every movie.
+
+The ratings form a sparse movies x users matrix. The cosine similarity of two
+movies is the dot product of their L2-normalized rows; the adjusted cosine
+first subtracts each user's mean rating, so that users who rate everything
+high (or low) do not make movies look alike. The similarities of a block of
+movies against all the others are one sparse matrix product, of which only
+the k best of each row are kept, in the movie_neighbors table: serving
+/movies/{id}/similar is then a read of k rows of one primary key range.
+
+Movies with fewer than MIN_RATINGS ratings are never proposed as neighbors:
+with one or two raters in common, the cosine is 1.0 by accident.
+
+Usage (from the ``api`` directory)::
+
+    python similarity.py [--full] [--k 20] [--database-url URL]
+
+Without --full, only the movies whose rating aggregates changed since their
+neighbors were computed (according to movie_stats) are recomputed, along
+with the movies listing one of those as a neighbor and the movies sharing a
+rater with one of those: the similarity of two movies only moves (or becomes
+positive, when a movie newly reaches MIN_RATINGS) if they have a rater in
+common. With the cosine, the result is the same as a full build. With the
+adjusted cosine, a new rating also moves its user's mean, and with it the
+similarities between other movies that user rated and movies they did not:
+those lists can drift slightly from a full build until the next --full.
+"""
+
+import argparse
+import os
+import time
+
+from database import DATABASE_URL
+from models import MovieNeighbor, MovieNeighborSource, MovieStats, Rating
+from sqlalchemy import create_engine, delete, exists, insert, or_, select
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # only needed to build the neighbors, not to serve them
+    np = sparse = None
+
+METRICS = ("cosine", "adjusted_cosine")
+NEIGHBORS_K = int(os.getenv("NEIGHBORS_K", "20"))
+MIN_RATINGS = int(os.getenv("NEIGHBORS_MIN_RATINGS", "5"))
+
+# Movies whose similarities are computed by one matrix product.
+BLOCK_SIZE = 1024
+INSERT_BATCH_SIZE = 50_000
+DELETE_CHUNK_SIZE = 500
+
+
+def load_ratings(conn):
+    """(movieId, userId, rating) arrays of every rating."""
+    rows = conn.execute(select(Rating.movieId, Rating.userId, Rating.rating)).all()
+    movie_ids, user_ids, ratings = zip(*rows) if rows else ((), (), ())
+    return (
+        np.array(movie_ids, dtype="int64"),
+        np.array(user_ids, dtype="int64"),
+        np.array(ratings, dtype="float32"),
+    )
+
+
+def rating_matrix(movie_ids, user_ids, ratings, metric: str = "cosine"):
+    """Movies x users CSR matrix with L2-normalized rows, and the movieId of
+    each row."""
+    movies, rows = np.unique(movie_ids, return_inverse=True)
+    users, columns = np.unique(user_ids, return_inverse=True)
+    values = ratings
+    if metric == "adjusted_cosine":
+        user_means = np.bincount(columns, weights=ratings) / np.bincount(columns)
+        values = (ratings - user_means[columns]).astype("float32")
+    elif metric != "cosine":
+        raise ValueError(f"Unknown similarity metric: {metric}")
+    matrix = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(len(movies), len(users)), dtype="float32"
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return movies, sparse.diags(inverse.astype("float32")) @ matrix
+
+
+def top_k_neighbors(matrix, rows, k: int, candidates):
+    """Yield (row, neighbor rows, similarities) for each of `rows`: its k most
+    similar rows among `candidates` (a boolean mask), best first, positive
+    similarities only."""
+    transposed = matrix.T.tocsc()
+    count = matrix.shape[0]
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start : start + BLOCK_SIZE]
+        scores = (matrix[block] @ transposed).toarray()
+        scores[:, ~candidates] = -np.inf
+        scores[np.arange(len(block)), block] = -np.inf
+        kth = min(k, count) - 1
+        if kth < 0:
+            continue
+        top = np.argpartition(-scores, kth, axis=1)[:, : kth + 1]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for row, neighbors, similarities in zip(block, top, top_scores):
+            keep = similarities > 0
+            yield row, neighbors[keep], similarities[keep]
+
+
+def _insert_neighbors(conn, rows: list[tuple]):
+    """Insert (metric, movieId, rank, neighborId, similarity) tuples straight
+    through the driver's executemany, as ingest.py does."""
+    table = MovieNeighbor.__table__
+    sql = str(table.insert().compile(dialect=conn.dialect))
+    if not conn.dialect.positional:
+        columns = [column.name for column in table.columns]
+        rows = [dict(zip(columns, row)) for row in rows]
+    conn.exec_driver_sql(sql, rows)
+
+
+def _delete_in_chunks(conn, table, column, movie_ids):
+    for start in range(0, len(movie_ids), DELETE_CHUNK_SIZE):
+        chunk = movie_ids[start : start + DELETE_CHUNK_SIZE]
+        conn.execute(delete(table).where(column.in_(chunk)))
+
+
+def changed_movies(conn) -> list[int] | None:
+    """Movies whose neighbors are out of date, or None if there are none yet
+    (a full build is needed)."""
+    if not conn.execute(select(exists().select_from(MovieNeighborSource))).scalar():
+        return None
+    source = MovieNeighborSource
+    changed = set(
+        conn.execute(
+            select(MovieStats.movieId)
+            .outerjoin(source, source.movieId == MovieStats.movieId)
+            .where(
+                or_(
+                    source.movieId.is_(None),
+                    source.rating_count != MovieStats.rating_count,
+                    source.rating_sum != MovieStats.rating_sum,
+                    source.last_rated.is_distinct_from(MovieStats.last_rated),
+                )
+            )
+        ).scalars()
+    )
+    changed.update(
+        conn.execute(
+            select(source.movieId).where(
+                ~exists().where(MovieStats.movieId == source.movieId)
+            )
+        ).scalars()
+    )
+    return sorted(changed)
+
+
+def rebuild_neighbors(
+    conn, k: int = NEIGHBORS_K, movie_ids: list[int] | None = None
+) -> int:
+    """Recompute the neighbors of every (or the given) movies for every
+    metric; returns the number of movies recomputed."""
+    movie_ids_array, user_ids, ratings = load_ratings(conn)
+    if movie_ids is not None:
+        # Movies listing a changed movie as neighbor, or sharing a rater with
+        # one (which it may now enter the list of), are stale as well.
+        stale = set(movie_ids)
+        raters = np.unique(user_ids[np.isin(movie_ids_array, movie_ids)])
+        stale.update(np.unique(movie_ids_array[np.isin(user_ids, raters)]).tolist())
+        for start in range(0, len(movie_ids), DELETE_CHUNK_SIZE):
+            chunk = movie_ids[start : start + DELETE_CHUNK_SIZE]
+            stale.update(
+                conn.execute(
+                    select(MovieNeighbor.movieId)
+                    .where(MovieNeighbor.neighborId.in_(chunk))
+                    .distinct()
+                ).scalars()
+            )
+        movie_ids = sorted(stale)
+        _delete_in_chunks(
+            conn, MovieNeighbor.__table__, MovieNeighbor.movieId, movie_ids
+        )
+        _delete_in_chunks(
+            conn, MovieNeighborSource.__table__, MovieNeighborSource.movieId, movie_ids
+        )
+    else:
+        conn.execute(delete(MovieNeighbor))
+        conn.execute(delete(MovieNeighborSource))
+
+    computed = 0
+    for metric in METRICS:
+        movies, matrix = rating_matrix(movie_ids_array, user_ids, ratings, metric)
+        candidates = (
+            np.bincount(np.searchsorted(movies, movie_ids_array)) >= MIN_RATINGS
+        )
+        if movie_ids is None:
+            rows = np.arange(len(movies))
+        else:
+            wanted = np.asarray(movie_ids, dtype="int64")
+            positions = np.searchsorted(movies, wanted).clip(max=len(movies) - 1)
+            rows = (
+                positions[movies[positions] == wanted] if len(movies) else positions[:0]
+            )
+        computed = len(rows)
+        batch = []
+        for row, neighbors, similarities in top_k_neighbors(
+            matrix, rows, k, candidates
+        ):
+            movie_id = int(movies[row])
+            batch.extend(
+                (metric, movie_id, rank, neighbor_id, similarity)
+                for rank, (neighbor_id, similarity) in enumerate(
+                    zip(movies[neighbors].tolist(), similarities.tolist()), start=1
+                )
+            )
+            if len(batch) >= INSERT_BATCH_SIZE:
+                _insert_neighbors(conn, batch)
+                batch = []
+        if batch:
+            _insert_neighbors(conn, batch)
+
+    sources = select(
+        MovieStats.movieId,
+        MovieStats.rating_count,
+        MovieStats.rating_sum,
+        MovieStats.last_rated,
+    )
+    columns = ["movieId", "rating_count", "rating_sum", "last_rated"]
+    if movie_ids is None:
+        conn.execute(insert(MovieNeighborSource).from_select(columns, sources))
+    else:
+        for start in range(0, len(movie_ids), DELETE_CHUNK_SIZE):
+            chunk = movie_ids[start : start + DELETE_CHUNK_SIZE]
+            conn.execute(
+                insert(MovieNeighborSource).from_select(
+                    columns, sources.where(MovieStats.movieId.in_(chunk))
+                )
+            )
+    return computed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--k", type=int, default=NEIGHBORS_K)
+    parser.add_argument(
+        "--full", action="store_true", help="recompute every movie's neighbors"
+    )
+    args = parser.parse_args()
+    if np is None:
+        parser.error("building the neighbors requires numpy and scipy")
+
+    engine = create_engine(args.database_url)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        movie_ids = None if args.full else changed_movies(conn)
+        if movie_ids == []:
+            print("Neighbors are up to date.")
+            return
+        computed = rebuild_neighbors(conn, args.k, movie_ids)
+    elapsed = time.perf_counter() - start
+    print(f"neighbors of {computed} movies computed in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Per-movie rating aggregates (the movie_stats table).
+
+movie_stats holds one row per movie with its rating count, sum, mean,
+histogram and first/last rating timestamps, so that "top rated" lists and
+per-movie stats are a single indexed read instead of an aggregation over
+ratings. It is rebuilt with one GROUP BY at ingest, then kept up to date
+movie by movie: whenever ratings are written through an ORM session, the
+aggregates of the touched movies are recomputed in the same transaction,
+each from a range of the (movieId, rating) covering index.
+"""
+
+from itertools import chain
+
+from models import Movie, MovieStats, Rating
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+# Ratings go by 0.5 steps: histogram bucket `step` counts rating == step / 2.
+HISTOGRAM_STEPS = range(1, 11)
+
+COLUMNS = [
+    "movieId",
+    "rating_count",
+    "rating_sum",
+    "rating_mean",
+    *(f"hist_{step * 5:02d}" for step in HISTOGRAM_STEPS),
+    "first_rated",
+    "last_rated",
+]
+
+REFRESH_CHUNK_SIZE = 500
+
+
+def aggregate_ratings(movie_ids=None):
+    """SELECT computing the movie_stats rows of every (or the given) movies."""
+    rating = Rating.rating
+    statement = (
+        select(
+            Movie.movieId,
+            func.count(rating),
+            func.coalesce(func.sum(rating), 0.0),
+            func.coalesce(func.avg(rating), 0.0),
+            *(func.count(case((rating == step / 2, 1))) for step in HISTOGRAM_STEPS),
+            func.min(Rating.timestamp),
+            func.max(Rating.timestamp),
+        )
+        .select_from(Movie)
+        .outerjoin(Rating, Rating.movieId == Movie.movieId)
+        .group_by(Movie.movieId)
+    )
+    if movie_ids is not None:
+        statement = statement.where(Movie.movieId.in_(movie_ids))
+    return statement
+
+
+def rebuild_movie_stats(conn) -> int:
+    """Recompute the aggregates of every movie; returns the rows written."""
+    conn.execute(delete(MovieStats))
+    result = conn.execute(insert(MovieStats).from_select(COLUMNS, aggregate_ratings()))
+    return result.rowcount
+
+
+def refresh_movie_stats(conn, movie_ids) -> None:
+    """Recompute the aggregates of the given movies only."""
+    movie_ids = sorted(set(movie_ids))
+    for start in range(0, len(movie_ids), REFRESH_CHUNK_SIZE):
+        chunk = movie_ids[start : start + REFRESH_CHUNK_SIZE]
+        conn.execute(delete(MovieStats).where(MovieStats.movieId.in_(chunk)))
+        conn.execute(insert(MovieStats).from_select(COLUMNS, aggregate_ratings(chunk)))
+
+
+def _touched_movie_ids(session: Session) -> set[int]:
+    """MovieIds whose ratings are part of the session's pending flush."""
+    movie_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Rating):
+            movie_ids.add(obj.movieId)
+            movie_ids.update(inspect(obj).attrs.movieId.history.deleted)
+    return movie_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    movie_ids = _touched_movie_ids(session)
+    if movie_ids:
+        refresh_movie_stats(session.connection(), movie_ids)
@@ -0,0 +1,108 @@
+"""Test fixtures: a small MovieLens-shaped database built by ingest.py.
+
+The API modules read their settings from the environment at import time, so
+the database URL and the model directories point to a temporary directory
+before anything from the API is imported.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="cinema-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR / 'movies.db'}"
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["DATASET_VERSION_CHECK_INTERVAL"] = "0"
+os.environ["RECOMMENDER_DIR"] = str(TEST_DIR / "recommender")
+os.environ["COLUMNAR_DIR"] = str(TEST_DIR / "columnar")
+
+MOVIES = [
+    (1, "Toy Story (1995)", "Adventure|Animation|Children|Comedy|Fantasy"),
+    (2, "Jumanji (1995)", "Adventure|Children|Fantasy"),
+    (3, "Toys (1992)", "Comedy|Fantasy"),
+    (4, "Amélie (Fabuleux destin d'Amélie Poulain, Le) (2001)", "Comedy|Romance"),
+    (5, "Heat (1995)", "Action|Crime|Thriller"),
+    (6, "Some Untitled Film (2018)", "(no genres listed)"),
+    (7, "Toy Story 2 (1999)", "Adventure|Animation|Children|Comedy|Fantasy"),
+]
+
+# (userId, movieId, rating, timestamp): Toy Story is the most rated movie.
+RATINGS = [
+    (1, 1, 4.0, 964982703),
+    (1, 2, 3.5, 964981247),
+    (1, 3, 2.0, 964982224),
+    (1, 5, 4.5, 964983815),
+    (2, 1, 5.0, 1445714835),
+    (2, 4, 4.0, 1445714994),
+    (2, 7, 4.0, 1445715013),
+    (3, 1, 4.5, 1306463578),
+    (3, 2, 3.0, 1306463591),
+    (3, 5, 5.0, 1306463616),
+    (4, 1, 3.5, 945078428),
+    (4, 4, 5.0, 945078863),
+    (5, 1, 4.0, 847434962),
+    (5, 7, 3.0, 847435238),
+]
+
+TAGS = [
+    (2, 1, "pixar", 1445714994),
+    (2, 4, "paris", 1445715010),
+    (3, 5, "heist", 1306463630),
+]
+
+LINKS = [
+    (movie_id, f"{114708 + movie_id:07d}", 862 + movie_id) for movie_id, *_ in MOVIES
+]
+
+
+def _write_csv(path: Path, header: list[str], rows: list[tuple]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_dataset(directory: Path) -> Path:
+    """Write the fixture dataset as the CSV files read by ingest.py."""
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_csv(directory / "movies.csv", ["movieId", "title", "genres"], MOVIES)
+    _write_csv(
+        directory / "ratings.csv", ["userId", "movieId", "rating", "timestamp"], RATINGS
+    )
+    _write_csv(directory / "tags.csv", ["userId", "movieId", "tag", "timestamp"], TAGS)
+    _write_csv(directory / "links.csv", ["movieId", "imdbId", "tmdbId"], LINKS)
+    return directory
+
+
+def build_fixture_database(database_url: str, data_dir: Path):
+    """Build a database from the fixture dataset; returns its engine."""
+    from ingest import build_database, create_ingest_engine
+
+    engine = create_ingest_engine(database_url)
+    build_database(engine, write_dataset(data_dir))
+    return engine
+
+
+@pytest.fixture(scope="session")
+def api_database():
+    """The database the API modules are configured on, built once."""
+    engine = build_fixture_database(os.environ["DATABASE_URL"], TEST_DIR / "data")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(api_database):
+    """A TestClient on the API, served from the fixture database."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,43 @@
+"""The batch endpoints: items in request order, null and `not_found` for misses."""
+
+import pytest
+
+
+def test_movies_batch_keeps_request_order(client):
+    response = client.post("/movies/batch", json={"ids": [7, 999, 1, 7]})
+    assert response.status_code == 200
+    body = response.json()
+    ids = [item and item["movieId"] for item in body["items"]]
+    assert ids == [7, None, 1, 7]
+    assert body["items"][2]["title"] == "Toy Story (1995)"
+    assert body["not_found"] == [999]
+
+
+def test_links_batch_keeps_request_order(client):
+    body = client.post("/links/batch", json={"ids": [3, 1000, 2]}).json()
+    assert [item and item["movieId"] for item in body["items"]] == [3, None, 2]
+    assert body["items"][0]["imdbId"] == "0114711"
+    assert body["not_found"] == [1000]
+
+
+def test_ratings_batch_keeps_request_order(client):
+    keys = [
+        {"userId": 3, "movieId": 5},
+        {"userId": 1, "movieId": 4},
+        {"userId": 1, "movieId": 1},
+    ]
+    body = client.post("/ratings/batch", json={"keys": keys}).json()
+    assert [item and item["rating"] for item in body["items"]] == [5.0, None, 4.0]
+    assert body["not_found"] == [{"userId": 1, "movieId": 4}]
+
+
+@pytest.mark.parametrize(
+    "path, payload",
+    [
+        ("/movies/batch", {"ids": []}),
+        ("/links/batch", {"ids": list(range(1001))}),
+        ("/ratings/batch", {"keys": []}),
+    ],
+)
+def test_batch_size_is_bounded(client, path, payload):
+    assert client.post(path, json=payload).status_code == 422
@@ -0,0 +1,172 @@
+"""The Redis cache backend and request coalescing, against fakeredis."""
+
+import asyncio
+
+import httpx
+import pytest
+from cache_backends import RedisBackend, SingleFlight, release_lock, wait_for_lock
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from response_cache import ResponseCache
+from versioning import DatasetVersionWatcher
+
+fakeredis = pytest.importorskip("fakeredis")
+from fakeredis.aioredis import FakeRedis  # noqa: E402
+
+TTL = 30
+
+
+def make_worker(server, delay: float = 0.05):
+    """An app cached in the shared Redis `server`, like one uvicorn worker;
+    `calls` counts the computations of its endpoint."""
+    cache = ResponseCache(
+        RedisBackend(FakeRedis(server=server)), ttl=TTL, watcher=DatasetVersionWatcher()
+    )
+    app = FastAPI()
+    app.state.calls = 0
+    app.middleware("http")(cache.middleware)
+
+    @app.get("/movies/slow")
+    async def slow(n: int = 0):
+        app.state.calls += 1
+        await asyncio.sleep(delay)
+        return JSONResponse({"n": n})
+
+    return app, cache
+
+
+def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+def test_set_get_with_ttl():
+    async def scenario():
+        redis = FakeRedis()
+        backend = RedisBackend(redis, prefix="test:")
+        await backend.set("key", b"value", 1.5)
+        assert await backend.get("key") == b"value"
+        assert 0 < await redis.pttl("test:key") <= 1500
+        assert not await backend.add("key", b"other", 1.5)
+        assert await backend.add("new", b"other", 1.5)
+        await redis.set("unrelated", b"1")
+        await backend.clear()
+        assert await backend.get("key") is None
+        assert await redis.get("unrelated") == b"1"
+
+    asyncio.run(scenario())
+
+
+def test_entries_carry_their_etag_and_ttl(api_database):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        app, _ = make_worker(server)
+        async with client_for(app) as client:
+            first = await client.get("/movies/slow", params={"n": 1})
+            second = await client.get("/movies/slow", params={"n": 1})
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == {"n": 1}
+        assert first.headers["ETag"] == second.headers["ETag"]
+        assert app.state.calls == 1
+
+        redis = FakeRedis(server=server)
+        (key,) = [key async for key in redis.scan_iter(match="cinema:*")]
+        assert key.endswith(b"/movies/slow?n=1")
+        assert 0 < await redis.pttl(key) <= TTL * 1000
+
+    asyncio.run(scenario())
+
+
+def test_if_none_match_gets_a_304(api_database):
+    async def scenario():
+        app, cache = make_worker(fakeredis.FakeServer())
+        async with client_for(app) as client:
+            etag = (await client.get("/movies/slow")).headers["ETag"]
+            response = await client.get("/movies/slow", headers={"If-None-Match": etag})
+            other = await client.get(
+                "/movies/slow", headers={"If-None-Match": '"stale"'}
+            )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert other.status_code == 200
+        assert cache.not_modified == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_are_computed_once(api_database):
+    async def scenario():
+        app, cache = make_worker(fakeredis.FakeServer())
+        async with client_for(app) as client:
+            responses = await asyncio.gather(
+                *(client.get("/movies/slow") for _ in range(10))
+            )
+        assert app.state.calls == 1
+        assert [r.json() for r in responses] == [{"n": 0}] * 10
+        statuses = sorted(r.headers["X-Cache"] for r in responses)
+        assert statuses == ["COALESCED"] * 9 + ["MISS"]
+        assert cache.single_flight.coalesced == 9
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_shares_exceptions():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("key", failing) for _ in range(3)), return_exceptions=True
+        )
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_lock_coalesces_misses_across_workers(api_database):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        workers = [make_worker(server) for _ in range(2)]
+        clients = [client_for(app) for app, _ in workers]
+        responses = await asyncio.gather(
+            *(clients[i % 2].get("/movies/slow") for i in range(10))
+        )
+        for client in clients:
+            await client.aclose()
+        # Each worker coalesces its own requests; the lock key makes the
+        # second worker wait for the first one's value.
+        assert sum(app.state.calls for app, _ in workers) == 1
+        assert {r.json()["n"] for r in responses} == {0}
+        redis = FakeRedis(server=server)
+        assert [key async for key in redis.scan_iter(match="cinema:lock:*")] == []
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_lock_returns_the_holders_value():
+    async def scenario():
+        backend = RedisBackend(FakeRedis())
+        assert await wait_for_lock(backend, "key") == (True, None)
+
+        async def holder():
+            await asyncio.sleep(0.05)
+            await backend.set("key", b"value", TTL)
+            await release_lock(backend, "key")
+
+        task = asyncio.create_task(holder())
+        assert await wait_for_lock(backend, "key") == (False, b"value")
+        await task
+        assert await backend.get("lock:key") is None
+
+    asyncio.run(scenario())
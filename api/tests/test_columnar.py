@@ -0,0 +1,105 @@
+"""The columnar engine against the SQL helpers the endpoints fall back to."""
+
+import asyncio
+
+import pytest
+from conftest import build_fixture_database
+from database import Base
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from versioning import DatasetVersionWatcher, bump_dataset_version
+
+columnar = pytest.importorskip("columnar")
+pytest.importorskip("numpy")
+
+
+def open_columnar(engine, directory):
+    with engine.connect() as conn:
+        columnar.build_columnar(conn, str(directory))
+    return columnar.ColumnarRatings.open(str(directory))
+
+
+@pytest.fixture(scope="module")
+def ratings(api_database, tmp_path_factory):
+    return open_columnar(api_database, tmp_path_factory.mktemp("columnar"))
+
+
+@pytest.mark.parametrize("user_id", [1, 2, 5])
+def test_user_stats_match_sql(client, ratings, user_id):
+    stats = ratings.user_stats(user_id)
+    expected = client.get(f"/users/{user_id}/stats").json()
+    assert stats.pop("rating_mean") == pytest.approx(expected.pop("rating_mean"))
+    assert stats == expected
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{}, {"movie_id": 1}, {"user_id": 2}, {"movie_id": 1, "user_id": 3}],
+)
+def test_histogram_matches_sql(client, ratings, params):
+    expected = client.get("/analytics/ratings/histogram", params=params).json()
+    assert ratings.histogram(**params) == expected
+
+
+@pytest.mark.parametrize("bucket", ["year", "month", "day"])
+@pytest.mark.parametrize("params", [{}, {"movie_id": 1}, {"user_id": 1}])
+def test_timeline_matches_sql(client, ratings, bucket, params):
+    expected = client.get(
+        "/analytics/ratings/timeline", params={"bucket": bucket, **params}
+    ).json()
+    timeline = ratings.timeline(bucket, **params)
+    assert timeline.pop("periods") == [
+        period | {"rating_mean": pytest.approx(period["rating_mean"])}
+        for period in expected.pop("periods")
+    ]
+    assert timeline == expected
+
+
+def test_missing_user_has_no_stats_nor_periods(ratings):
+    assert ratings.user_stats(999) is None
+    assert ratings.timeline("year", user_id=999)["periods"] == []
+
+
+def test_empty_dataset(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    Base.metadata.create_all(engine)
+    ratings = open_columnar(engine, tmp_path / "columnar")
+    assert len(ratings) == 0
+    assert ratings.timeline("month")["periods"] == []
+    assert ratings.histogram()["rating_count"] == 0
+
+
+def test_build_reads_the_ratings_in_chunks(
+    api_database, ratings, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(columnar, "BUILD_CHUNK_SIZE", 3)
+    chunked = open_columnar(api_database, tmp_path)
+    for name in columnar.ARRAYS:
+        assert getattr(chunked, name).tolist() == getattr(ratings, name).tolist()
+
+
+def test_cache_builds_new_versions_in_the_background(tmp_path):
+    engine = build_fixture_database(f"sqlite:///{tmp_path / 'movies.db'}", tmp_path)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'movies.db'}")
+    cache = columnar.ColumnarCache(
+        str(tmp_path / "columnar"), sessionmaker(bind=engine), DatasetVersionWatcher(0)
+    )
+
+    async def scenario():
+        async with AsyncSession(async_engine) as db:
+            # Nothing built yet: SQL answers while the files are written.
+            assert await cache.get(db) is None
+            await cache._build
+            assert (await cache.get(db)).version == 1
+
+            with engine.begin() as conn:
+                bump_dataset_version(conn)
+            assert await cache.get(db) is None
+            await cache._build
+            ratings = await cache.get(db)
+            assert ratings.version == 2 and len(ratings) > 0
+        await async_engine.dispose()
+
+    asyncio.run(scenario())
+    engine.dispose()
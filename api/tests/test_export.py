@@ -0,0 +1,87 @@
+"""Streaming exports of the ratings and tags, against the list endpoints."""
+
+import csv
+import io
+import json
+
+import export
+import pytest
+from fast_json import dumps
+
+FORMATS = ["ndjson", "csv", "arrow"]
+
+
+def parse(response, format: str) -> list[dict]:
+    """The exported rows as dicts of Python values."""
+    if format == "ndjson":
+        return [json.loads(line) for line in response.text.splitlines()]
+    if format == "csv":
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        numbers = {"userId": int, "movieId": int, "rating": float, "timestamp": int}
+        return [
+            {name: numbers.get(name, str)(value) for name, value in row.items()}
+            for row in rows
+        ]
+    pyarrow = pytest.importorskip("pyarrow")
+    return pyarrow.ipc.open_stream(response.content).read_all().to_pylist()
+
+
+def listed(client, path: str, params: dict) -> list[dict]:
+    """The same rows from the paginated list endpoint, in export column order."""
+    items = client.get(path, params=params | {"limit": 1000}).json()
+    columns = ["userId", "movieId"] + (["rating"] if "ratings" in path else ["tag"])
+    return [{name: item[name] for name in columns + ["timestamp"]} for item in items]
+
+
+@pytest.mark.parametrize("format", FORMATS)
+@pytest.mark.parametrize(
+    "params", [{}, {"movie_id": 1}, {"user_id": 1, "min_rating": 3.5}]
+)
+def test_ratings_export_matches_the_list(client, format, params):
+    response = client.get("/export/ratings", params=params | {"format": format})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(export.MEDIA_TYPES[format])
+    assert response.headers["content-disposition"] == (
+        f'attachment; filename="ratings.{format}"'
+    )
+    assert parse(response, format) == listed(client, "/ratings/", params)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+@pytest.mark.parametrize("params", [{}, {"movie_id": 4}, {"user_id": 2}])
+def test_tags_export_matches_the_list(client, format, params):
+    response = client.get("/export/tags", params=params | {"format": format})
+    assert response.status_code == 200
+    assert parse(response, format) == listed(client, "/tags/", params)
+
+
+def test_exports_are_streamed_in_chunks(client, monkeypatch):
+    chunks = []
+    stream_export = export.stream_export
+
+    async def recorded(statement, format, chunk_size=export.EXPORT_CHUNK_SIZE):
+        async for chunk in stream_export(statement, format, chunk_size=4):
+            chunks.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(export, "stream_export", recorded)
+    response = client.get("/export/ratings", params={"format": "csv"})
+    # The header line, then 14 ratings by 4.
+    assert len(chunks) == 1 + 4
+    assert len(response.text.splitlines()) == 1 + 14
+
+
+@pytest.mark.parametrize("path", ["/export/ratings", "/export/tags"])
+def test_arrow_needs_pyarrow(client, monkeypatch, path):
+    monkeypatch.setattr(export, "pyarrow", None)
+    response = client.get(path, params={"format": "arrow"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Arrow export requires pyarrow on the server"}
+    assert client.get(path, params={"format": "csv"}).status_code == 200
+
+
+def test_ndjson_is_encoded_like_the_list_endpoints():
+    encoder = export._NdjsonEncoder(export.tags_export())
+    row = (2, 4, 'Amélie, "Montmartre"', 1445715010)
+    line = {"userId": 2, "movieId": 4, "tag": row[2], "timestamp": row[3]}
+    assert encoder.chunk([row, row]) == (dumps(line) + b"\n") * 2
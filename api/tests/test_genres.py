@@ -0,0 +1,40 @@
+import pytest
+from genres import split_genres
+
+
+def movie_ids(client, **params):
+    response = client.get("/movies/", params=params | {"limit": 100})
+    assert response.status_code == 200
+    return [movie["movieId"] for movie in response.json()]
+
+
+def test_split_genres_drops_the_placeholder():
+    assert split_genres("Comedy|Romance") == ["Comedy", "Romance"]
+    assert split_genres("(no genres listed)") == []
+    assert split_genres(None) == []
+
+
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"genre": "comedy"}, [1, 3, 4, 7]),
+        ({"genre": "Fantasy,Romance"}, [1, 2, 3, 4, 7]),
+        ({"genre": ["Adventure", "Comedy"], "genre_mode": "all"}, [1, 7]),
+        ({"genre": "Noir"}, []),
+    ],
+)
+def test_genres_match_exactly(client, params, expected):
+    assert movie_ids(client, **params) == expected
+
+
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"genre": "(no genres listed)"}, [6]),
+        ({"genre": "(No Genres Listed)"}, [6]),
+        ({"genre": ["(no genres listed)", "Crime"]}, [5, 6]),
+        ({"genre": ["(no genres listed)", "Crime"], "genre_mode": "all"}, []),
+    ],
+)
+def test_placeholder_matches_movies_without_genres(client, params, expected):
+    assert movie_ids(client, **params) == expected
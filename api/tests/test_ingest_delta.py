@@ -0,0 +1,90 @@
+"""Delta upserts into an existing database (ingest.py --ratings-delta)."""
+
+import csv
+
+import pytest
+from conftest import build_fixture_database
+from ingest import ingest_deltas
+from models import DatasetVersion, MovieStats, Rating
+from sqlalchemy import select
+
+HEADER = ["userId", "movieId", "rating", "timestamp"]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_fixture_database(f"sqlite:///{tmp_path / 'movies.db'}", tmp_path)
+    yield engine
+    engine.dispose()
+
+
+def write_delta(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+
+def ratings(conn) -> dict:
+    rows = conn.execute(
+        select(Rating.userId, Rating.movieId, Rating.rating, Rating.timestamp)
+    )
+    return {(user, movie): (rating, ts) for user, movie, rating, ts in rows}
+
+
+def version(conn) -> int:
+    return conn.execute(select(DatasetVersion.version)).scalar_one()
+
+
+def test_ratings_delta_is_upserted(engine, tmp_path):
+    delta = write_delta(
+        tmp_path / "delta.csv",
+        [
+            (1, 1, 5.0, 964982800),  # newer: updated
+            (2, 1, 1.0, 1),  # older than the stored rating: skipped
+            (3, 2, 3.0, 1306463591),  # identical: skipped
+            (1, 7, 3.0, 1000),  # repeated below: the last one wins
+            (1, 7, 4.5, 1001),
+            (9, 999, 4.0, 5),  # unknown movie: dropped
+        ],
+    )
+    with engine.connect() as conn:
+        before = ratings(conn)
+
+    result = ingest_deltas(engine, {"ratings": delta})["ratings"]
+
+    assert {key: result[key] for key in ("read", "inserted", "updated", "skipped")} == {
+        "read": 6,
+        "inserted": 1,
+        "updated": 1,
+        "skipped": 4,
+    }
+    assert sorted(result["movie_ids"]) == [1, 7]
+    with engine.connect() as conn:
+        after = ratings(conn)
+        stats = {
+            movie: (count, total)
+            for movie, count, total in conn.execute(
+                select(
+                    MovieStats.movieId, MovieStats.rating_count, MovieStats.rating_sum
+                ).where(MovieStats.movieId.in_([1, 7]))
+            )
+        }
+        assert version(conn) == 2
+    assert after[1, 1] == (5.0, 964982800)
+    assert after[2, 1] == before[2, 1]
+    assert after[1, 7] == (4.5, 1001)
+    assert (9, 999) not in after
+    assert len(after) == len(before) + 1
+    assert stats == {1: (5, 22.0), 7: (3, 11.5)}
+
+
+def test_delta_without_changes_keeps_the_version(engine, tmp_path):
+    delta = write_delta(
+        tmp_path / "delta.csv", [(3, 2, 3.0, 1306463591), (2, 1, 1.0, 1)]
+    )
+    result = ingest_deltas(engine, {"ratings": delta})["ratings"]
+    assert (result["inserted"], result["updated"], result["skipped"]) == (0, 0, 2)
+    with engine.connect() as conn:
+        assert version(conn) == 1
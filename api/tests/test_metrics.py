@@ -0,0 +1,136 @@
+"""Request metrics, the /metrics endpoint and statement timing listeners."""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from metrics import QueryStats, RequestMetrics, _current_queries
+from profiling import Profiler, _profiled_queries
+from sqlalchemy import create_engine, exc, text
+
+STREAM_BODY = b"x" * 1500
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def measured_app(metrics: RequestMetrics, engine) -> TestClient:
+    """An app whose /movies/{movie_id} runs two statements on `engine`."""
+    app = FastAPI()
+    app.middleware("http")(metrics.middleware)
+    metrics.instrument(engine)
+
+    @app.get("/movies/{movie_id}")
+    async def movie(movie_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT :id"), {"id": movie_id})
+        return {"movieId": movie_id}
+
+    @app.get("/export")
+    async def stream():
+        return StreamingResponse(iter([STREAM_BODY[:1000], STREAM_BODY[1000:]]))
+
+    return TestClient(app)
+
+
+def sample(metrics: RequestMetrics, name: str, route: str) -> float | None:
+    """The value of the `name` series of a GET route, None if absent."""
+    series = f'{name}{{method="GET",route="{route}"}} '
+    for line in metrics.render().splitlines():
+        if line.startswith(series):
+            return float(line[len(series) :])
+    return None
+
+
+def test_metrics_endpoint_labels_route_templates(client):
+    for path in ("/movies/1", "/movies/2", "/no/such/path"):
+        client.get(path)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'route="/movies/{movie_id}",status="200"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'route="/movies/1"' not in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+
+
+def test_full_mode_measures_queries_and_streamed_bodies(engine):
+    metrics = RequestMetrics("full")
+    with measured_app(metrics, engine) as client:
+        client.get("/movies/1")
+        client.get("/movies/2")
+        assert client.get("/export").content == STREAM_BODY
+
+    route = "/movies/{movie_id}"
+    assert metrics.requests.values[("GET", route, "200")] == 2
+    assert sample(metrics, "http_request_db_queries_count", route) == 2
+    assert sample(metrics, "http_request_db_queries_sum", route) == 4
+    assert sample(metrics, "http_response_size_bytes_sum", "/export") == 1500
+    assert metrics.in_flight.values[()] == 0
+
+
+def test_light_mode_skips_queries_and_unsized_bodies(engine):
+    metrics = RequestMetrics("light")
+    with measured_app(metrics, engine) as client:
+        client.get("/movies/1")
+        client.get("/export")
+
+    route = "/movies/{movie_id}"
+    assert metrics.requests.values[("GET", route, "200")] == 1
+    assert metrics.requests.values[("GET", "/export", "200")] == 1
+    assert sample(metrics, "http_request_db_queries_count", route) is None
+    # Sizes come from Content-Length, which a streamed body does not have.
+    assert sample(metrics, "http_response_size_bytes_sum", route) > 0
+    assert sample(metrics, "http_response_size_bytes_sum", "/export") is None
+
+
+def test_slow_queries_are_logged_with_their_parameters(engine, caplog):
+    metrics = RequestMetrics("light", slow_query_ms=1e-6)
+    assert metrics.times_queries
+    metrics.instrument(engine)
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT   :value"), {"value": 42})
+    (record,) = [r for r in caplog.records if r.getMessage().startswith("Slow query")]
+    assert record.getMessage().endswith("SELECT ?; parameters: (42,)")
+    assert metrics.slow_queries.values[()] == 1
+
+
+def test_fast_queries_are_not_logged(engine, caplog):
+    metrics = RequestMetrics("full", slow_query_ms=10_000)
+    metrics.instrument(engine)
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert not caplog.records
+    assert metrics.slow_queries.values == {}
+
+
+def test_failed_statements_leave_no_timing_behind(engine):
+    RequestMetrics("full").instrument(engine)
+    Profiler(token="secret").instrument(engine)
+    stats, queries = QueryStats(), []
+    stats_token = _current_queries.set(stats)
+    queries_token = _profiled_queries.set(queries)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert conn.info == {}
+    finally:
+        _profiled_queries.reset(queries_token)
+        _current_queries.reset(stats_token)
+    # Only the statement that ran is charged, with its own duration.
+    assert stats.count == 1
+    assert 0 <= stats.seconds < 1
+    assert [query["statement"] for query in queries] == ["SELECT 1"]
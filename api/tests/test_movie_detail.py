@@ -0,0 +1,32 @@
+def test_all_parts_by_default(client):
+    movie = client.get("/movies/1").json()
+    assert set(movie) == {
+        "movieId",
+        "title",
+        "genres",
+        "ratings",
+        "tags",
+        "links",
+        "stats",
+    }
+    assert len(movie["ratings"]) == 5
+    assert movie["stats"]["rating_count"] == 5
+
+
+def test_parts_not_requested_are_absent(client):
+    movie = client.get("/movies/1", params={"include": "stats,links"}).json()
+    assert set(movie) == {"movieId", "title", "genres", "stats", "links"}
+
+
+def test_requested_empty_parts_are_present(client):
+    # Movie 6 has no ratings nor tags: requested, they come back empty.
+    movie = client.get("/movies/6", params={"include": ["ratings", "tags"]}).json()
+    assert movie["ratings"] == [] and movie["tags"] == []
+    assert "links" not in movie and "stats" not in movie
+
+
+def test_limits_and_unknown_parts(client):
+    movie = client.get("/movies/1", params={"include": "ratings", "ratings_limit": 2})
+    assert len(movie.json()["ratings"]) == 2
+    assert client.get("/movies/1", params={"include": "cast"}).status_code == 400
+    assert client.get("/movies/999").status_code == 404
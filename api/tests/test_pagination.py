@@ -0,0 +1,82 @@
+import pytest
+from pagination import decode_cursor, encode_cursor
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((3.5, 12, "x")), 3) == (3.5, 12, "x")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        encode_cursor((1, 2)),  # wrong size
+        "W1tdXQ",  # [[]]
+        encode_cursor([{"a": 1}]),
+        encode_cursor([None]),
+        encode_cursor([True]),
+    ],
+)
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, 1)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/movies/?cursor=W1tdXQ",
+        "/ratings/?cursor=W3siYSI6MX0sMl0",
+        "/tags/?cursor=W1tdLDEsIngiXQ",
+        "/links/?cursor=W251bGxd",
+        "/movies/?title=toy&cursor=W1tdXQ",
+        "/movies/?title=toy&cursor=WyJhYmMiXQ",  # ["abc"]
+        "/movies/?title=toy&cursor=Wy01XQ",  # [-5]
+        "/movies/?title=toy&cursor=WzEuNV0",  # [1.5]
+    ],
+)
+def test_malformed_cursors_are_bad_requests(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize(
+    "path, key",
+    [
+        ("/movies/", ("movieId",)),
+        ("/movies/?sort=count", ("movieId",)),
+        ("/ratings/", ("userId", "movieId")),
+        ("/links/", ("movieId",)),
+    ],
+)
+def test_cursor_pages_cover_the_list_once(client, path, key):
+    everything = client.get(path, params={"limit": 1000}).json()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        seen += response.json()
+        cursor = response.headers.get(CURSOR_HEADER)
+        if cursor is None:
+            break
+    keys = [tuple(row[name] for name in key) for row in seen]
+    assert keys == [tuple(row[name] for name in key) for row in everything]
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [("/movies/", {"title": "toy"}), ("/ratings/", {}), ("/movies/", {})],
+)
+def test_skip_only_applies_to_the_first_page(client, path, params):
+    everything = client.get(path, params=params | {"limit": 1000}).json()
+    first = client.get(path, params=params | {"skip": 1, "limit": 1})
+    assert first.json() == everything[1:2]
+    # A client resending skip with the cursor must not skip again.
+    cursor = first.headers[CURSOR_HEADER]
+    second = client.get(path, params=params | {"skip": 1, "limit": 1, "cursor": cursor})
+    assert second.json() == everything[2:3]
@@ -0,0 +1,90 @@
+"""The on-demand profiler: token check, profile files, response cache bypass."""
+
+import json
+import time
+
+import pytest
+from cache_backends import MemoryBackend
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from profiling import PROFILE_HEADER, PROFILE_ID_HEADER, Profiler
+from response_cache import ResponseCache
+from sqlalchemy import create_engine, text
+from versioning import DatasetVersionWatcher
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def profiled_app(directory, engine, cache: ResponseCache | None = None):
+    """An app with the profiler outside the response cache, as in main.py;
+    `calls` counts the runs of its endpoint."""
+    profiler = Profiler(token=TOKEN, directory=str(directory), interval_ms=1)
+    app = FastAPI()
+    app.state.calls = 0
+    if cache is not None:
+        app.middleware("http")(cache.middleware)
+    app.middleware("http")(profiler.middleware)
+    profiler.instrument(engine)
+
+    @app.get("/movies/{movie_id}")
+    async def movie(movie_id: int):
+        app.state.calls += 1
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :id"), {"id": movie_id})
+        time.sleep(0.02)  # long enough to be sampled
+        return {"movieId": movie_id}
+
+    return TestClient(app)
+
+
+def test_requests_without_the_header_are_not_profiled(tmp_path, engine):
+    with profiled_app(tmp_path, engine) as client:
+        response = client.get("/movies/1")
+    assert response.json() == {"movieId": 1}
+    assert PROFILE_ID_HEADER not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_a_wrong_token_is_refused(tmp_path, engine):
+    with profiled_app(tmp_path, engine) as client:
+        response = client.get("/movies/1", headers={PROFILE_HEADER: "wrong"})
+        assert response.status_code == 403
+        assert client.app.state.calls == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiled_request_writes_its_stacks_and_statements(tmp_path, engine):
+    with profiled_app(tmp_path, engine) as client:
+        response = client.get("/movies/7", headers={PROFILE_HEADER: TOKEN})
+    assert response.json() == {"movieId": 7}
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{profile_id}.collapsed",
+        f"{profile_id}.json",
+    ]
+
+    meta = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert (meta["method"], meta["path"], meta["status"]) == ("GET", "/movies/7", 200)
+    assert [query["statement"] for query in meta["sql"]] == ["SELECT ?"]
+    assert meta["sql"][0]["parameters"] == [7]
+    assert meta["samples"] > 0
+    collapsed = (tmp_path / f"{profile_id}.collapsed").read_text().splitlines()
+    assert collapsed and all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+    assert any("movie (test_profiling.py" in line for line in collapsed)
+
+
+def test_profiled_requests_skip_the_response_cache(tmp_path, engine, api_database):
+    cache = ResponseCache(MemoryBackend(100), ttl=30, watcher=DatasetVersionWatcher())
+    with profiled_app(tmp_path, engine, cache) as client:
+        assert client.get("/movies/1").headers["X-Cache"] == "MISS"
+        assert client.get("/movies/1").headers["X-Cache"] == "HIT"
+        profiled = client.get("/movies/1", headers={PROFILE_HEADER: TOKEN})
+        assert "X-Cache" not in profiled.headers
+        assert client.app.state.calls == 2
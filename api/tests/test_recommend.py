@@ -0,0 +1,76 @@
+import logging
+import os
+
+import pytest
+from sqlalchemy import text
+
+recommend = pytest.importorskip("recommend")
+pytest.importorskip("numpy")
+
+
+def train_and_save(engine, directory, version: int):
+    with engine.connect() as conn:
+        data = recommend.load_training_data(conn)
+    model = recommend.train(*data, factors=4, iterations=3)
+    recommend.save_model(model, str(directory), version)
+
+
+def dataset_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version FROM dataset_version")).scalar()
+
+
+def test_model_cache_reopens_retrained_models(api_database, tmp_path, caplog):
+    cache = recommend.ModelCache(str(tmp_path))
+    assert cache.get() is None
+    # A missing model is not remembered: training makes it available.
+    train_and_save(api_database, tmp_path, version=1)
+    first = cache.get(1)
+    assert first is not None and first.version == 1
+    assert cache.get(1) is first
+
+    train_and_save(api_database, tmp_path, version=2)
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"):
+        second = cache.get(3)
+        assert cache.get(3) is second
+    assert second is not first and second.version == 2
+    stale = [r for r in caplog.records if "dataset version 2" in r.getMessage()]
+    assert len(stale) == 1
+
+    os.remove(tmp_path / recommend.META_FILE)
+    assert cache.get(3) is None
+
+
+def test_recommendations_once_a_model_is_trained(client, api_database):
+    assert client.get("/users/1/recommendations").status_code == 503
+    train_and_save(
+        api_database, os.environ["RECOMMENDER_DIR"], dataset_version(api_database)
+    )
+
+    response = client.get("/users/1/recommendations", params={"n": 3})
+    assert response.status_code == 200
+    recommended = [item["movieId"] for item in response.json()]
+    rated = {1, 2, 3, 5}
+    assert recommended and not rated & set(recommended)
+    assert client.get("/users/999/recommendations").status_code == 404
+
+    batch = client.post(
+        "/recommendations/batch", json={"user_ids": [2, 999, 1], "n": 2}
+    ).json()
+    assert [result["userId"] for result in batch["results"]] == [2, 1]
+    assert batch["not_found"] == [999]
+
+
+def test_recommend_many_scores_users_in_chunks(api_database, tmp_path, monkeypatch):
+    train_and_save(api_database, tmp_path, version=1)
+    model = recommend.Recommender.open(str(tmp_path))
+    user_ids = [5, 1, 999, 3, 2, 4]
+    expected = {user_id: model.recommend(user_id, 3) for user_id in user_ids}
+    monkeypatch.setattr(recommend, "SCORE_CHUNK_SIZE", 2)
+    scored = model.recommend_many(user_ids, 3)
+    assert list(scored) == [5, 1, 3, 2, 4]
+    for user_id, top in scored.items():
+        assert [movie for movie, _ in top] == [m for m, _ in expected[user_id]]
+        assert [score for _, score in top] == pytest.approx(
+            [score for _, score in expected[user_id]], rel=1e-5
+        )
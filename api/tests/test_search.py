@@ -0,0 +1,47 @@
+import pytest
+from search import match_expression
+
+
+def titles(client, **params):
+    response = client.get("/movies/", params=params)
+    assert response.status_code == 200
+    return [movie["title"] for movie in response.json()]
+
+
+def test_match_expression_quotes_tokens():
+    assert match_expression('toy" OR story') == '"toy"* "or"* "story"*'
+    assert match_expression("Amélie", prefix=False) == '"amelie"'
+    assert match_expression("?!") is None
+
+
+def test_whole_words_rank_before_prefixes(client):
+    # bm25 alone would put the shorter "Toys (1992)" first.
+    assert titles(client, title="toy") == [
+        "Toy Story (1995)",
+        "Toy Story 2 (1999)",
+        "Toys (1992)",
+    ]
+
+
+def test_every_token_matches_as_a_prefix(client):
+    assert titles(client, title="toy sto") == ["Toy Story (1995)", "Toy Story 2 (1999)"]
+    assert titles(client, title="jum") == ["Jumanji (1995)"]
+
+
+@pytest.mark.parametrize("title", ["amelie", "AMÉLIE", "poul"])
+def test_case_and_accents_are_ignored(client, title):
+    assert titles(client, title=title) == [
+        "Amélie (Fabuleux destin d'Amélie Poulain, Le) (2001)"
+    ]
+
+
+@pytest.mark.parametrize("title", ['toy" OR heat', "NEAR(toy", "*", "?!"])
+def test_query_syntax_is_not_interpreted(client, title):
+    assert "Heat (1995)" not in titles(client, title=title)
+
+
+def test_search_combines_with_filters(client):
+    assert titles(client, title="toy", genre="Animation") == [
+        "Toy Story (1995)",
+        "Toy Story 2 (1999)",
+    ]
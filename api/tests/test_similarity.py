@@ -0,0 +1,63 @@
+"""Incremental neighbor rebuilds (similarity.py without --full)."""
+
+import csv
+
+import pytest
+from conftest import build_fixture_database
+from ingest import ingest_deltas
+from models import MovieNeighbor
+from sqlalchemy import select
+
+similarity = pytest.importorskip("similarity")
+if similarity.np is None:
+    pytest.skip("building neighbors needs numpy and scipy", allow_module_level=True)
+
+K = 3
+
+
+def neighbors(engine, metric: str) -> dict:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                MovieNeighbor.movieId,
+                MovieNeighbor.neighborId,
+                MovieNeighbor.similarity,
+            )
+            .where(MovieNeighbor.metric == metric)
+            .order_by(MovieNeighbor.movieId, MovieNeighbor.rank)
+        )
+        lists = {}
+        for movie_id, neighbor_id, value in rows:
+            lists.setdefault(movie_id, []).append((neighbor_id, round(value, 5)))
+    return lists
+
+
+def test_incremental_rebuild_matches_a_full_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity, "MIN_RATINGS", 2)
+    engine = build_fixture_database(f"sqlite:///{tmp_path / 'movies.db'}", tmp_path)
+    with engine.begin() as conn:
+        similarity.rebuild_neighbors(conn, K)
+    before = neighbors(engine, "cosine")
+
+    # Movie 6 had no rating: it now reaches MIN_RATINGS and shares raters
+    # with most movies, whose lists it may enter without being in any yet.
+    delta = tmp_path / "delta.csv"
+    with open(delta, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["userId", "movieId", "rating", "timestamp"])
+        writer.writerows([(1, 6, 4.5, 2), (2, 6, 5.0, 2), (4, 3, 5.0, 2)])
+    ingest_deltas(engine, {"ratings": delta})
+
+    with engine.begin() as conn:
+        changed = similarity.changed_movies(conn)
+        assert changed == [3, 6]
+        similarity.rebuild_neighbors(conn, K, changed)
+    incremental = neighbors(engine, "cosine")
+    with engine.begin() as conn:
+        similarity.rebuild_neighbors(conn, K)
+    full = neighbors(engine, "cosine")
+
+    assert incremental == full
+    assert any(6 in [n for n, _ in lists] for lists in full.values())
+    assert full != before
+    engine.dispose()
@@ -0,0 +1,79 @@
+"""Dataset version: tells the API processes that the data was reloaded.
+
+Loads run in a separate process (``ingest.py``), so the API cannot be told
+directly that its cached results went stale. Instead every load bumps the
+single row of the dataset_version table, and the API re-reads that row at
+most once every DATASET_VERSION_CHECK_INTERVAL seconds. Anything cached
+under an older version is then recomputed.
+"""
+
+import asyncio
+import os
+import time
+
+from models import DatasetVersion
+from sqlalchemy import select
+
+DATASET_VERSION_CHECK_INTERVAL = float(os.getenv("DATASET_VERSION_CHECK_INTERVAL", "5"))
+
+
+def bump_dataset_version(conn) -> int:
+    """Record a new load of the dataset; returns the new version."""
+    now = int(time.time())
+    current = conn.execute(
+        select(DatasetVersion.version).where(DatasetVersion.id == 1)
+    ).scalar()
+    if current is None:
+        conn.execute(
+            DatasetVersion.__table__.insert().values(id=1, version=1, loaded_at=now)
+        )
+        return 1
+    conn.execute(
+        DatasetVersion.__table__.update()
+        .where(DatasetVersion.id == 1)
+        .values(version=current + 1, loaded_at=now)
+    )
+    return current + 1
+
+
+def read_dataset_version(db) -> tuple[int, int]:
+    """Return (version, loaded_at) from the database, (0, 0) if never set."""
+    row = db.execute(
+        select(DatasetVersion.version, DatasetVersion.loaded_at).where(
+            DatasetVersion.id == 1
+        )
+    ).first()
+    return tuple(row) if row else (0, 0)
+
+
+class DatasetVersionWatcher:
+    """Caches the dataset version, re-reading it every `interval` seconds."""
+
+    def __init__(self, interval: float = DATASET_VERSION_CHECK_INTERVAL):
+        self.interval = interval
+        self.version = None
+        self.loaded_at = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.interval
+
+    async def current(self, db) -> int:
+        """Return the dataset version, reading it from db (an AsyncSession)
+        only when due."""
+        if self._due():
+            async with self._lock:
+                if self._due():
+                    self.version, self.loaded_at = await db.run_sync(
+                        read_dataset_version
+                    )
+                    self._checked_at = time.monotonic()
+        return self.version
+
+    def invalidate(self):
+        """Force the next call to current() to read the database."""
+        self._checked_at = float("-inf")
+
+
+dataset_version = DatasetVersionWatcher()
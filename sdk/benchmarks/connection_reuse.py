@@ -0,0 +1,87 @@
+"""Per-call latency of MovieClient: a new connection per call vs a pooled one.
+
+Usage, against a local API (from the ``api`` directory,
+``uvicorn main:app --port 8000``)::
+
+    python benchmarks/connection_reuse.py [--base-url http://127.0.0.1:8000] [--calls 2000]
+
+The same calls (movie detail, link and rating lookups cycling over a few
+IDs) are sent back to back in two modes:
+
+- per-call: module-level ``httpx.get``, as the SDK did before, which opens
+  and closes a TCP connection (and a TLS session over HTTPS) for each call;
+- pooled: one ``MovieClient``, whose ``httpx.Client`` keeps its connections
+  alive between calls.
+
+Against a remote HTTPS server the difference grows with the round-trip
+time, since the per-call mode pays the TCP and TLS handshakes every time.
+"""
+
+import argparse
+import statistics
+import time
+
+import httpx
+from cinema_data_sdk import MovieClient, MovieConfig
+
+MOVIE_IDS = [1, 2, 50, 260, 296, 318, 356, 593, 1196, 2571]
+PATHS = ["/movies/{id}?include=stats", "/links/{id}", "/ratings/1/{id}"]
+
+
+def request_paths(calls: int) -> list[str]:
+    return [
+        PATHS[n % len(PATHS)].format(id=MOVIE_IDS[n % len(MOVIE_IDS)])
+        for n in range(calls)
+    ]
+
+
+def timed(get, paths: list[str]) -> dict:
+    """Send every path with `get` and summarize the latencies."""
+    latencies = []
+    start = time.perf_counter()
+    for path in paths:
+        before = time.perf_counter()
+        get(path)
+        latencies.append(time.perf_counter() - before)
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls": len(paths),
+        "calls_per_s": len(paths) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def main(base_url: str, calls: int):
+    paths = request_paths(calls)
+    results = {"per-call": timed(lambda path: httpx.get(base_url + path), paths)}
+    with MovieClient(MovieConfig(base_url)) as client:
+        # The first call opens the connection the others reuse.
+        client._client.get(paths[0])
+        results["pooled"] = timed(client._client.get, paths)
+
+    columns = ["calls", "calls_per_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"{'mode':>8}  " + "  ".join(f"{column:>11}" for column in columns))
+    for mode, row in results.items():
+        cells = (
+            (
+                f"{row[column]:>11,.2f}"
+                if isinstance(row[column], float)
+                else f"{row[column]:>11}"
+            )
+            for column in columns
+        )
+        print(f"{mode:>8}  " + "  ".join(cells))
+    speedup = results["per-call"]["mean_ms"] / results["pooled"]["mean_ms"]
+    print(f"pooled calls are {speedup:.1f}x faster on average")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.base_url, args.calls)
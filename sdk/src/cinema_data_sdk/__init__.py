@@ -1,2 +1,3 @@
+from .async_film_client import AsyncMovieClient
 from .film_client import MovieClient
 from .film_config import MovieConfig
@@ -0,0 +1,373 @@
+import asyncio
+from typing import Literal, Union
+
+import httpx
+import pandas as pd
+
+from .film_client import BATCH_SIZE, MovieClient, _client_options
+from .film_config import MovieConfig
+from .pagination import PAGE_SIZE, AsyncPageIterator
+from .schemas import (
+    AnalyticsResponse,
+    LinkSimple,
+    MovieDetailed,
+    MovieSimple,
+    RatingSimple,
+    TagSimple,
+)
+
+# Requests in flight at once in the *_many helpers, by default.
+CONCURRENCY = 32
+
+
+class AsyncMovieClient:
+    """Asynchronous client for the movie API.
+
+    Every method of MovieClient has an awaitable counterpart with the same
+    parameters and return values, sent through one shared httpx.AsyncClient;
+    the iter_* methods return an AsyncPageIterator, read with `async for`.
+    The *_many helpers fetch many resources concurrently, with at most
+    `concurrency` requests in flight::
+
+        async with AsyncMovieClient(config) as client:
+            movies = await client.get_movies_many(range(1, 1001))
+    """
+
+    def __init__(self, config: MovieConfig, client: httpx.AsyncClient | None = None):
+        """Initialize the AsyncMovieClient class.
+
+        Parameters
+        ----------
+        config : MovieConfig
+            An instance of the MovieConfig class containing configuration settings.
+        client : httpx.AsyncClient | None, optional
+            The HTTP client to send requests with, by default None (one is
+            created from the configuration, and closed by aclose())
+        """
+        self.config = config or MovieConfig()
+        self.base_url = self.config.movie_base_url
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(**_client_options(self.config))
+
+    async def aclose(self):
+        """Close the connections of the HTTP client, if this client created it."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncMovieClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    _format_output = MovieClient._format_output
+
+    async def _get(self, path: str, params: dict | None = None):
+        response = await self._client.get(f"{self.base_url}{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def _iter(self, path, params, model, page_size, output_format):
+        return AsyncPageIterator(
+            self._client,
+            f"{self.base_url}{path}",
+            params,
+            model,
+            page_size,
+            output_format,
+        )
+
+    async def _post_batch(self, path: str, field: str, keys: list) -> list:
+        """Async version of MovieClient._post_batch: the chunks are sent
+        concurrently."""
+        url = f"{self.base_url}{path}"
+
+        async def post(chunk):
+            response = await self._client.post(url, json={field: chunk})
+            response.raise_for_status()
+            return response.json()["items"]
+
+        chunks = await asyncio.gather(
+            *(
+                post(keys[start : start + BATCH_SIZE])
+                for start in range(0, len(keys), BATCH_SIZE)
+            )
+        )
+        return [item for chunk in chunks for item in chunk]
+
+    async def _many(self, fetch, keys, concurrency: int) -> list:
+        """Await fetch(key) for every key, at most `concurrency` at a time.
+
+        Parameters
+        ----------
+        fetch : Callable
+            Coroutine function fetching one resource.
+        keys : Iterable
+            The keys to fetch.
+        concurrency : int
+            Maximum number of requests in flight.
+
+        Returns
+        -------
+        list
+            The resources in the order of `keys`, None where the API answered
+            404 Not Found.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If a request returns an unsuccessful status code other than 404.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(key):
+            async with semaphore:
+                try:
+                    return await fetch(key)
+                except httpx.HTTPStatusError as error:
+                    if error.response.status_code == 404:
+                        return None
+                    raise
+
+        return await asyncio.gather(*(bounded(key) for key in keys))
+
+    async def health_check(self) -> dict:
+        """Async version of MovieClient.health_check."""
+        return await self._get("/")
+
+    async def get_movie(
+        self,
+        movie_id: int,
+        include: list[str] | None = None,
+        ratings_limit: int | None = None,
+        tags_limit: int | None = None,
+    ) -> MovieDetailed:
+        """Async version of MovieClient.get_movie."""
+        params = {}
+        if include:
+            params["include"] = include
+        if ratings_limit is not None:
+            params["ratings_limit"] = ratings_limit
+        if tags_limit is not None:
+            params["tags_limit"] = tags_limit
+        return MovieDetailed(**await self._get(f"/movies/{movie_id}", params))
+
+    async def get_movies_many(
+        self,
+        movie_ids,
+        concurrency: int = CONCURRENCY,
+        include: list[str] | None = None,
+        ratings_limit: int | None = None,
+        tags_limit: int | None = None,
+    ) -> list[MovieDetailed | None]:
+        """Retrieve many movies concurrently, one get_movie request each.
+
+        Parameters
+        ----------
+        movie_ids : Iterable[int]
+            The IDs of the movies to retrieve.
+        concurrency : int, optional
+            Maximum number of requests in flight, by default 32
+        include, ratings_limit, tags_limit : optional
+            As in get_movie.
+
+        Returns
+        -------
+        list[MovieDetailed | None]
+            The movies in the order of `movie_ids`, None for unknown IDs.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If a request returns an unsuccessful status code other than 404.
+        """
+        return await self._many(
+            lambda movie_id: self.get_movie(
+                movie_id, include, ratings_limit, tags_limit
+            ),
+            movie_ids,
+            concurrency,
+        )
+
+    async def list_movies(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        title: str | None = None,
+        genre: str | list[str] | None = None,
+        genre_mode: Literal["any", "all"] = "any",
+        output_format: Literal["pydantic", "dict", "pandas"] = "pydantic",
+    ) -> Union[list[MovieSimple], list[dict], "pd.DataFrame"]:
+        """Async version of MovieClient.list_movies."""
+        params = {"skip": skip, "limit": limit}
+        if title:
+            params["title"] = title
+        if genre:
+            params["genre"] = genre
+            params["genre_mode"] = genre_mode
+        data = await self._get("/movies/", params)
+        return self._format_output(data, MovieSimple, output_format)
+
+    def iter_movies(
+        self,
+        title: str | None = None,
+        genre: str | list[str] | None = None,
+        genre_mode: Literal["any", "all"] = "any",
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> AsyncPageIterator:
+        """Async version of MovieClient.iter_movies."""
+        params = {}
+        if title:
+            params["title"] = title
+        if genre:
+            params["genre"] = genre
+            params["genre_mode"] = genre_mode
+        return self._iter("/movies/", params, MovieSimple, page_size, output_format)
+
+    async def get_movies_batch(self, movie_ids: list[int]) -> list[MovieSimple | None]:
+        """Async version of MovieClient.get_movies_batch."""
+        items = await self._post_batch("/movies/batch", "ids", list(movie_ids))
+        return [MovieSimple(**item) if item else None for item in items]
+
+    async def get_rating(self, user_id: int, movie_id: int) -> RatingSimple:
+        """Async version of MovieClient.get_rating."""
+        return RatingSimple(**await self._get(f"/ratings/{user_id}/{movie_id}"))
+
+    async def list_ratings(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        min_rating: float | None = None,
+        output_format: Literal["pydantic", "dict", "pandas"] = "pydantic",
+    ) -> Union[list[RatingSimple], list[dict], "pd.DataFrame"]:
+        """Async version of MovieClient.list_ratings."""
+        params = {"skip": skip, "limit": limit}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        if min_rating is not None:
+            params["min_rating"] = min_rating
+        data = await self._get("/ratings/", params)
+        return self._format_output(data, RatingSimple, output_format)
+
+    def iter_ratings(
+        self,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        min_rating: float | None = None,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> AsyncPageIterator:
+        """Async version of MovieClient.iter_ratings."""
+        params = {}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        if min_rating is not None:
+            params["min_rating"] = min_rating
+        return self._iter("/ratings/", params, RatingSimple, page_size, output_format)
+
+    async def get_ratings_batch(
+        self, keys: list[tuple[int, int]]
+    ) -> list[RatingSimple | None]:
+        """Async version of MovieClient.get_ratings_batch."""
+        body = [{"userId": user_id, "movieId": movie_id} for user_id, movie_id in keys]
+        items = await self._post_batch("/ratings/batch", "keys", body)
+        return [RatingSimple(**item) if item else None for item in items]
+
+    async def get_tag(self, user_id: int, movie_id: int, tag_text: str) -> TagSimple:
+        """Async version of MovieClient.get_tag."""
+        return TagSimple(**await self._get(f"/tags/{user_id}/{movie_id}/{tag_text}"))
+
+    async def list_tags(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        output_format: Literal["pydantic", "dict", "pandas"] = "pydantic",
+    ) -> Union[list[TagSimple], list[dict], "pd.DataFrame"]:
+        """Async version of MovieClient.list_tags."""
+        params = {"skip": skip, "limit": limit}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        data = await self._get("/tags/", params)
+        return self._format_output(data, TagSimple, output_format)
+
+    def iter_tags(
+        self,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> AsyncPageIterator:
+        """Async version of MovieClient.iter_tags."""
+        params = {}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        return self._iter("/tags/", params, TagSimple, page_size, output_format)
+
+    async def get_link(self, movie_id: int) -> LinkSimple:
+        """Async version of MovieClient.get_link."""
+        return LinkSimple(**await self._get(f"/links/{movie_id}"))
+
+    async def get_links_many(
+        self, movie_ids, concurrency: int = CONCURRENCY
+    ) -> list[LinkSimple | None]:
+        """Retrieve the links of many movies concurrently, one get_link
+        request each.
+
+        Parameters
+        ----------
+        movie_ids : Iterable[int]
+            The IDs of the movies whose links to retrieve.
+        concurrency : int, optional
+            Maximum number of requests in flight, by default 32
+
+        Returns
+        -------
+        list[LinkSimple | None]
+            The links in the order of `movie_ids`, None for movies without one.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If a request returns an unsuccessful status code other than 404.
+        """
+        return await self._many(self.get_link, movie_ids, concurrency)
+
+    async def get_links_batch(self, movie_ids: list[int]) -> list[LinkSimple | None]:
+        """Async version of MovieClient.get_links_batch."""
+        items = await self._post_batch("/links/batch", "ids", list(movie_ids))
+        return [LinkSimple(**item) if item else None for item in items]
+
+    async def list_links(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        output_format: Literal["pydantic", "dict", "pandas"] = "pydantic",
+    ) -> Union[list[LinkSimple], list[dict], "pd.DataFrame"]:
+        """Async version of MovieClient.list_links."""
+        data = await self._get("/links/", {"skip": skip, "limit": limit})
+        return self._format_output(data, LinkSimple, output_format)
+
+    def iter_links(
+        self,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> AsyncPageIterator:
+        """Async version of MovieClient.iter_links."""
+        return self._iter("/links/", {}, LinkSimple, page_size, output_format)
+
+    async def get_analytics(self) -> AnalyticsResponse:
+        """Async version of MovieClient.get_analytics."""
+        return AnalyticsResponse(**await self._get("/analytics/"))
@@ -1,9 +1,11 @@
+from importlib.util import find_spec
 from typing import Literal, Union
 
 import httpx
 import pandas as pd
 
 from .film_config import MovieConfig
+from .pagination import PAGE_SIZE, PageIterator
 from .schemas import (
     AnalyticsResponse,
     LinkSimple,
@@ -13,20 +15,75 @@ from .schemas import (
     TagSimple,
 )
 
+# Maximum number of keys the API accepts in one batch request.
+BATCH_SIZE = 1000
+
+# HTTP/2 is optional: httpx only speaks it with the h2 package installed.
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+
+def _client_options(config: MovieConfig) -> dict:
+    """Keyword arguments of the httpx client built from a MovieConfig.
+
+    Parameters
+    ----------
+    config : MovieConfig
+        The configuration holding the timeout and connection pool settings.
+
+    Returns
+    -------
+    dict
+        Arguments for the httpx client.
+    """
+    return {
+        "base_url": config.movie_base_url,
+        "http2": config.movie_http2 and HTTP2_AVAILABLE,
+        "timeout": httpx.Timeout(config.movie_timeout),
+        "limits": httpx.Limits(
+            max_connections=config.movie_max_connections,
+            max_keepalive_connections=config.movie_max_keepalive_connections,
+            keepalive_expiry=config.movie_keepalive_expiry,
+        ),
+    }
+
 
 class MovieClient:
-    """Client class for interacting with the movie API."""
+    """Client class for interacting with the movie API.
+
+    Requests go through one long-lived httpx.Client, whose connections are
+    kept alive and reused across calls. Close it with close(), or use the
+    client as a context manager::
+
+        with MovieClient(config) as client:
+            client.get_movie(1)
+    """
 
-    def __init__(self, config: MovieConfig):
+    def __init__(self, config: MovieConfig, client: httpx.Client | None = None):
         """Initialize the MovieClient class.
 
         Parameters
         ----------
         config : MovieConfig
             An instance of the MovieConfig class containing configuration settings.
+        client : httpx.Client | None, optional
+            The HTTP client to send requests with, by default None (one is
+            created from the configuration, and closed by close())
         """
         self.config = config or MovieConfig()
         self.base_url = self.config.movie_base_url
+        self._owns_client = client is None
+        self._client = client or httpx.Client(**_client_options(self.config))
+
+    def close(self):
+        """Close the connections of the HTTP client, if this client created it."""
+        if self._owns_client:
+            self._client.close()
+
+    def __enter__(self) -> "MovieClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _format_output(
         self, data: dict, model, output_format: Literal["pydantic", "dict", "pandas"]
@@ -60,6 +117,39 @@ class MovieClient:
                 "Invalid output format. Choose from 'pydantic', 'dict', or 'pandas'."
             )
 
+    def _post_batch(self, path: str, field: str, keys: list) -> list:
+        """POST `keys` to a batch endpoint, BATCH_SIZE at a time.
+
+        Parameters
+        ----------
+        path : str
+            The path of the batch endpoint.
+        field : str
+            The name of the request body field holding the keys.
+        keys : list
+            The keys to look up.
+
+        Returns
+        -------
+        list
+            The items of every response, in the order of `keys`, None where
+            the API found nothing.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the HTTP request returns an unsuccessful status code.
+        """
+        url = f"{self.base_url}{path}"
+        items = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            response = self._client.post(
+                url, json={field: keys[start : start + BATCH_SIZE]}
+            )
+            response.raise_for_status()
+            items.extend(response.json()["items"])
+        return items
+
     def health_check(self) -> dict:
         """Perform a health check on the movie API.
 
@@ -74,17 +164,30 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/"
-        response = httpx.get(url)
+        response = self._client.get(url)
         response.raise_for_status()
         return response.json()
 
-    def get_movie(self, movie_id: int) -> MovieDetailed:
+    def get_movie(
+        self,
+        movie_id: int,
+        include: list[str] | None = None,
+        ratings_limit: int | None = None,
+        tags_limit: int | None = None,
+    ) -> MovieDetailed:
         """Retrieve a movie by its ID.
 
         Parameters
         ----------
         movie_id : int
             The ID of the movie to retrieve.
+        include : list[str] | None, optional
+            Related data to return among "ratings", "tags", "links" and
+            "stats", by default None (all of them)
+        ratings_limit : int | None, optional
+            Maximum number of ratings to return, by default None (API default)
+        tags_limit : int | None, optional
+            Maximum number of tags to return, by default None (API default)
 
         Returns
         -------
@@ -97,7 +200,15 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/movies/{movie_id}"
-        response = httpx.get(url)
+        params = {}
+        if include:
+            params["include"] = include
+        if ratings_limit is not None:
+            params["ratings_limit"] = ratings_limit
+        if tags_limit is not None:
+            params["tags_limit"] = tags_limit
+
+        response = self._client.get(url, params=params)
         response.raise_for_status()
         return MovieDetailed(**response.json())
 
@@ -106,7 +217,8 @@ class MovieClient:
         skip: int = 0,
         limit: int = 10,
         title: str | None = None,
-        genre: str | None = None,
+        genre: str | list[str] | None = None,
+        genre_mode: Literal["any", "all"] = "any",
         output_format: Literal["pydantic", "dict", "pandas"] = "pydantic",
     ) -> Union[list[MovieSimple], list[dict], "pd.DataFrame"]:
         """Retrieve a list of movies with optional pagination and filters.
@@ -119,8 +231,10 @@ class MovieClient:
             Number of records to return, by default 10
         title : str | None, optional
             Filter by movie title, by default None
-        genre : str | None, optional
-            Filter by movie genre, by default None
+        genre : str | list[str] | None, optional
+            Filter by one or several genres, by default None
+        genre_mode : Literal["any", "all"], optional
+            Keep movies having any or all of the genres, by default "any"
 
         Returns
         -------
@@ -138,11 +252,83 @@ class MovieClient:
             params["title"] = title
         if genre:
             params["genre"] = genre
+            params["genre_mode"] = genre_mode
 
-        response = httpx.get(url, params=params)
+        response = self._client.get(url, params=params)
         response.raise_for_status()
         return self._format_output(response.json(), MovieSimple, output_format)
 
+    def iter_movies(
+        self,
+        title: str | None = None,
+        genre: str | list[str] | None = None,
+        genre_mode: Literal["any", "all"] = "any",
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> PageIterator:
+        """Iterate over every movie matching the filters, page by page.
+
+        Parameters
+        ----------
+        title : str | None, optional
+            Filter by movie title, by default None
+        genre : str | list[str] | None, optional
+            Filter by one or several genres, by default None
+        genre_mode : Literal["any", "all"], optional
+            Keep movies having any or all of the genres, by default "any"
+        page_size : int, optional
+            Number of items per request, by default 1000
+        output_format : Literal["pydantic", "dict"], optional
+            Whether to yield Pydantic models or dicts, by default "pydantic"
+
+        Returns
+        -------
+        PageIterator
+            Yields MovieSimple instances (or dicts) lazily, prefetching the
+            next page; to_dataframe() collects them into a DataFrame.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code, while
+            iterating.
+        """
+        params = {}
+        if title:
+            params["title"] = title
+        if genre:
+            params["genre"] = genre
+            params["genre_mode"] = genre_mode
+        return PageIterator(
+            self._client,
+            f"{self.base_url}/movies/",
+            params,
+            MovieSimple,
+            page_size,
+            output_format,
+        )
+
+    def get_movies_batch(self, movie_ids: list[int]) -> list[MovieSimple | None]:
+        """Retrieve many movies by ID, with one request per 1000 IDs.
+
+        Parameters
+        ----------
+        movie_ids : list[int]
+            The IDs of the movies to retrieve.
+
+        Returns
+        -------
+        list[MovieSimple | None]
+            The movies in the order of `movie_ids`, None for unknown IDs.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the HTTP request returns an unsuccessful status code.
+        """
+        items = self._post_batch("/movies/batch", "ids", list(movie_ids))
+        return [MovieSimple(**item) if item else None for item in items]
+
     def get_rating(self, user_id: int, movie_id: int) -> RatingSimple:
         """Retrieve a rating by user ID and movie ID.
 
@@ -164,7 +350,7 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/ratings/{user_id}/{movie_id}"
-        response = httpx.get(url)
+        response = self._client.get(url)
         response.raise_for_status()
         return RatingSimple(**response.json())
 
@@ -211,10 +397,87 @@ class MovieClient:
         if min_rating is not None:
             params["min_rating"] = min_rating
 
-        response = httpx.get(url, params=params)
+        response = self._client.get(url, params=params)
         response.raise_for_status()
         return self._format_output(response.json(), RatingSimple, output_format)
 
+    def iter_ratings(
+        self,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        min_rating: float | None = None,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> PageIterator:
+        """Iterate over every rating matching the filters, page by page.
+
+        Parameters
+        ----------
+        movie_id : int | None, optional
+            Filter by movie ID, by default None
+        user_id : int | None, optional
+            Filter by user ID, by default None
+        min_rating : float | None, optional
+            Filter by minimum rating value, by default None
+        page_size : int, optional
+            Number of items per request, by default 1000
+        output_format : Literal["pydantic", "dict"], optional
+            Whether to yield Pydantic models or dicts, by default "pydantic"
+
+        Returns
+        -------
+        PageIterator
+            Yields RatingSimple instances (or dicts) lazily, prefetching the
+            next page; to_dataframe() collects them into a DataFrame.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code, while
+            iterating.
+        """
+        params = {}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        if min_rating is not None:
+            params["min_rating"] = min_rating
+        return PageIterator(
+            self._client,
+            f"{self.base_url}/ratings/",
+            params,
+            RatingSimple,
+            page_size,
+            output_format,
+        )
+
+    def get_ratings_batch(
+        self, keys: list[tuple[int, int]]
+    ) -> list[RatingSimple | None]:
+        """Retrieve many ratings by user ID and movie ID, with one request per
+        1000 pairs.
+
+        Parameters
+        ----------
+        keys : list[tuple[int, int]]
+            The (user ID, movie ID) pairs of the ratings to retrieve.
+
+        Returns
+        -------
+        list[RatingSimple | None]
+            The ratings in the order of `keys`, None where the user did not
+            rate the movie.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the HTTP request returns an unsuccessful status code.
+        """
+        body = [{"userId": user_id, "movieId": movie_id} for user_id, movie_id in keys]
+        items = self._post_batch("/ratings/batch", "keys", body)
+        return [RatingSimple(**item) if item else None for item in items]
+
     def get_tag(self, user_id: int, movie_id: int, tag_text: str) -> TagSimple:
         """Retrieve a tag by user ID, movie ID, and tag text.
 
@@ -238,7 +501,7 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/tags/{user_id}/{movie_id}/{tag_text}"
-        response = httpx.get(url)
+        response = self._client.get(url)
         response.raise_for_status()
         return TagSimple(**response.json())
 
@@ -280,10 +543,56 @@ class MovieClient:
         if user_id:
             params["user_id"] = user_id
 
-        response = httpx.get(url, params=params)
+        response = self._client.get(url, params=params)
         response.raise_for_status()
         return self._format_output(response.json(), TagSimple, output_format)
 
+    def iter_tags(
+        self,
+        movie_id: int | None = None,
+        user_id: int | None = None,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> PageIterator:
+        """Iterate over every tag matching the filters, page by page.
+
+        Parameters
+        ----------
+        movie_id : int | None, optional
+            Filter by movie ID, by default None
+        user_id : int | None, optional
+            Filter by user ID, by default None
+        page_size : int, optional
+            Number of items per request, by default 1000
+        output_format : Literal["pydantic", "dict"], optional
+            Whether to yield Pydantic models or dicts, by default "pydantic"
+
+        Returns
+        -------
+        PageIterator
+            Yields TagSimple instances (or dicts) lazily, prefetching the
+            next page; to_dataframe() collects them into a DataFrame.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code, while
+            iterating.
+        """
+        params = {}
+        if movie_id:
+            params["movie_id"] = movie_id
+        if user_id:
+            params["user_id"] = user_id
+        return PageIterator(
+            self._client,
+            f"{self.base_url}/tags/",
+            params,
+            TagSimple,
+            page_size,
+            output_format,
+        )
+
     def get_link(self, movie_id: int) -> LinkSimple:
         """Retrieve a link by movie ID.
 
@@ -303,10 +612,31 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/links/{movie_id}"
-        response = httpx.get(url)
+        response = self._client.get(url)
         response.raise_for_status()
         return LinkSimple(**response.json())
 
+    def get_links_batch(self, movie_ids: list[int]) -> list[LinkSimple | None]:
+        """Retrieve the links of many movies, with one request per 1000 IDs.
+
+        Parameters
+        ----------
+        movie_ids : list[int]
+            The IDs of the movies whose links to retrieve.
+
+        Returns
+        -------
+        list[LinkSimple | None]
+            The links in the order of `movie_ids`, None for movies without one.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the HTTP request returns an unsuccessful status code.
+        """
+        items = self._post_batch("/links/batch", "ids", list(movie_ids))
+        return [LinkSimple(**item) if item else None for item in items]
+
     def list_links(
         self,
         skip: int = 0,
@@ -335,10 +665,45 @@ class MovieClient:
         url = f"{self.base_url}/links/"
         params = {"skip": skip, "limit": limit}
 
-        response = httpx.get(url, params=params)
+        response = self._client.get(url, params=params)
         response.raise_for_status()
         return self._format_output(response.json(), LinkSimple, output_format)
 
+    def iter_links(
+        self,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ) -> PageIterator:
+        """Iterate over every link, page by page.
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Number of items per request, by default 1000
+        output_format : Literal["pydantic", "dict"], optional
+            Whether to yield Pydantic models or dicts, by default "pydantic"
+
+        Returns
+        -------
+        PageIterator
+            Yields LinkSimple instances (or dicts) lazily, prefetching the
+            next page; to_dataframe() collects them into a DataFrame.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code, while
+            iterating.
+        """
+        return PageIterator(
+            self._client,
+            f"{self.base_url}/links/",
+            {},
+            LinkSimple,
+            page_size,
+            output_format,
+        )
+
     def get_analytics(self) -> AnalyticsResponse:
         """Retrieve analytics data from the API.
 
@@ -353,6 +718,6 @@ class MovieClient:
             If the HTTP request returns an unsuccessful status code.
         """
         url = f"{self.base_url}/analytics/"
-        response = httpx.get(url)
+        response = self._client.get(url)
         response.raise_for_status()
         return AnalyticsResponse(**response.json())
@@ -11,12 +11,22 @@ class MovieConfig:
     movie_base_url: str
     movie_backoff: bool
     movie_backoff_max_time: int = 30
+    movie_timeout: float = 10.0
+    movie_max_connections: int = 100
+    movie_max_keepalive_connections: int = 32
+    movie_keepalive_expiry: float = 30.0
+    movie_http2: bool = True
 
     def __init__(
         self,
         movie_base_url: str = None,
         movie_backoff: bool = True,
         movie_backoff_max_time: int = 30,
+        movie_timeout: float = 10.0,
+        movie_max_connections: int = 100,
+        movie_max_keepalive_connections: int = 32,
+        movie_keepalive_expiry: float = 30.0,
+        movie_http2: bool = True,
     ):
         """Initialize the MovieConfig class.
 
@@ -28,6 +38,20 @@ class MovieConfig:
             Whether to enable backoff for API calls, by default True
         movie_backoff_max_time : int, optional
             The maximum backoff time for API calls in seconds, by default 30
+        movie_timeout : float, optional
+            Connect, read, write and pool timeout of each request in seconds,
+            by default 10.0
+        movie_max_connections : int, optional
+            Maximum number of open connections to the API, by default 100
+        movie_max_keepalive_connections : int, optional
+            Maximum number of idle connections kept open for reuse, by
+            default 32 (the default concurrency of AsyncMovieClient)
+        movie_keepalive_expiry : float, optional
+            Seconds after which an idle connection is closed, by default 30.0
+        movie_http2 : bool, optional
+            Whether to negotiate HTTP/2 with HTTPS servers, by default True.
+            Needs the h2 package (pip install "httpx[http2]"); ignored
+            without it.
         """
         self.movie_base_url = movie_base_url or os.getenv("MOVIE_API_BASE_URL")
         print(f"MOVIE_API_BASE_URL in MovieConfig init: {self.movie_base_url}")
@@ -37,6 +61,11 @@ class MovieConfig:
 
         self.movie_backoff = movie_backoff
         self.movie_backoff_max_time = movie_backoff_max_time
+        self.movie_timeout = movie_timeout
+        self.movie_max_connections = movie_max_connections
+        self.movie_max_keepalive_connections = movie_max_keepalive_connections
+        self.movie_keepalive_expiry = movie_keepalive_expiry
+        self.movie_http2 = movie_http2
 
     def __str__(self) -> str:
         "Function string representation of the MovieConfig class."
@@ -0,0 +1,180 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+
+import httpx
+
+# Response header holding the cursor of the next page of a list endpoint.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Items requested per page by the iter_* methods, by default.
+PAGE_SIZE = 1000
+
+
+class PageIterator:
+    """Every item of a paginated list endpoint, fetched page by page.
+
+    Pages are requested with the cursor of the X-Next-Cursor header of the
+    previous page, so that deep pages cost the API as much as the first one.
+    While the items of a page are consumed, the next page is already being
+    fetched in a background thread.
+
+    Iterating yields the items one at a time; to_dataframe() collects them
+    into a DataFrame instead.
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        url: str,
+        params: dict,
+        model,
+        page_size: int = PAGE_SIZE,
+        output_format: Literal["pydantic", "dict"] = "pydantic",
+    ):
+        """Initialize the PageIterator class.
+
+        Parameters
+        ----------
+        client : httpx.Client
+            The HTTP client to send the requests with.
+        url : str
+            The URL of the list endpoint.
+        params : dict
+            The filters of the list, sent with every page.
+        model : BaseModel
+            The Pydantic model of the items.
+        page_size : int, optional
+            Number of items per request, by default 1000
+        output_format : Literal["pydantic", "dict"], optional
+            Whether to yield Pydantic models or dicts, by default "pydantic"
+        """
+        if output_format not in ("pydantic", "dict"):
+            raise ValueError("Invalid output format. Choose from 'pydantic' or 'dict'.")
+        self.client = client
+        self.url = url
+        self.params = params
+        self.model = model
+        self.page_size = page_size
+        self.output_format = output_format
+
+    def _fetch(self, cursor: str | None) -> tuple[list[dict], str | None]:
+        """One page of items, and the cursor of the next one (None at the end)."""
+        params = dict(self.params, limit=self.page_size)
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = self.client.get(self.url, params=params)
+        response.raise_for_status()
+        return response.json(), response.headers.get(NEXT_CURSOR_HEADER)
+
+    def pages(self):
+        """Yield the pages as lists of dicts, prefetching one page ahead.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code.
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self._fetch, None)
+        try:
+            while future is not None:
+                page, cursor = future.result()
+                future = executor.submit(self._fetch, cursor) if cursor else None
+                yield page
+        finally:
+            # Stopped early: the prefetched page is not waited for.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __iter__(self):
+        for page in self.pages():
+            if self.output_format == "dict":
+                yield from page
+            else:
+                for item in page:
+                    yield self.model(**item)
+
+    def to_dataframe(self):
+        """Fetch every page into a DataFrame.
+
+        The values are appended to one list per column as the pages arrive,
+        and the DataFrame is built once from those columns: no intermediate
+        list of every item is kept.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per item, one column per field.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code.
+        """
+        import pandas as pd
+
+        columns = {name: [] for name in self.model.model_fields}
+        for page in self.pages():
+            for name, values in columns.items():
+                values.extend([item.get(name) for item in page])
+        return pd.DataFrame(columns)
+
+
+class AsyncPageIterator(PageIterator):
+    """Async version of PageIterator, over an httpx.AsyncClient.
+
+    The next page is fetched in a task while the items of the current one are
+    consumed::
+
+        async for movie in client.iter_movies(genre="Comedy"):
+            ...
+    """
+
+    async def _fetch(self, cursor: str | None) -> tuple[list[dict], str | None]:
+        params = dict(self.params, limit=self.page_size)
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await self.client.get(self.url, params=params)
+        response.raise_for_status()
+        return response.json(), response.headers.get(NEXT_CURSOR_HEADER)
+
+    async def pages(self):
+        """Yield the pages as lists of dicts, prefetching one page ahead.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If an HTTP request returns an unsuccessful status code.
+        """
+        task = asyncio.ensure_future(self._fetch(None))
+        try:
+            while task is not None:
+                page, cursor = await task
+                task = asyncio.ensure_future(self._fetch(cursor)) if cursor else None
+                yield page
+        finally:
+            # Stopped early: the prefetched page is not waited for.
+            if task is not None:
+                task.cancel()
+
+    def __iter__(self):
+        raise TypeError("AsyncPageIterator is iterated with `async for`")
+
+    async def __aiter__(self):
+        async for page in self.pages():
+            if self.output_format == "dict":
+                for item in page:
+                    yield item
+            else:
+                for item in page:
+                    yield self.model(**item)
+
+    async def to_dataframe(self):
+        """Async version of PageIterator.to_dataframe."""
+        import pandas as pd
+
+        columns = {name: [] for name in self.model.model_fields}
+        async for page in self.pages():
+            for name, values in columns.items():
+                values.extend([item.get(name) for item in page])
+        return pd.DataFrame(columns)
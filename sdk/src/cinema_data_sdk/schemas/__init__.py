@@ -3,6 +3,7 @@ from .schemas import (
     LinkSimple,  # type: ignore
     MovieDetailed,  # type: ignore
     MovieSimple,  # type: ignore
+    MovieStats,  # type: ignore
     RatingSimple,  # type: ignore
     TagSimple,
 )
@@ -43,10 +43,23 @@ class MovieBase(BaseModel):
         orm_mode = True
 
 
+class MovieStats(BaseModel):
+    movieId: int
+    rating_count: int
+    rating_mean: float
+    histogram: dict[str, int]
+    first_rated: int | None = None
+    last_rated: int | None = None
+
+    class Config:
+        orm_mode = True
+
+
 class MovieDetailed(MovieBase):
     ratings: list[RatingBase] = []
     tags: list[TagBase] = []
     links: LinkBase | None = None
+    stats: MovieStats | None = None
 
 
 # --- Schémas pour liste de films (sans détails imbriqués) ---
@@ -89,12 +102,28 @@ class LinkSimple(BaseModel):
         orm_mode = True
 
 
+class RatingsPerUser(BaseModel):
+    users: int
+    min: int
+    median: int
+    p90: int
+    max: int
+    mean: float
+
+
+class GenreCount(BaseModel):
+    genre: str
+    movies: int
+
+
 class AnalyticsResponse(BaseModel):
     total_movies: int
     total_ratings: int
     average_rating: float
     total_tags: int
     total_links: int
+    ratings_per_user: RatingsPerUser | None = None
+    top_genres: list[GenreCount] = []
 
     class Config:
         orm_mode = True